@@ -0,0 +1,50 @@
+# api/allocation.py
+import os
+from decimal import Decimal, ROUND_HALF_EVEN
+from typing import Any, List, Sequence
+import numpy as np
+
+# ERC20 decimals of the airdropped token (DevDropToken uses the default 18)
+TOKEN_DECIMALS = int(os.getenv("TOKEN_DECIMALS", "18"))
+# contribution_evaluations.reward_points is DECIMAL(20, 6)
+POINTS_SCALE = 6
+
+
+def to_base_units(tokens: Any, decimals: int = TOKEN_DECIMALS) -> int:
+    """Whole-token amount (e.g. repo_airdrops.total_tokens) in integer base units"""
+    return int(Decimal(str(tokens)).scaleb(decimals).to_integral_value(ROUND_HALF_EVEN))
+
+
+def _fixed_points(points: Any) -> int:
+    if not isinstance(points, Decimal):
+        points = Decimal(str(points))
+    value = int(points.scaleb(POINTS_SCALE).to_integral_value(ROUND_HALF_EVEN))
+    # A negative score can't take tokens away from others
+    return max(value, 0)
+
+
+def allocate_units(points: Sequence[Any], total_units: int, keys: Sequence[str]) -> List[int]:
+    """Split `total_units` in proportion to `points`, exactly
+
+    Each recipient gets floor(points * total / sum) base units and the units left
+    over go one each to the largest remainders, ties broken by `keys`, so the
+    result always sums to `total_units` and doesn't depend on row order. Arithmetic
+    is on arbitrary-precision ints (object arrays): 10^18 base units times
+    fixed-point scores overflows int64.
+    """
+    weights = np.array([_fixed_points(p) for p in points], dtype=object)
+    total_weight = int(weights.sum()) if len(weights) else 0
+    if total_weight == 0:
+        return [0] * len(weights)
+
+    scaled = weights * total_units
+    quotas = scaled // total_weight
+    remainders = scaled - quotas * total_weight
+    leftover = total_units - int(quotas.sum())
+    if leftover:
+        # Stable sorts: by key, then by remainder descending keeps key order on ties
+        order = sorted(range(len(weights)), key=keys.__getitem__)
+        remainders = remainders.tolist()
+        order.sort(key=remainders.__getitem__, reverse=True)
+        quotas[order[:leftover]] += 1
+    return quotas.tolist()
@@ -0,0 +1,524 @@
+# api/async_db.py
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Dict, Any, AsyncIterator, Optional, List, Tuple
+from psycopg.rows import dict_row
+from psycopg.types.json import Jsonb
+from psycopg_pool import AsyncConnectionPool
+from .db import CONTRIBUTOR_DATA_QUERY, commit_rows, pending_pairs_query
+from .distribution_cache import distribution_cache
+
+
+class AsyncDatabaseOperations:
+    """Async counterpart of DatabaseOperations backed by a psycopg async pool"""
+
+    def __init__(self, db_url: str):
+        self.db_url = db_url
+        self.pool = AsyncConnectionPool(
+            db_url,
+            min_size=int(os.getenv("DB_POOL_MIN_SIZE", "1")),
+            max_size=int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+            timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+            check=AsyncConnectionPool.check_connection,
+            open=False,
+        )
+        self._open_lock = asyncio.Lock()
+        self._opened = False
+
+    async def open(self) -> None:
+        """Open the pool; called lazily on first checkout"""
+        async with self._open_lock:
+            if not self._opened:
+                await self.pool.open()
+                self._opened = True
+
+    async def close(self) -> None:
+        if self._opened:
+            await self.pool.close()
+            self._opened = False
+
+    @asynccontextmanager
+    async def get_connection(self):
+        """Check out a pooled connection inside a transaction"""
+        if not self._opened:
+            await self.open()
+        async with self.pool.connection() as conn:
+            yield conn
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Connection pool usage metrics"""
+        return self.pool.get_stats()
+
+    async def get_github_tokens(self) -> list[str]:
+        """Fetch GitHub tokens from database"""
+        async with self.get_connection() as conn:
+            cur = await conn.execute('SELECT "githubAccessToken" FROM "User";')
+            return [row[0] for row in await cur.fetchall()]
+
+    async def store_contributor_data(self, repo_name: str, contributor: Dict[str, Any]) -> None:
+        """Store basic contributor information"""
+        async with self.get_connection() as conn:
+            await conn.execute("""
+                INSERT INTO contributor_data
+                (contributor, repo_name, contributions)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (contributor, repo_name)
+                DO UPDATE SET
+                    contributions = EXCLUDED.contributions
+            """, (
+                contributor["login"],
+                repo_name,
+                Jsonb({
+                    "basic_info": {
+                        "total_contributions": contributor["contributions"],
+                        "total_issues": contributor["issues"],
+                        "total_prs": contributor["pullRequests"]
+                    },
+                    "last_updated": datetime.now().isoformat()
+                })
+            ))
+
+    async def store_contributor_data_bulk(self, contributors_by_repo: Dict[str, List[Dict[str, Any]]]) -> int:
+        """Store basic contributor information for many repos in one transaction"""
+        last_updated = datetime.now().isoformat()
+        rows = {}
+        for repo_name, contributors in contributors_by_repo.items():
+            for contributor in contributors:
+                rows[(contributor["login"], repo_name)] = Jsonb({
+                    "basic_info": {
+                        "total_contributions": contributor["contributions"],
+                        "total_issues": contributor["issues"],
+                        "total_prs": contributor["pullRequests"]
+                    },
+                    "last_updated": last_updated
+                })
+        if not rows:
+            return 0
+
+        async with self.get_connection() as conn:
+            async with conn.cursor() as cur:
+                # psycopg pipelines executemany, so this is one round trip per batch
+                await cur.executemany("""
+                    INSERT INTO contributor_data
+                    (contributor, repo_name, contributions)
+                    VALUES (%s, %s, %s)
+                    ON CONFLICT (contributor, repo_name)
+                    DO UPDATE SET
+                        contributions = EXCLUDED.contributions
+                """, [(login, repo, data) for (login, repo), data in rows.items()])
+        return len(rows)
+
+    async def store_contributor_commits(self, repo_name: str, username: str, commits: list) -> None:
+        """Store detailed commit information, replacing what was stored before"""
+        async with self.get_connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute("""
+                    INSERT INTO contributor_data
+                    (contributor, repo_name, contributions)
+                    VALUES (%s, %s, '{}'::jsonb)
+                    ON CONFLICT (contributor, repo_name) DO NOTHING
+                """, (username, repo_name))
+                await cur.execute("""
+                    DELETE FROM contributor_commits
+                    WHERE repo_name = %s AND contributor = %s
+                """, (repo_name, username))
+                await cur.executemany("""
+                    INSERT INTO contributor_commits
+                    (repo_name, contributor, sha, committed_at, message, lines_changed,
+                     additions, deletions, files_changed, closes_issue, issue_labels)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (repo_name, contributor, sha) DO NOTHING
+                """, commit_rows(repo_name, username, commits, json_adapter=Jsonb))
+
+    async def store_evaluation(self, repo_name: str, username: str,
+                               reward_points: float, justification: str,
+                               input_hash: Optional[str] = None) -> None:
+        """Store evaluation results"""
+        async with self.get_connection() as conn:
+            await conn.execute("""
+                INSERT INTO contribution_evaluations
+                (contributor, repo_name, reward_points, justification, input_hash)
+                VALUES (%s, %s, %s, %s, %s)
+                ON CONFLICT (contributor, repo_name)
+                DO UPDATE SET
+                    reward_points = EXCLUDED.reward_points,
+                    justification = EXCLUDED.justification,
+                    input_hash = EXCLUDED.input_hash,
+                    evaluated_at = CURRENT_TIMESTAMP
+            """, (username, repo_name, reward_points, justification, input_hash))
+        distribution_cache.invalidate(repo_name)
+
+    async def touch_evaluation(self, repo_name: str, username: str) -> None:
+        """Mark a stored evaluation as confirmed current without changing it"""
+        async with self.get_connection() as conn:
+            await conn.execute("""
+                UPDATE contribution_evaluations SET evaluated_at = CURRENT_TIMESTAMP
+                WHERE repo_name = %s AND contributor = %s
+            """, (repo_name, username))
+
+    async def get_evaluation(self, repo_name: str, username: str) -> Optional[Dict[str, Any]]:
+        """Stored evaluation of a contributor, with the hash of the inputs it was made from"""
+        async with self.get_connection() as conn:
+            cur = conn.cursor(row_factory=dict_row)
+            await cur.execute("""
+                SELECT reward_points, justification, input_hash, evaluated_at
+                FROM contribution_evaluations
+                WHERE repo_name = %s AND contributor = %s
+            """, (repo_name, username))
+            return await cur.fetchone()
+
+    async def store_evaluations_bulk(self, repo_name: str,
+                                     evaluations: List[Tuple[str, float, str]]) -> None:
+        """Store (contributor, reward_points, justification) rows for a repository"""
+        if not evaluations:
+            return
+        async with self.get_connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.executemany("""
+                    INSERT INTO contribution_evaluations
+                    (contributor, repo_name, reward_points, justification)
+                    VALUES (%s, %s, %s, %s)
+                    ON CONFLICT (contributor, repo_name)
+                    DO UPDATE SET
+                        reward_points = EXCLUDED.reward_points,
+                        justification = EXCLUDED.justification,
+                        input_hash = NULL,
+                        evaluated_at = CURRENT_TIMESTAMP
+                """, [(user, repo_name, points, text) for user, points, text in evaluations])
+        distribution_cache.invalidate(repo_name)
+
+    async def get_repo_commits(self, repo_name: str) -> Dict[str, List[Dict[str, Any]]]:
+        """Stored commit records of every contributor to a repository, keyed by contributor"""
+        async with self.get_connection() as conn:
+            cur = await conn.execute("""
+                SELECT contributor, message, lines_changed, additions, deletions,
+                       files_changed, closes_issue
+                FROM contributor_commits
+                WHERE repo_name = %s
+                ORDER BY contributor
+            """, (repo_name,))
+            commits: Dict[str, List[Dict[str, Any]]] = {}
+            for contributor, message, lines, additions, deletions, files, closes in await cur.fetchall():
+                commits.setdefault(contributor, []).append({
+                    "commitMessage": message,
+                    "linesChanged": lines,
+                    "additions": additions,
+                    "deletions": deletions,
+                    "filesChanged": files,
+                    "closesIssue": closes,
+                })
+            return commits
+
+    async def get_contributor_data(self, repo_name: str, username: str) -> Optional[Dict]:
+        """Fetch stored contributor data"""
+        async with self.get_connection() as conn:
+            cur = await conn.execute(CONTRIBUTOR_DATA_QUERY, (username, repo_name))
+            result = await cur.fetchone()
+            return result[0] if result else None
+
+    async def store_airdrop_info(self, repo_name: str, airdrop_date: datetime, total_tokens: int) -> None:
+        """Store repository airdrop information"""
+        async with self.get_connection() as conn:
+            await conn.execute("""
+                INSERT INTO repo_airdrops
+                (repo_name, airdrop_date, total_tokens)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (repo_name)
+                DO UPDATE SET
+                    airdrop_date = EXCLUDED.airdrop_date,
+                    total_tokens = EXCLUDED.total_tokens
+            """, (repo_name, airdrop_date, total_tokens))
+        distribution_cache.invalidate(repo_name)
+
+    async def count_pending_pairs(self, evaluated_before: Optional[datetime] = None) -> int:
+        """Number of pairs `iter_pending_pair_pages` would yield right now"""
+        params = [] if evaluated_before is None else [evaluated_before]
+        query = pending_pairs_query(evaluated_before=evaluated_before is not None)
+        async with self.get_connection() as conn:
+            cur = await conn.execute(f"SELECT count(*) FROM ({query}) pending", params)
+            return (await cur.fetchone())[0]
+
+    async def iter_pending_pair_pages(self, evaluated_before: Optional[datetime] = None,
+                                      page_size: int = 500) -> AsyncIterator[List[Tuple[str, str]]]:
+        """Yield pages of pairs with no evaluation, in key order
+
+        With `evaluated_before`, pairs last evaluated (or confirmed unchanged)
+        before that time are included too. Pages are read by keyset (pairs after
+        the last one yielded), each on its own short checkout, so memory stays at
+        one page and no connection is held while the caller works on it.
+        """
+        last = None
+        while True:
+            params: List[Any] = []
+            if last is not None:
+                params.extend(last)
+            if evaluated_before is not None:
+                params.append(evaluated_before)
+            params.append(page_size)
+            query = pending_pairs_query(after=last is not None, limit=True,
+                                        evaluated_before=evaluated_before is not None)
+            async with self.get_connection() as conn:
+                cur = await conn.execute(query, params)
+                page = [tuple(row) for row in await cur.fetchall()]
+            if page:
+                yield page
+            if len(page) < page_size:
+                return
+            last = page[-1]
+
+    async def create_evaluation_job(self, refresh: bool = False) -> Dict[str, Any]:
+        """Create a queued batch evaluation job"""
+        async with self.get_connection() as conn:
+            cur = conn.cursor(row_factory=dict_row)
+            await cur.execute("""
+                INSERT INTO evaluation_jobs (status, refresh) VALUES ('queued', %s) RETURNING *
+            """, (refresh,))
+            return await cur.fetchone()
+
+    async def get_evaluation_job(self, job_id: int) -> Optional[Dict[str, Any]]:
+        """Fetch a batch evaluation job"""
+        async with self.get_connection() as conn:
+            cur = conn.cursor(row_factory=dict_row)
+            await cur.execute("SELECT * FROM evaluation_jobs WHERE id = %s", (job_id,))
+            return await cur.fetchone()
+
+    async def get_active_evaluation_job(self) -> Optional[Dict[str, Any]]:
+        """Fetch the most recent job that is queued or running"""
+        async with self.get_connection() as conn:
+            cur = conn.cursor(row_factory=dict_row)
+            await cur.execute("""
+                SELECT * FROM evaluation_jobs
+                WHERE status IN ('queued', 'running')
+                ORDER BY id DESC
+                LIMIT 1
+            """)
+            return await cur.fetchone()
+
+    async def get_resumable_evaluation_jobs(self, stale_after: float) -> List[int]:
+        """Ids of queued jobs and running jobs whose runner stopped heartbeating"""
+        async with self.get_connection() as conn:
+            cur = await conn.execute("""
+                SELECT id FROM evaluation_jobs
+                WHERE status = 'queued'
+                OR (status = 'running' AND heartbeat_at < now() - make_interval(secs => %s))
+                ORDER BY id
+            """, (stale_after,))
+            return [row[0] for row in await cur.fetchall()]
+
+    async def claim_evaluation_job(self, job_id: int, stale_after: float) -> Optional[Dict[str, Any]]:
+        """Atomically mark a job as running by this worker, unless another runner owns it
+
+        Jobs run one at a time: the claim fails while any other job is running.
+        """
+        async with self.get_connection() as conn:
+            cur = conn.cursor(row_factory=dict_row)
+            await cur.execute("""
+                UPDATE evaluation_jobs
+                SET status = 'running',
+                    started_at = COALESCE(started_at, now()),
+                    run_started_at = now(),
+                    run_start_processed = processed,
+                    heartbeat_at = now(),
+                    updated_at = now()
+                WHERE id = %s
+                AND (status = 'queued'
+                     OR (status = 'running' AND heartbeat_at < now() - make_interval(secs => %s)))
+                AND NOT EXISTS (
+                    SELECT 1 FROM evaluation_jobs live
+                    WHERE live.id <> %s
+                    AND live.status = 'running'
+                    AND live.heartbeat_at >= now() - make_interval(secs => %s)
+                )
+                RETURNING *
+            """, (job_id, stale_after, job_id, stale_after))
+            return await cur.fetchone()
+
+    async def set_evaluation_job_total(self, job_id: int, total: int) -> None:
+        async with self.get_connection() as conn:
+            await conn.execute("""
+                UPDATE evaluation_jobs SET total = %s, updated_at = now() WHERE id = %s
+            """, (total, job_id))
+
+    async def record_evaluation_job_result(self, job_id: int, repo_name: str, username: str,
+                                           error: Optional[str]) -> Optional[str]:
+        """Count one finished pair against a job; returns the job's current status"""
+        failure = Jsonb([{"repo": repo_name, "user": username, "error": error}])
+        async with self.get_connection() as conn:
+            cur = await conn.execute("""
+                UPDATE evaluation_jobs
+                SET processed = processed + 1,
+                    failed = failed + CASE WHEN %s THEN 1 ELSE 0 END,
+                    failures = CASE WHEN %s THEN failures || %s ELSE failures END,
+                    heartbeat_at = now(),
+                    updated_at = now()
+                WHERE id = %s
+                RETURNING status
+            """, (error is not None, error is not None, failure, job_id))
+            result = await cur.fetchone()
+            return result[0] if result else None
+
+    async def heartbeat_evaluation_job(self, job_id: int) -> Optional[str]:
+        """Refresh a running job's heartbeat; returns the job's current status"""
+        async with self.get_connection() as conn:
+            cur = await conn.execute("""
+                UPDATE evaluation_jobs
+                SET heartbeat_at = now()
+                WHERE id = %s
+                RETURNING status
+            """, (job_id,))
+            result = await cur.fetchone()
+            return result[0] if result else None
+
+    async def finish_evaluation_job(self, job_id: int, status: str, error: Optional[str] = None) -> None:
+        """Move a running job to a final (or back to queued) status"""
+        finished = status in ("completed", "failed")
+        async with self.get_connection() as conn:
+            await conn.execute("""
+                UPDATE evaluation_jobs
+                SET status = %s,
+                    error = %s,
+                    finished_at = CASE WHEN %s THEN now() ELSE finished_at END,
+                    updated_at = now()
+                WHERE id = %s AND status = 'running'
+            """, (status, error, finished, job_id))
+
+    async def cancel_evaluation_job(self, job_id: int) -> Optional[Dict[str, Any]]:
+        """Cancel a queued or running job"""
+        async with self.get_connection() as conn:
+            cur = conn.cursor(row_factory=dict_row)
+            await cur.execute("""
+                UPDATE evaluation_jobs
+                SET status = 'cancelled', finished_at = now(), updated_at = now()
+                WHERE id = %s AND status IN ('queued', 'running')
+                RETURNING *
+            """, (job_id,))
+            return await cur.fetchone()
+
+    async def get_airdrop_total_tokens(self, repo_name: str) -> Optional[int]:
+        """Fetch the total token supply configured for a repository airdrop"""
+        async with self.get_connection() as conn:
+            cur = await conn.execute("""
+                SELECT total_tokens
+                FROM repo_airdrops
+                WHERE repo_name = %s
+            """, (repo_name,))
+            result = await cur.fetchone()
+            return result[0] if result else None
+
+    async def store_contributor_wallet(self, username: str, wallet_address: str,
+                                       overwrite: bool = False) -> str:
+        """Link a contributor to the wallet their airdrop claims are paid to
+
+        An existing link is only replaced with `overwrite`; returns the wallet
+        linked afterwards.
+        """
+        async with self.get_connection() as conn:
+            if overwrite:
+                await conn.execute("""
+                    INSERT INTO contributor_wallets (contributor, wallet_address)
+                    VALUES (%s, %s)
+                    ON CONFLICT (contributor)
+                    DO UPDATE SET
+                        wallet_address = EXCLUDED.wallet_address,
+                        updated_at = CURRENT_TIMESTAMP
+                """, (username, wallet_address))
+                return wallet_address
+            await conn.execute("""
+                INSERT INTO contributor_wallets (contributor, wallet_address)
+                VALUES (%s, %s)
+                ON CONFLICT (contributor) DO NOTHING
+            """, (username, wallet_address))
+            cur = await conn.execute("""
+                SELECT wallet_address FROM contributor_wallets WHERE contributor = %s
+            """, (username,))
+            return (await cur.fetchone())[0]
+
+    async def get_contributor_wallets(self, usernames: List[str]) -> Dict[str, str]:
+        """Wallet address per contributor, for those that linked one"""
+        async with self.get_connection() as conn:
+            cur = await conn.execute("""
+                SELECT contributor, wallet_address
+                FROM contributor_wallets
+                WHERE contributor = ANY(%s)
+            """, (usernames,))
+            return dict(await cur.fetchall())
+
+    async def get_payout_batches(self, repo_name: str) -> List[Dict[str, Any]]:
+        """A repo's planned disperse batches, in send order"""
+        async with self.get_connection() as conn:
+            cur = conn.cursor(row_factory=dict_row)
+            await cur.execute("""
+                SELECT * FROM payout_batches
+                WHERE repo_name = %s
+                ORDER BY batch_index
+            """, (repo_name,))
+            return await cur.fetchall()
+
+    async def replace_payout_plan(self, repo_name: str, version: str,
+                                  batches: List[Dict[str, Any]]) -> bool:
+        """Store a repo's payout plan, unless a batch of the current one may have paid out
+
+        Only a plan whose batches are all pending or failed (never sent, or
+        reverted/rejected) can be replaced.
+        """
+        async with self.get_connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute("""
+                    SELECT status FROM payout_batches
+                    WHERE repo_name = %s
+                    FOR UPDATE
+                """, (repo_name,))
+                if any(row[0] not in ("pending", "failed") for row in await cur.fetchall()):
+                    return False
+                await cur.execute("DELETE FROM payout_batches WHERE repo_name = %s", (repo_name,))
+                await cur.executemany("""
+                    INSERT INTO payout_batches
+                    (repo_name, plan_version, batch_index, token_address, disperse_address,
+                     recipients, amounts, total_units, gas_limit, calldata)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                """, [
+                    (repo_name, version, batch["batch_index"], batch["token_address"],
+                     batch["disperse_address"], Jsonb(batch["recipients"]), Jsonb(batch["amounts"]),
+                     batch["total_units"], batch["gas_limit"], batch["calldata"])
+                    for batch in batches
+                ])
+        return True
+
+    async def claim_payout_batch(self, batch_id: int, gas_limit: int) -> bool:
+        """Atomically mark a pending (or failed) batch as being sent by this run, with a gas limit"""
+        async with self.get_connection() as conn:
+            cur = await conn.execute("""
+                UPDATE payout_batches
+                SET status = 'sending', gas_limit = %s, tx_hash = NULL, error = NULL, updated_at = now()
+                WHERE id = %s AND status IN ('pending', 'failed')
+                RETURNING id
+            """, (gas_limit, batch_id))
+            return await cur.fetchone() is not None
+
+    async def set_payout_batch_submitted(self, batch_id: int, tx_hash: str) -> None:
+        async with self.get_connection() as conn:
+            await conn.execute("""
+                UPDATE payout_batches
+                SET status = 'submitted', tx_hash = %s, updated_at = now()
+                WHERE id = %s
+            """, (tx_hash, batch_id))
+
+    async def finish_payout_batch(self, batch_id: int, status: str, error: Optional[str] = None) -> None:
+        async with self.get_connection() as conn:
+            await conn.execute("""
+                UPDATE payout_batches
+                SET status = %s, error = %s, updated_at = now()
+                WHERE id = %s
+            """, (status, error, batch_id))
+
+    async def get_repo_evaluations(self, repo_name: str) -> List[Tuple[str, Any, str]]:
+        """Fetch (contributor, reward_points, justification) rows for a repository"""
+        async with self.get_connection() as conn:
+            cur = await conn.execute("""
+                SELECT contributor, reward_points, justification
+                FROM contribution_evaluations
+                WHERE repo_name = %s
+            """, (repo_name,))
+            return await cur.fetchall()
@@ -0,0 +1,39 @@
+# api/auth.py
+import asyncio
+import hmac
+import os
+from typing import Optional
+from fastapi import Header, HTTPException
+from github import Auth, Github, GithubException
+
+
+def is_admin(admin_key: Optional[str]) -> bool:
+    """Whether `admin_key` matches ADMIN_API_KEY (never true while it is unset)"""
+    expected = os.getenv("ADMIN_API_KEY")
+    return bool(expected and admin_key and hmac.compare_digest(admin_key, expected))
+
+
+async def require_admin(x_admin_key: Optional[str] = Header(None)) -> None:
+    """Dependency for operator-only endpoints: X-Admin-Key must match ADMIN_API_KEY"""
+    if not os.getenv("ADMIN_API_KEY"):
+        raise HTTPException(status_code=503, detail="Operator endpoints are disabled: ADMIN_API_KEY is not set")
+    if not is_admin(x_admin_key):
+        raise HTTPException(status_code=401, detail="Invalid or missing X-Admin-Key")
+
+
+def _github_login(token: str) -> Optional[str]:
+    try:
+        return Github(auth=Auth.Token(token)).get_user().login
+    except GithubException:
+        return None
+
+
+async def github_login(authorization: Optional[str]) -> Optional[str]:
+    """GitHub login that the caller's OAuth token (`Authorization: Bearer ...`) belongs to"""
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return None
+    token = authorization[len("bearer "):].strip()
+    if not token:
+        return None
+    # PyGithub is blocking
+    return await asyncio.to_thread(_github_login, token)
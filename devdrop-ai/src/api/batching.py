@@ -0,0 +1,163 @@
+# api/batching.py
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from .schemas import ContributorEvaluation
+from .structured import StructuredOutputError, validate_evaluation
+
+# Sends one LLM request for [(username, payload), ...] and returns the decoded JSON array
+BatchRunner = Callable[[List[Tuple[str, Any]]], Awaitable[List[Any]]]
+# Tokens an entry adds to a request (its prompt section plus its share of the reply)
+EntryTokens = Callable[[str, Any], int]
+
+
+class InvalidEvaluation(ValueError):
+    """The model returned no valid evaluation for a contributor"""
+
+
+class _Entry:
+    def __init__(self, username: str, payload: Any, future: asyncio.Future, tokens: int):
+        self.username = username
+        self.payload = payload
+        self.future = future
+        self.tokens = tokens
+        self.attempts = 0
+
+
+class EvaluationBatcher:
+    """Packs concurrent single-contributor evaluations into multi-contributor requests
+
+    Callers await `evaluate()` as if it were one request. Entries are flushed once
+    `batch_size` are waiting or `max_wait` seconds after the first one arrived. The
+    reply must be a JSON array of {username, total_points, justification}; each
+    entry is validated on its own and missing or invalid ones are re-queued into a
+    later batch, up to `max_attempts` times.
+
+    With `max_tokens`, a batch is also closed before its entries' `entry_tokens`
+    plus `overhead` (the shared prompt) would exceed the model's context window;
+    an entry too large to share a request is sent on its own.
+    """
+
+    def __init__(self, run_batch: BatchRunner, batch_size: int = 5,
+                 max_wait: float = 2.0, max_attempts: int = 2,
+                 entry_tokens: Optional[EntryTokens] = None,
+                 max_tokens: Optional[int] = None, overhead: int = 0):
+        self.run_batch = run_batch
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait
+        self.max_attempts = max(1, max_attempts)
+        self.entry_tokens = entry_tokens
+        self.max_tokens = max_tokens
+        self.overhead = overhead
+        self._pending: List[_Entry] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+
+    @classmethod
+    def from_env(cls, run_batch: BatchRunner, entry_tokens: Optional[EntryTokens] = None,
+                 overhead: int = 0) -> "EvaluationBatcher":
+        return cls(
+            run_batch,
+            batch_size=int(os.getenv("EVAL_LLM_BATCH_SIZE", "5")),
+            max_wait=float(os.getenv("EVAL_LLM_BATCH_WAIT", "2")),
+            max_attempts=int(os.getenv("EVAL_LLM_BATCH_ATTEMPTS", "2")),
+            entry_tokens=entry_tokens,
+            # Below the 8192-token window of llama3-70b-8192: estimates are rough
+            max_tokens=int(os.getenv("EVAL_LLM_BATCH_MAX_TOKENS", "7000")),
+            overhead=overhead,
+        )
+
+    async def evaluate(self, username: str, payload: Any) -> Dict[str, Any]:
+        """{"total_points", "justification"} for one contributor; raises InvalidEvaluation"""
+        tokens = self.entry_tokens(username, payload) if self.entry_tokens else 0
+        entry = _Entry(username, payload, asyncio.get_running_loop().create_future(), tokens)
+        self._enqueue(entry)
+        return await entry.future
+
+    def _fits(self, batch: List[_Entry], entry: _Entry) -> bool:
+        if not batch:
+            return True
+        if len(batch) >= self.batch_size:
+            return False
+        if self.max_tokens is None:
+            return True
+        return self.overhead + sum(e.tokens for e in batch) + entry.tokens <= self.max_tokens
+
+    def _full(self) -> bool:
+        if len(self._pending) >= self.batch_size:
+            return True
+        return (self.max_tokens is not None
+                and self.overhead + sum(e.tokens for e in self._pending) >= self.max_tokens)
+
+    def _enqueue(self, entry: _Entry) -> None:
+        self._pending.append(entry)
+        if self._full():
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._pending = [entry for entry in self._pending if not entry.future.done()]
+        while self._pending:
+            # Usernames identify entries in the reply, so a batch holds each one once
+            batch: List[_Entry] = []
+            rest: List[_Entry] = []
+            names = set()
+            for entry in self._pending:
+                if entry.username not in names and self._fits(batch, entry):
+                    batch.append(entry)
+                    names.add(entry.username)
+                else:
+                    rest.append(entry)
+            self._pending = rest
+            task = asyncio.create_task(self._send(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            if not self._full():
+                break
+        if self._pending:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+
+    async def _send(self, batch: List[_Entry]) -> None:
+        try:
+            items = await self.run_batch([(entry.username, entry.payload) for entry in batch])
+        except StructuredOutputError:
+            # Unusable reply even after repair; entries are re-queued like missing ones
+            items = []
+        except Exception as e:
+            # Request-level failures (rate limits, network) go back to every caller
+            for entry in batch:
+                if not entry.future.done():
+                    entry.future.set_exception(e)
+            return
+
+        results = index_evaluations(items)
+        for entry in batch:
+            if entry.future.done():
+                continue
+            result = results.get(entry.username)
+            if result is not None:
+                entry.future.set_result(result)
+                continue
+            entry.attempts += 1
+            if entry.attempts >= self.max_attempts:
+                entry.future.set_exception(
+                    InvalidEvaluation(f"No valid evaluation returned for {entry.username}")
+                )
+            else:
+                self._enqueue(entry)
+
+
+def index_evaluations(items: List[Any]) -> Dict[str, Dict[str, Any]]:
+    """Valid {total_points, justification} entries of a batch reply, keyed by username"""
+    results: Dict[str, Dict[str, Any]] = {}
+    for item in items:
+        try:
+            evaluation = validate_evaluation(item, ContributorEvaluation)
+        except ValueError:
+            continue
+        results[item["username"]] = evaluation
+    return results
@@ -0,0 +1,139 @@
+# api/chat.py
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
+from langchain_core.messages import RemoveMessage, trim_messages
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
+from .scheduler import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+def history_window(max_tokens: int) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """pre_model_hook that keeps only the most recent turns within `max_tokens`
+
+    The trimmed history replaces the thread state, so checkpoints stay bounded too.
+    """
+    def window(state: Dict[str, Any]) -> Dict[str, Any]:
+        messages = state["messages"]
+        kept = trim_messages(
+            messages,
+            max_tokens=max_tokens,
+            token_counter=lambda msgs: sum(estimate_tokens(str(msg.content)) for msg in msgs),
+            strategy="last",
+            start_on="human",
+            include_system=True,
+        )
+        if len(kept) == len(messages):
+            return {}
+        # A single oversized message is still answered
+        kept = kept or messages[-1:]
+        return {"messages": [RemoveMessage(id=REMOVE_ALL_MESSAGES), *kept]}
+
+    return window
+
+
+class ChatSessions:
+    """Per-thread agent conversations on a shared checkpointer
+
+    Checkpoints live in Postgres (CHAT_CHECKPOINTER=postgres, the default) when
+    langgraph-checkpoint-postgres is installed, otherwise in memory. Turns on the
+    same thread are serialized; threads idle for CHAT_THREAD_IDLE_TTL seconds or
+    beyond the CHAT_MAX_THREADS most recent are dropped from memory.
+    """
+
+    def __init__(self, make_agent: Callable[[Any], Any], db_url: Optional[str] = None,
+                 max_threads: Optional[int] = None, idle_ttl: Optional[float] = None):
+        self.make_agent = make_agent
+        self.db_url = db_url
+        self.max_threads = max_threads or int(os.getenv("CHAT_MAX_THREADS", "1000"))
+        self.idle_ttl = idle_ttl or float(os.getenv("CHAT_THREAD_IDLE_TTL", "3600"))
+        self._threads: "OrderedDict[str, Tuple[float, asyncio.Lock]]" = OrderedDict()
+        self._agent = None
+        self._checkpointer = None
+        self._pool = None
+        self._persistent = False
+        self._init_lock = asyncio.Lock()
+
+    @asynccontextmanager
+    async def turn(self, thread_id: Optional[str] = None):
+        """(agent, config, thread_id) for one conversation turn on a thread"""
+        thread_id = thread_id or uuid.uuid4().hex
+        agent = await self._get_agent()
+        lock = await self._touch(thread_id)
+        async with lock:
+            yield agent, {"configurable": {"thread_id": thread_id}}, thread_id
+
+    async def warm_up(self) -> None:
+        """Build the agent and checkpointer ahead of the first chat turn"""
+        await self._get_agent()
+
+    async def close(self) -> None:
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "threads": len(self._threads),
+            "max_threads": self.max_threads,
+            "persistent": self._persistent,
+        }
+
+    async def _get_agent(self):
+        if self._agent is None:
+            async with self._init_lock:
+                if self._agent is None:
+                    self._checkpointer = await self._make_checkpointer()
+                    # Building the tools may hit the network
+                    self._agent = await asyncio.to_thread(self.make_agent, self._checkpointer)
+        return self._agent
+
+    async def _make_checkpointer(self):
+        if self.db_url and os.getenv("CHAT_CHECKPOINTER", "postgres") == "postgres":
+            try:
+                from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+                from psycopg.rows import dict_row
+                from psycopg_pool import AsyncConnectionPool
+            except ImportError:
+                logger.warning("langgraph-checkpoint-postgres is not installed; chat history is kept in memory")
+            else:
+                pool = AsyncConnectionPool(
+                    self.db_url,
+                    min_size=1,
+                    max_size=int(os.getenv("CHAT_DB_POOL_MAX_SIZE", "5")),
+                    open=False,
+                    kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+                )
+                await pool.open()
+                checkpointer = AsyncPostgresSaver(pool)
+                await checkpointer.setup()
+                self._pool = pool
+                self._persistent = True
+                return checkpointer
+        return MemorySaver()
+
+    async def _touch(self, thread_id: str) -> asyncio.Lock:
+        now = time.monotonic()
+        _, lock = self._threads.pop(thread_id, (now, None))
+        lock = lock or asyncio.Lock()
+        self._threads[thread_id] = (now, lock)
+        await self._evict(now, keep=thread_id)
+        return lock
+
+    async def _evict(self, now: float, keep: str) -> None:
+        # Least recently used first; threads mid-turn are skipped
+        for thread_id, (last_used, lock) in list(self._threads.items()):
+            if len(self._threads) <= self.max_threads and now - last_used < self.idle_ttl:
+                return
+            if thread_id == keep or lock.locked():
+                continue
+            del self._threads[thread_id]
+            if not self._persistent:
+                await self._checkpointer.adelete_thread(thread_id)
@@ -0,0 +1,106 @@
+# api/compaction.py
+import json
+import os
+from collections import Counter
+from typing import Any, Dict, List, Optional
+import numpy as np
+from .scheduler import estimate_tokens
+from .scoring import score_commits
+
+LINES_BAND_LABELS = ["0", "1-50", "51-200", "201-500", "501+"]
+FILES_BAND_LABELS = ["0", "1-2", "3-10", "11+"]
+MESSAGE_PREVIEW_CHARS = 160
+TOP_LABELS = 10
+
+
+def compact_contribution_data(data: Dict[str, Any], token_budget: Optional[int] = None,
+                              max_examples: Optional[int] = None) -> Dict[str, Any]:
+    """Fixed-size summary of a contributor's commits for the evaluation prompt
+
+    Band histograms, issue/label statistics and totals take the same space for any
+    history length; representative commits are added until `token_budget`
+    (EVAL_PROMPT_TOKEN_BUDGET) is reached.
+    """
+    token_budget = token_budget or int(os.getenv("EVAL_PROMPT_TOKEN_BUDGET", "1500"))
+    max_examples = max_examples or int(os.getenv("EVAL_PROMPT_MAX_EXAMPLES", "20"))
+    commits = data.get("commits", [])
+    summary: Dict[str, Any] = {"GITHUB USERNAME": data.get("GITHUB USERNAME")}
+    if not commits:
+        summary["totals"] = {"commits": 0}
+        return summary
+
+    scores = score_commits(commits)
+    summary.update(_statistics(commits, scores))
+
+    representative: List[Dict[str, Any]] = []
+    used = estimate_tokens(json.dumps(summary))
+    for i in _representative_order(commits, scores)[:max_examples]:
+        example = _example(commits[i], scores, i)
+        cost = estimate_tokens(json.dumps(example)) + 1
+        if used + cost > token_budget:
+            break
+        representative.append(example)
+        used += cost
+    summary["representative_commits"] = representative
+    return summary
+
+
+def _statistics(commits: List[Dict[str, Any]], scores: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    dates = sorted(commit["committedAt"] for commit in commits if commit.get("committedAt"))
+    known = [commit for commit in commits if commit.get("additions") is not None]
+    labels = Counter(label for commit in commits for label in commit.get("issueLabels") or [])
+    lines_hist = np.bincount(scores["lines_points"], minlength=len(LINES_BAND_LABELS))
+    files_hist = np.bincount(scores["files_points"], minlength=len(FILES_BAND_LABELS))
+    return {
+        "totals": {
+            "commits": len(commits),
+            "lines_changed": int(scores["lines"].sum()),
+            "additions": sum(commit["additions"] for commit in known) if known else None,
+            "deletions": sum(commit.get("deletions") or 0 for commit in known) if known else None,
+            "files_changed": int(scores["files"].sum()),
+            "first_commit_at": dates[0] if dates else None,
+            "last_commit_at": dates[-1] if dates else None,
+        },
+        "lines_changed_bands": dict(zip(LINES_BAND_LABELS, lines_hist.tolist())),
+        "files_changed_bands": dict(zip(FILES_BAND_LABELS, files_hist.tolist())),
+        "message_quality": {
+            "descriptive": int((scores["message_points"] == 2).sum()),
+            "single_word": int(scores["single_word"].sum()),
+            "empty": int((scores["message_points"] == 0).sum()),
+        },
+        "issues": {
+            "closes": int(scores["closes"].sum()),
+            "references_only": int((scores["references"] & ~scores["closes"]).sum()),
+        },
+        "issue_labels": dict(labels.most_common(TOP_LABELS)),
+        "special_cases": {
+            "scaffolding": int(scores["scaffold"].sum()),
+            "deletion_only": int(scores["deletion_only"].sum()),
+            "test_only": int(scores["test_only"].sum()),
+        },
+    }
+
+
+def _representative_order(commits: List[Dict[str, Any]], scores: Dict[str, np.ndarray]) -> List[int]:
+    """Commits the rules can't judge first, then the highest-scoring, newest first on ties"""
+    recency = np.array([commit.get("committedAt") or "" for commit in commits])
+    recency_rank = np.argsort(np.argsort(recency))
+    # lexsort uses the last key as the primary one
+    order = np.lexsort((-recency_rank, -scores["points"], ~scores["ambiguous"]))
+    return order.tolist()
+
+
+def _example(commit: Dict[str, Any], scores: Dict[str, np.ndarray], i: int) -> Dict[str, Any]:
+    message = (commit.get("commitMessage") or "").strip()
+    first_line = message.splitlines()[0] if message else ""
+    if len(first_line) > MESSAGE_PREVIEW_CHARS:
+        first_line = first_line[:MESSAGE_PREVIEW_CHARS] + "..."
+    example = {
+        "message": first_line,
+        "linesChanged": int(scores["lines"][i]),
+        "filesChanged": int(scores["files"][i]),
+        "closesIssue": bool(scores["closes"][i]),
+    }
+    if commit.get("issueLabels"):
+        example["issueLabels"] = commit["issueLabels"][:5]
+    return example
@@ -1,16 +1,105 @@
 # db/operations.py
 import psycopg2
-from psycopg2.extras import Json
-from typing import Dict, Any, Optional
+from psycopg2.extras import Json, execute_values
+from typing import Dict, Any, Iterator, Optional, List, Tuple
 import json
 from datetime import datetime
+from .pool import get_pool
+from .distribution_cache import distribution_cache
+
+# Rebuilds the legacy `contributions` shape, with detailed_commits aggregated
+# from the normalized contributor_commits table (newest first)
+CONTRIBUTOR_DATA_QUERY = """
+    SELECT cd.contributions || jsonb_build_object('detailed_commits', COALESCE((
+        SELECT jsonb_agg(jsonb_build_object(
+            'sha', cc.sha,
+            'committedAt', cc.committed_at,
+            'commitMessage', cc.message,
+            'linesChanged', cc.lines_changed,
+            'additions', cc.additions,
+            'deletions', cc.deletions,
+            'filesChanged', cc.files_changed,
+            'closesIssue', cc.closes_issue,
+            'issueLabels', cc.issue_labels
+        ) ORDER BY cc.committed_at DESC NULLS LAST)
+        FROM contributor_commits cc
+        WHERE cc.repo_name = cd.repo_name AND cc.contributor = cd.contributor
+    ), '[]'::jsonb))
+    FROM contributor_data cd
+    WHERE cd.contributor = %s AND cd.repo_name = %s
+"""
+
+def pending_pairs_query(by_repo: bool = False, after: bool = False, limit: bool = False,
+                        evaluated_before: bool = False) -> str:
+    """(repo_name, contributor) pairs without an evaluation, in key order
+
+    Parameters, in order: repo_name if `by_repo`, the last (repo_name, contributor)
+    seen if `after`, a time if `evaluated_before` (evaluations older than it
+    count as missing), the page size if `limit`. contributor_data's primary key
+    makes pairs unique, so no DISTINCT is needed; ordering by (repo_name,
+    contributor) lets both tables be read through their (repo_name, contributor)
+    indexes.
+    """
+    conditions = []
+    if by_repo:
+        conditions.append("cd.repo_name = %s")
+    if after:
+        conditions.append("(cd.repo_name, cd.contributor) > (%s, %s)")
+    conditions.append(f"""NOT EXISTS (
+            SELECT 1
+            FROM contribution_evaluations ce
+            WHERE ce.repo_name = cd.repo_name
+            AND ce.contributor = cd.contributor
+            {"AND ce.evaluated_at >= %s" if evaluated_before else ""}
+        )""")
+    return f"""
+        SELECT cd.repo_name, cd.contributor
+        FROM contributor_data cd
+        WHERE {" AND ".join(conditions)}
+        ORDER BY cd.repo_name, cd.contributor
+        {"LIMIT %s" if limit else ""}
+    """
+
+
+INSERT_COMMITS_QUERY = """
+    INSERT INTO contributor_commits 
+    (repo_name, contributor, sha, committed_at, message, lines_changed, 
+     additions, deletions, files_changed, closes_issue, issue_labels) 
+    VALUES %s
+    ON CONFLICT (repo_name, contributor, sha) DO NOTHING
+"""
+
+
+def commit_rows(repo_name: str, username: str, commits: list, json_adapter=Json) -> List[Tuple]:
+    """contributor_commits rows for commit records produced by GitHubTool"""
+    return [(
+        repo_name,
+        username,
+        commit["sha"],
+        commit.get("committedAt"),
+        commit["commitMessage"],
+        commit["linesChanged"],
+        commit.get("additions"),
+        commit.get("deletions"),
+        commit["filesChanged"],
+        commit["closesIssue"],
+        json_adapter(commit.get("issueLabels", []))
+    ) for commit in commits]
 
 class DatabaseOperations:
     def __init__(self, db_url: str):
         self.db_url = db_url
+        # Pools are shared per URL, so every DatabaseOperations instance
+        # (service, GitHubTool, AirdropStoreTool) draws from the same one
+        self.pool = get_pool(db_url)
 
     def get_connection(self):
-        return psycopg2.connect(self.db_url)
+        """Check out a pooled connection; it is returned when the block exits"""
+        return self.pool.connection()
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Connection pool usage metrics"""
+        return self.pool.stats()
 
     def get_github_tokens(self) -> list[str]:
         """Fetch GitHub tokens from database"""
@@ -44,52 +133,136 @@ class DatabaseOperations:
                 ))
                 conn.commit()
 
+    def store_contributor_data_bulk(self, contributors_by_repo: Dict[str, List[Dict[str, Any]]],
+                                    page_size: int = 1000) -> int:
+        """Store basic contributor information for many repos in one transaction"""
+        last_updated = datetime.now().isoformat()
+        # A single INSERT ... ON CONFLICT cannot touch the same row twice,
+        # so duplicates within the batch are collapsed (last one wins)
+        rows = {}
+        for repo_name, contributors in contributors_by_repo.items():
+            for contributor in contributors:
+                rows[(contributor["login"], repo_name)] = Json({
+                    "basic_info": {
+                        "total_contributions": contributor["contributions"],
+                        "total_issues": contributor["issues"],
+                        "total_prs": contributor["pullRequests"]
+                    },
+                    "last_updated": last_updated
+                })
+        if not rows:
+            return 0
+
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                execute_values(cur, """
+                    INSERT INTO contributor_data 
+                    (contributor, repo_name, contributions) 
+                    VALUES %s
+                    ON CONFLICT (contributor, repo_name) 
+                    DO UPDATE SET 
+                        contributions = EXCLUDED.contributions
+                """, [(login, repo, data) for (login, repo), data in rows.items()],
+                    page_size=page_size)
+                conn.commit()
+        return len(rows)
+
     def store_contributor_commits(self, repo_name: str, username: str, commits: list) -> None:
-        """Store detailed commit information"""
+        """Store detailed commit information, replacing what was stored before"""
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                self._ensure_contributor_row(cur, repo_name, username)
+                cur.execute("""
+                    DELETE FROM contributor_commits 
+                    WHERE repo_name = %s AND contributor = %s
+                """, (repo_name, username))
+                execute_values(cur, INSERT_COMMITS_QUERY, commit_rows(repo_name, username, commits))
+                conn.commit()
+
+    def get_commit_watermark(self, repo_name: str, username: str) -> Optional[Dict[str, Any]]:
+        """Last synced commit (sha and date) for a contributor, if any sync happened"""
         with self.get_connection() as conn:
             with conn.cursor() as cur:
                 cur.execute("""
-                    UPDATE contributor_data 
-                    SET contributions = jsonb_set(
-                        contributions::jsonb,
-                        '{detailed_commits}',
-                        %s::jsonb,
-                        true
-                    )
+                    SELECT last_sha, last_commit_at 
+                    FROM contributor_sync_state 
                     WHERE contributor = %s AND repo_name = %s
-                """, (
-                    Json(commits),
-                    username,
-                    repo_name
-                ))
+                """, (username, repo_name))
+                result = cur.fetchone()
+                if not result:
+                    return None
+                return {"last_sha": result[0], "last_commit_at": result[1]}
+
+    def append_contributor_commits(self, repo_name: str, username: str, commits: list,
+                                   last_sha: Optional[str], last_commit_at: Optional[str],
+                                   replace: bool = False) -> int:
+        """Append synced commits and advance the watermark in one transaction
+
+        Commits whose sha is already stored are skipped. With `replace` the stored
+        commits are dropped first (after a full fetch). Returns how many commits
+        were added.
+        """
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                self._ensure_contributor_row(cur, repo_name, username)
+                if replace:
+                    cur.execute("""
+                        DELETE FROM contributor_commits 
+                        WHERE repo_name = %s AND contributor = %s
+                    """, (repo_name, username))
+                inserted = execute_values(
+                    cur, INSERT_COMMITS_QUERY + " RETURNING sha",
+                    commit_rows(repo_name, username, commits), fetch=True
+                )
+                # Keep the previous watermark when nothing new arrived
+                cur.execute("""
+                    INSERT INTO contributor_sync_state 
+                    (contributor, repo_name, last_sha, last_commit_at, synced_at) 
+                    VALUES (%s, %s, %s, %s, CURRENT_TIMESTAMP)
+                    ON CONFLICT (contributor, repo_name) 
+                    DO UPDATE SET 
+                        last_sha = COALESCE(EXCLUDED.last_sha, contributor_sync_state.last_sha),
+                        last_commit_at = COALESCE(EXCLUDED.last_commit_at, contributor_sync_state.last_commit_at),
+                        synced_at = CURRENT_TIMESTAMP
+                """, (username, repo_name, last_sha, last_commit_at))
                 conn.commit()
+                return len(inserted)
+
+    @staticmethod
+    def _ensure_contributor_row(cur, repo_name: str, username: str) -> None:
+        # Commits can be synced before the contributor was listed
+        cur.execute("""
+            INSERT INTO contributor_data 
+            (contributor, repo_name, contributions) 
+            VALUES (%s, %s, '{}'::jsonb)
+            ON CONFLICT (contributor, repo_name) DO NOTHING
+        """, (username, repo_name))
 
     def store_evaluation(self, repo_name: str, username: str, 
-                        reward_points: float, justification: str) -> None:
+                        reward_points: float, justification: str,
+                        input_hash: Optional[str] = None) -> None:
         """Store evaluation results"""
         with self.get_connection() as conn:
             with conn.cursor() as cur:
                 cur.execute("""
                     INSERT INTO contribution_evaluations 
-                    (contributor, repo_name, reward_points, justification)
-                    VALUES (%s, %s, %s, %s)
+                    (contributor, repo_name, reward_points, justification, input_hash)
+                    VALUES (%s, %s, %s, %s, %s)
                     ON CONFLICT (contributor, repo_name) 
                     DO UPDATE SET 
                         reward_points = EXCLUDED.reward_points,
                         justification = EXCLUDED.justification,
+                        input_hash = EXCLUDED.input_hash,
                         evaluated_at = CURRENT_TIMESTAMP
-                """, (username, repo_name, reward_points, justification))
+                """, (username, repo_name, reward_points, justification, input_hash))
                 conn.commit()
+        distribution_cache.invalidate(repo_name)
 
     def get_contributor_data(self, repo_name: str, username: str) -> Optional[Dict]:
         """Fetch stored contributor data"""
         with self.get_connection() as conn:
             with conn.cursor() as cur:
-                cur.execute("""
-                    SELECT contributions 
-                    FROM contributor_data 
-                    WHERE contributor = %s AND repo_name = %s
-                """, (username, repo_name))
+                cur.execute(CONTRIBUTOR_DATA_QUERY, (username, repo_name))
                 result = cur.fetchone()
                 return result[0] if result else None
 
@@ -107,47 +280,55 @@ class DatabaseOperations:
                         total_tokens = EXCLUDED.total_tokens
                 """, (repo_name, airdrop_date, total_tokens))
                 conn.commit()
+        distribution_cache.invalidate(repo_name)
 
-    def get_token_distribution(self, repo_name: str) -> Dict[str, Any]:
-        """Calculate token distribution for a repository"""
+    def iter_pending_pairs(self, repo_name: Optional[str] = None,
+                           page_size: int = 500) -> Iterator[Tuple[str, str]]:
+        """Yield pairs that have no evaluation yet, optionally for one repo, in key order
+
+        Pages are read by keyset (pairs after the last one yielded) through a
+        server-side cursor, each on its own short checkout, so memory stays at
+        one page and no connection is held while the caller works. A pair
+        evaluated after its page was read is still yielded.
+        """
+        last = None
+        while True:
+            params: List[Any] = []
+            if repo_name is not None:
+                params.append(repo_name)
+            if last is not None:
+                params.extend(last)
+            params.append(page_size)
+            query = pending_pairs_query(by_repo=repo_name is not None, after=last is not None, limit=True)
+            with self.get_connection() as conn:
+                with conn.cursor(name="pending_pairs") as cur:
+                    cur.itersize = page_size
+                    cur.execute(query, params)
+                    page = [tuple(row) for row in cur]
+            yield from page
+            if len(page) < page_size:
+                return
+            last = page[-1]
+
+    def get_airdrop_total_tokens(self, repo_name: str) -> Optional[int]:
+        """Fetch the total token supply configured for a repository airdrop"""
         with self.get_connection() as conn:
             with conn.cursor() as cur:
-                # Get total tokens for the repository
                 cur.execute("""
                     SELECT total_tokens 
                     FROM repo_airdrops 
                     WHERE repo_name = %s
                 """, (repo_name,))
-                airdrop_info = cur.fetchone()
-                if not airdrop_info:
-                    return {"error": "No airdrop information found for this repository"}
-                
-                total_tokens = airdrop_info[0]
+                result = cur.fetchone()
+                return result[0] if result else None
 
-                # Calculate total reward points and individual allocations
+    def get_repo_evaluations(self, repo_name: str) -> List[Tuple[str, Any, str]]:
+        """Fetch (contributor, reward_points, justification) rows for a repository"""
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
                 cur.execute("""
-                    WITH total_points AS (
-                        SELECT SUM(reward_points) as sum_points
-                        FROM contribution_evaluations
-                        WHERE repo_name = %s
-                    )
-                    SELECT 
-                        ce.contributor,
-                        ce.reward_points,
-                        CAST(ce.reward_points * %s / NULLIF(tp.sum_points, 0) AS NUMERIC(20, 6)) as token_allocation
-                    FROM contribution_evaluations ce
-                    CROSS JOIN total_points tp
-                    WHERE ce.repo_name = %s
-                """, (repo_name, total_tokens, repo_name))
-                
-                distributions = [{
-                    "contributor": row[0],
-                    "reward_points": float(row[1]),
-                    "token_allocation": float(row[2]) if row[2] is not None else 0
-                } for row in cur.fetchall()]
-
-                return {
-                    "repo_name": repo_name,
-                    "total_tokens": total_tokens,
-                    "distributions": distributions
-                }
\ No newline at end of file
+                    SELECT contributor, reward_points, justification 
+                    FROM contribution_evaluations 
+                    WHERE repo_name = %s
+                """, (repo_name,))
+                return cur.fetchall()
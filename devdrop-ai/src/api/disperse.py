@@ -0,0 +1,360 @@
+# api/disperse.py
+import asyncio
+import hashlib
+import math
+import os
+import time
+from typing import Any, Dict, List, Optional, Protocol, Tuple
+import requests
+from eth_utils import keccak
+
+DISPERSE_TOKEN_SIGNATURE = "disperseToken(address,address[],uint256[])"
+DISPERSE_TOKEN_SELECTOR = keccak(text=DISPERSE_TOKEN_SIGNATURE)[:4]
+
+
+def _word(value: int) -> bytes:
+    return value.to_bytes(32, "big")
+
+
+def _address_word(address: str) -> bytes:
+    raw = bytes.fromhex(address[2:] if address.startswith("0x") else address)
+    if len(raw) != 20:
+        raise ValueError(f"Invalid address: {address}")
+    return raw.rjust(32, b"\0")
+
+
+def encode_disperse_token(token: str, recipients: List[str], amounts: List[int]) -> bytes:
+    """ABI calldata for disperseToken(token, recipients, amounts)"""
+    if len(recipients) != len(amounts):
+        raise ValueError("recipients and amounts differ in length")
+    n = len(recipients)
+    # Head: token, then offsets of the two dynamic arrays from the start of the arguments
+    head = _address_word(token) + _word(3 * 32) + _word(3 * 32 + 32 * (n + 1))
+    addresses = b"".join(_address_word(recipient) for recipient in recipients)
+    values = b"".join(_word(amount) for amount in amounts)
+    return DISPERSE_TOKEN_SELECTOR + head + _word(n) + addresses + _word(n) + values
+
+
+def decode_disperse_token(calldata: bytes) -> Tuple[str, List[str], List[int]]:
+    """(token, recipients, amounts) from disperseToken calldata, as encoded above"""
+    if calldata[:4] != DISPERSE_TOKEN_SELECTOR:
+        raise ValueError("Not a disperseToken call")
+    words = [calldata[i:i + 32] for i in range(4, len(calldata), 32)]
+    token = "0x" + words[0][12:].hex()
+    start = int.from_bytes(words[1], "big") // 32
+    n = int.from_bytes(words[start], "big")
+    recipients = ["0x" + word[12:].hex() for word in words[start + 1:start + 1 + n]]
+    start = int.from_bytes(words[2], "big") // 32
+    amounts = [int.from_bytes(word, "big") for word in words[start + 1:start + 1 + n]]
+    return token, recipients, amounts
+
+
+class GasModel:
+    """Linear gas estimate for one disperseToken call
+
+    base_gas covers the transaction, the pull of the total into the contract and
+    the loop setup; per_recipient_gas an ERC20 transfer to a fresh holder (a new
+    balance slot) plus its 64 bytes of calldata. Transactions are sent with the
+    estimate times `safety` as their gas limit, and a batch may use
+    `block_fraction` of the block gas limit, leaving room for other transactions
+    in the block.
+    """
+
+    def __init__(self, base_gas: int = 60_000, per_recipient_gas: int = 32_000,
+                 block_gas_limit: int = 30_000_000, block_fraction: float = 0.5,
+                 safety: float = 1.25):
+        self.base_gas = base_gas
+        self.per_recipient_gas = per_recipient_gas
+        self.block_gas_limit = block_gas_limit
+        self.block_fraction = block_fraction
+        self.safety = safety
+
+    @classmethod
+    def from_env(cls) -> "GasModel":
+        return cls(
+            base_gas=int(os.getenv("DISPERSE_BASE_GAS", "60000")),
+            per_recipient_gas=int(os.getenv("DISPERSE_GAS_PER_RECIPIENT", "32000")),
+            block_gas_limit=int(os.getenv("DISPERSE_BLOCK_GAS_LIMIT", "30000000")),
+            block_fraction=float(os.getenv("DISPERSE_BLOCK_GAS_FRACTION", "0.5")),
+            safety=float(os.getenv("DISPERSE_GAS_SAFETY", "1.25")),
+        )
+
+    def estimate(self, recipients: int) -> int:
+        """Expected gas used by a batch"""
+        return self.base_gas + recipients * self.per_recipient_gas
+
+    def batch_gas(self, recipients: int) -> int:
+        """Gas limit to send a batch with"""
+        return math.ceil(self.estimate(recipients) * self.safety)
+
+    @property
+    def max_recipients(self) -> int:
+        budget = int(self.block_gas_limit * self.block_fraction / self.safety)
+        count = (budget - self.base_gas) // self.per_recipient_gas
+        if count < 1:
+            raise ValueError("Gas budget does not fit a single recipient")
+        return count
+
+
+def plan_batches(claims: List[Tuple[str, int, List[str]]], token: str, disperse: str,
+                 gas_model: GasModel) -> List[Dict[str, Any]]:
+    """Split (wallet, base units, contributors) claims into gas-bounded disperse batches
+
+    Claims are taken in the order given (the claim tree's, sorted by wallet) and
+    zero amounts are skipped, so the same claims always give the same calldata.
+    Batches are sized evenly rather than filling all but the last one.
+    """
+    claims = [claim for claim in claims if claim[1] > 0]
+    if not claims:
+        return []
+    count = -(-len(claims) // gas_model.max_recipients)
+    batches = []
+    for index in range(count):
+        # Sizes differ by at most one recipient
+        chunk = claims[index * len(claims) // count:(index + 1) * len(claims) // count]
+        recipients = [address for address, _, _ in chunk]
+        amounts = [amount for _, amount, _ in chunk]
+        batches.append({
+            "batch_index": index,
+            "token_address": token,
+            "disperse_address": disperse,
+            "recipients": recipients,
+            "amounts": [str(amount) for amount in amounts],
+            "total_units": str(sum(amounts)),
+            "gas_limit": gas_model.batch_gas(len(chunk)),
+            "calldata": "0x" + encode_disperse_token(token, recipients, amounts).hex(),
+        })
+    return batches
+
+
+def plan_version(batches: List[Dict[str, Any]]) -> str:
+    """Content hash of a plan; equal versions send byte-identical transactions"""
+    digest = hashlib.sha256()
+    for batch in batches:
+        digest.update(f"{batch['disperse_address']}:{batch['gas_limit']}:{batch['calldata']}\n".encode())
+    return digest.hexdigest()[:16]
+
+
+class PayoutRejected(Exception):
+    """The node refused the transaction, so it was definitely not broadcast"""
+
+
+class RpcError(Exception):
+    """JSON-RPC error response; for a send, the transaction may still have gone out"""
+
+    def __init__(self, message: str, code: Optional[int] = None):
+        super().__init__(message)
+        self.code = code
+
+
+# eth_sendTransaction errors raised before the transaction reaches the pool.
+# Reverts are included: a reverted transaction moves no tokens even if mined.
+# Anything else ("already known", "nonce too low", "replacement transaction
+# underpriced", timeouts) may mean an earlier attempt went out
+_PRE_BROADCAST_CODES = {-32600, -32601, -32602}
+_PRE_BROADCAST_MESSAGES = (
+    "insufficient funds",
+    "intrinsic gas too low",
+    "exceeds block gas limit",
+    "gas required exceeds allowance",
+    "execution reverted",
+    "unknown account",
+    "authentication needed",
+    "account locked",
+)
+
+
+def is_pre_broadcast_error(error: RpcError) -> bool:
+    message = str(error).lower()
+    if "replacement" in message or "already known" in message or "nonce" in message:
+        return False
+    return error.code in _PRE_BROADCAST_CODES or any(m in message for m in _PRE_BROADCAST_MESSAGES)
+
+
+class PayoutSender(Protocol):
+    async def send(self, to: str, data: str, gas: int) -> str:
+        """Submit a transaction; returns its hash. Raises PayoutRejected if refused"""
+
+    async def receipt(self, tx_hash: str) -> Optional[bool]:
+        """True if mined and succeeded, False if reverted, None if not mined yet"""
+
+
+class JsonRpcSender:
+    """Sends from an account the node manages (eth_sendTransaction)
+
+    Meant for a local dev chain (anvil, hardhat) or a signer proxy in front of a
+    node; the node holds the key for `from_address`. Each batch is first run
+    through eth_estimateGas, and the planned gas limit is raised to the node's
+    estimate times `estimate_margin` when that is higher.
+    """
+
+    def __init__(self, rpc_url: str, from_address: str, timeout: float = 30.0,
+                 estimate_margin: float = 1.2):
+        self.rpc_url = rpc_url
+        self.from_address = from_address
+        self.timeout = timeout
+        self.estimate_margin = estimate_margin
+        self._session = requests.Session()
+        self._id = 0
+
+    def _call(self, method: str, params: List[Any]) -> Any:
+        self._id += 1
+        response = self._session.post(
+            self.rpc_url,
+            json={"jsonrpc": "2.0", "id": self._id, "method": method, "params": params},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        body = response.json()
+        if "error" in body:
+            error = body["error"]
+            if not isinstance(error, dict):
+                raise RpcError(str(error))
+            raise RpcError(error.get("message", str(error)), error.get("code"))
+        return body["result"]
+
+    async def send(self, to: str, data: str, gas: int) -> str:
+        tx = {"from": self.from_address, "to": to, "data": data}
+        try:
+            estimate = int(await asyncio.to_thread(self._call, "eth_estimateGas", [tx]), 16)
+        except Exception as e:
+            # Nothing has been sent yet; a revert here also means the batch can't succeed
+            raise PayoutRejected(f"Gas estimation failed: {e}") from e
+        gas = max(gas, math.ceil(estimate * self.estimate_margin))
+        try:
+            return await asyncio.to_thread(self._call, "eth_sendTransaction", [dict(tx, gas=hex(gas))])
+        except RpcError as e:
+            if is_pre_broadcast_error(e):
+                raise PayoutRejected(str(e)) from e
+            raise
+
+    async def receipt(self, tx_hash: str) -> Optional[bool]:
+        result = await asyncio.to_thread(self._call, "eth_getTransactionReceipt", [tx_hash])
+        if result is None:
+            return None
+        return int(result["status"], 16) == 1
+
+
+class SimulatedSender:
+    """In-memory stand-in for a chain: decodes each batch and credits balances
+
+    Transactions are mined on submission. They revert if the gas limit is below
+    `gas_model`'s estimate (the gas a batch really uses on this "chain") or,
+    when `balances` (token -> sender balance) is given, if the sender's balance
+    would go negative.
+    """
+
+    def __init__(self, balances: Optional[Dict[str, int]] = None, from_address: str = "0x" + "00" * 20,
+                 gas_model: Optional[GasModel] = None):
+        self.from_address = from_address.lower()
+        self.unlimited = balances is None
+        self.balances: Dict[Tuple[str, str], int] = {}
+        for token, amount in (balances or {}).items():
+            self.balances[(token.lower(), self.from_address)] = amount
+        self.gas_model = gas_model
+        self.transactions: Dict[str, Dict[str, Any]] = {}
+
+    def balance(self, token: str, address: str) -> int:
+        return self.balances.get((token.lower(), address.lower()), 0)
+
+    async def send(self, to: str, data: str, gas: int) -> str:
+        calldata = bytes.fromhex(data[2:])
+        try:
+            token, recipients, amounts = decode_disperse_token(calldata)
+        except ValueError as e:
+            raise PayoutRejected(str(e))
+        tx_hash = "0x" + keccak(calldata + _word(len(self.transactions))).hex()
+        total = sum(amounts)
+        ok = self.unlimited or self.balance(token, self.from_address) >= total
+        if self.gas_model is not None and gas < self.gas_model.estimate(len(recipients)):
+            ok = False
+        if ok:
+            if not self.unlimited:
+                self.balances[(token, self.from_address)] -= total
+            for recipient, amount in zip(recipients, amounts):
+                key = (token, recipient.lower())
+                self.balances[key] = self.balances.get(key, 0) + amount
+        self.transactions[tx_hash] = {"to": to, "data": data, "gas": gas, "status": ok}
+        return tx_hash
+
+    async def receipt(self, tx_hash: str) -> Optional[bool]:
+        tx = self.transactions.get(tx_hash)
+        return None if tx is None else tx["status"]
+
+
+async def wait_for_receipt(sender: PayoutSender, tx_hash: str, timeout: float,
+                           poll_interval: float = 2.0,
+                           stop: Optional[asyncio.Event] = None) -> Optional[bool]:
+    """Poll for a receipt until `timeout` or `stop`; None if the transaction is still unmined"""
+    deadline = time.monotonic() + timeout
+    while True:
+        status = await sender.receipt(tx_hash)
+        if status is not None or time.monotonic() >= deadline or (stop and stop.is_set()):
+            return status
+        await asyncio.sleep(poll_interval)
+
+
+REVERTED = "Transaction reverted"
+
+
+async def execute_batches(adb: Any, repo_name: str, sender: PayoutSender,
+                          confirm_timeout: float = 120.0, retry_gas_bump: float = 1.5,
+                          max_gas: Optional[int] = None,
+                          stop: Optional[asyncio.Event] = None) -> List[Dict[str, Any]]:
+    """Send a repo's planned batches in order, resuming where a previous run stopped
+
+    A batch is claimed ('sending') before its transaction goes out, so two runs
+    never send it twice. Batches already submitted are checked for a receipt
+    instead of being resent. A reverted or rejected batch (status 'failed') moved
+    no tokens and is retried; after a revert, which may have been out of gas, its
+    gas limit is first raised by `retry_gas_bump`, up to `max_gas`. If a send
+    fails without a definite rejection, the batch is marked 'unknown' and the run
+    stops: it may or may not be on chain and must be reconciled by hand before
+    the payout continues. Setting `stop` ends the run at the next batch or
+    receipt poll; a submitted batch is picked up again by the next run.
+    """
+    for batch in await adb.get_payout_batches(repo_name):
+        if stop is not None and stop.is_set():
+            break
+        status = batch["status"]
+        if status == "confirmed":
+            continue
+        if status in ("sending", "unknown"):
+            break
+
+        if status == "submitted":
+            mined = await wait_for_receipt(sender, batch["tx_hash"], confirm_timeout, stop=stop)
+            if mined is None:
+                break
+            await adb.finish_payout_batch(batch["id"], "confirmed" if mined else "failed",
+                                          None if mined else REVERTED)
+            if mined:
+                continue
+            batch = dict(batch, status="failed", error=REVERTED)
+
+        gas = batch["gas_limit"]
+        if batch["status"] == "failed" and batch["error"] == REVERTED:
+            gas = math.ceil(gas * retry_gas_bump)
+            if max_gas is not None:
+                gas = max(min(gas, max_gas), batch["gas_limit"])
+        if not await adb.claim_payout_batch(batch["id"], gas):
+            # Another run is sending it
+            break
+        try:
+            tx_hash = await sender.send(batch["disperse_address"], batch["calldata"], gas)
+        except PayoutRejected as e:
+            await adb.finish_payout_batch(batch["id"], "failed", str(e))
+            break
+        except Exception as e:
+            await adb.finish_payout_batch(batch["id"], "unknown", str(e))
+            break
+        await adb.set_payout_batch_submitted(batch["id"], tx_hash)
+
+        mined = await wait_for_receipt(sender, tx_hash, confirm_timeout, stop=stop)
+        if mined is None:
+            break
+        await adb.finish_payout_batch(batch["id"], "confirmed" if mined else "failed",
+                                      None if mined else REVERTED)
+        if not mined:
+            break
+    return await adb.get_payout_batches(repo_name)
@@ -0,0 +1,62 @@
+# api/distribution_cache.py
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class DistributionCache:
+    """In-process LRU of computed token distributions, with a TTL
+
+    Writes that change a distribution (evaluations, airdrop info) call
+    `invalidate`. Each repo has a generation counter, so a computation that raced
+    with a write is not stored. The TTL bounds staleness for writes made by other
+    worker processes.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def get(self, repo_name: str) -> Tuple[Optional[Any], int]:
+        """(cached distribution or None, generation to pass to `put`)"""
+        with self._lock:
+            generation = self._generations.get(repo_name, 0)
+            entry = self._entries.get(repo_name)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(repo_name)
+                self._counters["hits"] += 1
+                return entry[1], generation
+            self._entries.pop(repo_name, None)
+            self._counters["misses"] += 1
+            return None, generation
+
+    def put(self, repo_name: str, value: Any, generation: int) -> None:
+        with self._lock:
+            if self._generations.get(repo_name, 0) != generation:
+                return
+            self._entries[repo_name] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(repo_name)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, repo_name: str) -> None:
+        with self._lock:
+            self._generations[repo_name] = self._generations.get(repo_name, 0) + 1
+            self._entries.pop(repo_name, None)
+            self._counters["invalidations"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._counters, entries=len(self._entries), max_entries=self.max_entries)
+
+
+distribution_cache = DistributionCache(
+    max_entries=int(os.getenv("DIST_CACHE_MAX_REPOS", "256")),
+    ttl=float(os.getenv("DIST_CACHE_TTL", "60")),
+)
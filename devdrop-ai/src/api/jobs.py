@@ -0,0 +1,226 @@
+# api/jobs.py
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+from .async_db import AsyncDatabaseOperations
+from .disperse import PayoutSender, execute_batches
+from .scheduler import BatchScheduler
+
+logger = logging.getLogger(__name__)
+
+Evaluator = Callable[[str, str], Awaitable[Dict[str, Any]]]
+
+
+class EvaluationJobManager:
+    """Runs batch evaluations as background jobs whose progress lives in Postgres
+
+    A job row is owned by whichever worker last claimed it and keeps heartbeating.
+    Jobs that were queued or whose runner stopped heartbeating (crash, restart)
+    are claimed again and continue with the pairs that are still pending.
+    """
+
+    def __init__(self, adb: AsyncDatabaseOperations,
+                 make_evaluator: Callable[[], Awaitable[Evaluator]],
+                 stale_after: Optional[float] = None, heartbeat_interval: float = 30.0,
+                 default_concurrency: int = 4):
+        self.adb = adb
+        self.make_evaluator = make_evaluator
+        self.default_concurrency = default_concurrency
+        self.stale_after = stale_after or float(os.getenv("EVAL_JOB_STALE_AFTER", "120"))
+        self.heartbeat_interval = heartbeat_interval
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._stops: Dict[int, asyncio.Event] = {}
+
+    async def submit(self, refresh: bool = False) -> Dict[str, Any]:
+        """Start a batch job, or resume/return the one already in progress
+
+        A refresh job revisits every synced pair, not just unevaluated ones;
+        evaluations whose inputs are unchanged are reused without an LLM call.
+        A refresh asked for while a plain job is in progress is queued to run
+        after it; the result then has `queued_behind` set to the running job.
+        """
+        job = await self.adb.get_active_evaluation_job()
+        queued_behind = None
+        if job is not None and refresh and not job["refresh"]:
+            queued_behind = job["id"]
+            job = await self.adb.create_evaluation_job(refresh=True)
+        elif job is None:
+            job = await self.adb.create_evaluation_job(refresh=refresh)
+        # Jobs run one at a time; this is a no-op while another worker's job is live
+        await self.resume()
+        result = await self.get(job["id"])
+        if queued_behind is not None and result["status"] == "queued":
+            result["queued_behind"] = queued_behind
+        return result
+
+    async def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        """Job progress including throughput and ETA"""
+        job = await self.adb.get_evaluation_job(job_id)
+        return _describe(job) if job else None
+
+    async def cancel(self, job_id: int) -> Optional[Dict[str, Any]]:
+        """Cancel a job; pairs already in flight are allowed to finish"""
+        job = await self.adb.cancel_evaluation_job(job_id)
+        if job is None:
+            return None
+        if job_id in self._stops:
+            self._stops[job_id].set()
+        return _describe(job)
+
+    async def resume(self) -> None:
+        """Pick up the oldest queued job or one abandoned by a dead runner"""
+        if self._tasks:
+            return
+        for job_id in await self.adb.get_resumable_evaluation_jobs(self.stale_after):
+            if await self._start(job_id):
+                return
+
+    async def shutdown(self) -> None:
+        """Stop local runners and requeue their jobs so the next start resumes them"""
+        tasks = list(self._tasks.items())
+        for _, task in tasks:
+            task.cancel()
+        for job_id, task in tasks:
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+            await self.adb.finish_evaluation_job(job_id, "queued")
+
+    async def _start(self, job_id: int) -> bool:
+        job = await self.adb.claim_evaluation_job(job_id, self.stale_after)
+        if job is None:
+            return False
+        stop = asyncio.Event()
+        self._stops[job_id] = stop
+        self._tasks[job_id] = asyncio.create_task(self._run(job, stop))
+        return True
+
+    async def _run(self, job: Dict[str, Any], stop: asyncio.Event) -> None:
+        job_id = job["id"]
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, stop))
+        try:
+            # Pairs this job already attempted and failed are not retried on resume
+            attempted = {(f["repo"], f["user"]) for f in job["failures"]}
+            # For a refresh, pairs evaluated (or confirmed unchanged) since the job started are done
+            evaluated_before = job["started_at"] if job["refresh"] else None
+            # Failed pairs are still pending, so they are counted but skipped below
+            pending = await self.adb.count_pending_pairs(evaluated_before)
+            await self.adb.set_evaluation_job_total(job_id, job["processed"] + max(0, pending - len(attempted)))
+            evaluate = await self.make_evaluator()
+
+            async def on_result(item, error: Optional[str]) -> None:
+                status = await self.adb.record_evaluation_job_result(job_id, item[0], item[1], error)
+                if status != "running":
+                    stop.set()
+
+            scheduler = BatchScheduler.from_env(default_concurrency=self.default_concurrency)
+            # Pairs are read and scheduled a page at a time, so memory stays flat
+            # however many contributor rows there are
+            async for page in self.adb.iter_pending_pair_pages(evaluated_before):
+                pairs = [pair for pair in page if pair not in attempted]
+                await scheduler.run(pairs, evaluate, on_result=on_result, stop=stop)
+                if stop.is_set():
+                    break
+            if not stop.is_set():
+                await self.adb.finish_evaluation_job(job_id, "completed")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception("Evaluation job %s failed", job_id)
+            await self.adb.finish_evaluation_job(job_id, "failed", f"Batch evaluation failed: {str(e)}")
+        finally:
+            heartbeat.cancel()
+            self._tasks.pop(job_id, None)
+            self._stops.pop(job_id, None)
+        # Run whatever was queued behind this job, such as a refresh
+        try:
+            await self.resume()
+        except Exception:
+            logger.exception("Could not start the next evaluation job after %s", job_id)
+
+    async def _heartbeat(self, job_id: int, stop: asyncio.Event) -> None:
+        while not stop.is_set():
+            await asyncio.sleep(self.heartbeat_interval)
+            status = await self.adb.heartbeat_evaluation_job(job_id)
+            if status != "running":
+                stop.set()
+
+
+class PayoutJobManager:
+    """Runs payouts in the background, one runner per repo in this process
+
+    Progress lives in the payout_batches rows, so there is no separate job row:
+    a payout that stopped (restart, confirmation timeout, failed batch) resumes
+    from its batches' status when started again, and batch claims keep runners
+    in other workers from sending the same batch.
+    """
+
+    def __init__(self, adb: AsyncDatabaseOperations, run_options: Callable[[], Dict[str, Any]]):
+        self.adb = adb
+        self.run_options = run_options
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._stops: Dict[str, asyncio.Event] = {}
+        self._errors: Dict[str, str] = {}
+
+    def start(self, repo_name: str, sender: PayoutSender) -> bool:
+        """Start sending a repo's unpaid batches; False if already running here"""
+        if repo_name in self._tasks:
+            return False
+        self._errors.pop(repo_name, None)
+        stop = asyncio.Event()
+        self._stops[repo_name] = stop
+        self._tasks[repo_name] = asyncio.create_task(self._run(repo_name, sender, stop))
+        return True
+
+    def status(self, repo_name: str) -> Dict[str, Any]:
+        return {"running": repo_name in self._tasks, "runner_error": self._errors.get(repo_name)}
+
+    async def shutdown(self) -> None:
+        """Stop runners at their next batch or receipt poll and wait for them"""
+        for stop in self._stops.values():
+            stop.set()
+        tasks = list(self._tasks.values())
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self, repo_name: str, sender: PayoutSender, stop: asyncio.Event) -> None:
+        try:
+            await execute_batches(self.adb, repo_name, sender, stop=stop, **self.run_options())
+        except Exception as e:
+            logger.exception("Payout of %s stopped", repo_name)
+            self._errors[repo_name] = str(e)
+        finally:
+            self._tasks.pop(repo_name, None)
+            self._stops.pop(repo_name, None)
+
+
+def _describe(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Public view of a job row with throughput (pairs/minute) and ETA (seconds)"""
+    throughput = None
+    eta_seconds = None
+    if job["status"] == "running" and job["run_started_at"]:
+        elapsed = (datetime.now(timezone.utc) - job["run_started_at"]).total_seconds()
+        done = job["processed"] - job["run_start_processed"]
+        if elapsed > 0 and done > 0:
+            per_second = done / elapsed
+            throughput = round(per_second * 60, 2)
+            eta_seconds = round(max(job["total"] - job["processed"], 0) / per_second)
+
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "total": job["total"],
+        "processed": job["processed"],
+        "failed": job["failed"],
+        "failures": job["failures"],
+        "throughput_per_minute": throughput,
+        "eta_seconds": eta_seconds,
+        "failure_reason": job["error"],
+        "refresh": job["refresh"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+    }
@@ -0,0 +1,168 @@
+# api/merkle.py
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from eth_utils import keccak
+
+
+def claim_leaf(address: str, amount: int) -> bytes:
+    """keccak256(abi.encodePacked(address, uint256 amount)), as tokenClaim.sol checks"""
+    raw = bytes.fromhex(address[2:] if address.startswith("0x") else address)
+    if len(raw) != 20:
+        raise ValueError(f"Invalid address: {address}")
+    return keccak(raw + amount.to_bytes(32, "big"))
+
+
+def _hash_pair(a: bytes, b: bytes) -> bytes:
+    # Sorted pairs, as OpenZeppelin's MerkleProof and merkletreejs' sortPairs expect
+    return keccak(a + b if a <= b else b + a)
+
+
+class MerkleTree:
+    """keccak Merkle tree laid out like merkletreejs with `sortPairs: true`
+
+    Leaves are used as given (already hashed) and an odd node at the end of a
+    layer is carried up unchanged, so roots and proofs match the web app's.
+    """
+
+    def __init__(self, leaves: List[bytes]):
+        if not leaves:
+            raise ValueError("Cannot build a Merkle tree without leaves")
+        self.layers = [list(leaves)]
+        while len(self.layers[-1]) > 1:
+            layer = self.layers[-1]
+            parents = [_hash_pair(layer[i], layer[i + 1]) for i in range(0, len(layer) - 1, 2)]
+            if len(layer) % 2:
+                parents.append(layer[-1])
+            self.layers.append(parents)
+
+    @property
+    def root(self) -> bytes:
+        return self.layers[-1][0]
+
+    def proof(self, index: int) -> List[bytes]:
+        """Sibling hashes from leaf `index` up to the root"""
+        proof = []
+        for layer in self.layers[:-1]:
+            sibling = index ^ 1
+            if sibling < len(layer):
+                proof.append(layer[sibling])
+            index //= 2
+        return proof
+
+
+class ClaimTree:
+    """Merkle tree over a distribution's (wallet, base units) claims"""
+
+    def __init__(self, version: str, claims: List[Tuple[str, int, List[str]]], missing_wallets: List[str]):
+        self.version = version
+        self.claims = claims
+        self.missing_wallets = missing_wallets
+        self.tree = MerkleTree([claim_leaf(address, amount) for address, amount, _ in claims])
+        self._by_address = {address.lower(): i for i, (address, _, _) in enumerate(claims)}
+        self._by_contributor = {
+            contributor: i for i, (_, _, contributors) in enumerate(claims) for contributor in contributors
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "merkle_root": "0x" + self.tree.root.hex(),
+            "version": self.version,
+            "leaves": len(self.claims),
+            "total_units": str(sum(amount for _, amount, _ in self.claims)),
+            "missing_wallets": self.missing_wallets,
+        }
+
+    def proof(self, address: Optional[str] = None, contributor: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Claim amount and proof for a wallet or contributor, or None if it has no claim"""
+        if address is not None:
+            index = self._by_address.get(address.lower())
+        else:
+            index = self._by_contributor.get(contributor)
+        if index is None:
+            return None
+        address, amount, contributors = self.claims[index]
+        return {
+            "address": address,
+            "amount": str(amount),
+            "contributors": contributors,
+            "proof": ["0x" + node.hex() for node in self.tree.proof(index)],
+            "merkle_root": "0x" + self.tree.root.hex(),
+            "version": self.version,
+        }
+
+
+def _claims(distribution: List[Dict[str, Any]],
+            wallets: Dict[str, str]) -> Tuple[List[Tuple[str, int, List[str]]], List[str]]:
+    """One claim per wallet (contributors sharing a wallet are summed), in a stable order
+
+    `wallets` maps contributors to checksummed addresses, as stored.
+    """
+    by_address: Dict[str, Tuple[int, List[str]]] = {}
+    missing = []
+    for entry in distribution:
+        amount = int(entry["token_units"])
+        wallet = wallets.get(entry["contributor"])
+        if wallet is None:
+            missing.append(entry["contributor"])
+            continue
+        if amount == 0:
+            continue
+        total, contributors = by_address.get(wallet, (0, []))
+        by_address[wallet] = (total + amount, contributors + [entry["contributor"]])
+    claims = [(address, total, sorted(contributors)) for address, (total, contributors) in sorted(by_address.items())]
+    return claims, sorted(missing)
+
+
+class ClaimTreeCache:
+    """Claim trees per repo, rebuilt only when the distribution or wallets change
+
+    `lookup` is an identity check against the distribution object the tree was
+    built from (the distribution cache hands out the same list until it changes);
+    `build` compares a content hash, so a recomputed but identical distribution
+    reuses the existing tree.
+    """
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Any, ClaimTree]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, repo_name: str, distribution: List[Dict[str, Any]]) -> Optional[ClaimTree]:
+        with self._lock:
+            entry = self._entries.get(repo_name)
+            if entry is not None and entry[0] is distribution:
+                self._entries.move_to_end(repo_name)
+                return entry[1]
+            return None
+
+    def build(self, repo_name: str, distribution: List[Dict[str, Any]], wallets: Dict[str, str]) -> ClaimTree:
+        claims, missing = _claims(distribution, wallets)
+        digest = hashlib.sha256()
+        for address, amount, _ in claims:
+            digest.update(f"{address}:{amount}\n".encode())
+        version = digest.hexdigest()[:16]
+
+        with self._lock:
+            entry = self._entries.get(repo_name)
+        if entry is not None and entry[1].version == version and entry[1].missing_wallets == missing:
+            tree = entry[1]
+        else:
+            tree = ClaimTree(version, claims, missing)
+        with self._lock:
+            self._entries[repo_name] = (distribution, tree)
+            self._entries.move_to_end(repo_name)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return tree
+
+    def invalidate(self) -> None:
+        """Forget every repo's distribution identity (e.g. after a wallet change)"""
+        with self._lock:
+            self._entries = OrderedDict(
+                (repo, (None, tree)) for repo, (_, tree) in self._entries.items()
+            )
+
+
+claim_trees = ClaimTreeCache()
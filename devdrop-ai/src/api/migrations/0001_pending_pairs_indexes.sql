@@ -0,0 +1,13 @@
+-- Indexes for the pending evaluation pair scans (schema.sql creates them on new
+-- databases). CONCURRENTLY builds without blocking writes but can't run inside a
+-- transaction block, so apply this file with plain `psql -f`, not `psql -1`.
+-- A build that fails leaves an INVALID index behind: drop it and run again.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS contributor_data_repo_contributor_idx
+    ON contributor_data (repo_name, contributor);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS contribution_evaluations_repo_contributor_idx
+    ON contribution_evaluations (repo_name, contributor) INCLUDE (evaluated_at);
+
+ANALYZE contributor_data;
+ANALYZE contribution_evaluations;
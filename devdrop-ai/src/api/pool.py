@@ -0,0 +1,181 @@
+# api/pool.py
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+import psycopg2
+from psycopg2 import pool as pg_pool
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection becomes available in time"""
+
+
+class ConnectionPool:
+    """Bounded, thread-safe Postgres connection pool with checkout health checks"""
+
+    def __init__(self, db_url: str, min_size: int = 1, max_size: int = 10,
+                 timeout: float = 30.0, healthcheck_interval: float = 30.0):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError(f"Invalid pool size: min={min_size}, max={max_size}")
+        self.db_url = db_url
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.healthcheck_interval = healthcheck_interval
+
+        # ThreadedConnectionPool raises instead of blocking when exhausted, so the
+        # semaphore is what bounds concurrent checkouts and makes callers wait
+        self._pool = pg_pool.ThreadedConnectionPool(min_size, max_size, db_url)
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._last_used: Dict[int, float] = {}
+        self._metrics = {
+            "checkouts": 0,
+            "in_use": 0,
+            # ThreadedConnectionPool opens min_size connections up front and keeps
+            # at most min_size idle, closing any connection returned beyond that
+            "idle": min_size,
+            "peak_in_use": 0,
+            "wait_time_total": 0.0,
+            "timeouts": 0,
+            "discarded": 0,
+        }
+
+    def checkout(self):
+        """Take a healthy connection from the pool, waiting up to `timeout` seconds"""
+        started = time.monotonic()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self._metrics["timeouts"] += 1
+            raise PoolTimeoutError(
+                f"No database connection available after {self.timeout}s "
+                f"(max_size={self.max_size})"
+            )
+
+        try:
+            conn = self._get_healthy_connection()
+        except Exception:
+            self._slots.release()
+            raise
+
+        waited = time.monotonic() - started
+        with self._lock:
+            self._metrics["checkouts"] += 1
+            self._metrics["in_use"] += 1
+            self._metrics["wait_time_total"] += waited
+            self._metrics["peak_in_use"] = max(self._metrics["peak_in_use"], self._metrics["in_use"])
+        return conn
+
+    def checkin(self, conn) -> None:
+        """Return a connection to the pool, dropping it if it is no longer usable"""
+        try:
+            broken = bool(conn.closed)
+            if not broken and conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    broken = True
+            if broken:
+                with self._lock:
+                    self._metrics["discarded"] += 1
+                    self._last_used.pop(id(conn), None)
+            else:
+                with self._lock:
+                    self._last_used[id(conn)] = time.monotonic()
+                    self._metrics["idle"] = min(self._metrics["idle"] + 1, self.min_size)
+            self._pool.putconn(conn, close=broken)
+        finally:
+            with self._lock:
+                self._metrics["in_use"] -= 1
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection for the duration of a transaction block"""
+        conn = self.checkout()
+        try:
+            with conn:
+                yield conn
+        finally:
+            self.checkin(conn)
+
+    def _get_healthy_connection(self):
+        # Retry once per pool slot so a batch of stale connections (e.g. after a
+        # database restart) is flushed instead of surfacing to the caller
+        for _ in range(self.max_size + 1):
+            conn = self._pool.getconn()
+            with self._lock:
+                # Taken from the idle list, or newly opened when it was empty
+                self._metrics["idle"] = max(self._metrics["idle"] - 1, 0)
+            if self._is_healthy(conn):
+                return conn
+            with self._lock:
+                self._metrics["discarded"] += 1
+                self._last_used.pop(id(conn), None)
+            self._pool.putconn(conn, close=True)
+        raise psycopg2.OperationalError("Could not obtain a healthy database connection")
+
+    def _is_healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+        with self._lock:
+            last_used = self._last_used.get(id(conn))
+        # Only ping connections that sat idle long enough to have been dropped
+        if last_used is not None and time.monotonic() - last_used < self.healthcheck_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of pool usage metrics"""
+        with self._lock:
+            stats = dict(self._metrics)
+        stats["open"] = stats["idle"] + stats["in_use"]
+        stats["min_size"] = self.min_size
+        stats["max_size"] = self.max_size
+        stats["avg_wait_time"] = (
+            stats["wait_time_total"] / stats["checkouts"] if stats["checkouts"] else 0.0
+        )
+        return stats
+
+    def close(self) -> None:
+        """Close every connection held by the pool"""
+        self._pool.closeall()
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_url: Optional[str] = None) -> ConnectionPool:
+    """Return the process-wide pool for a database URL, creating it on first use"""
+    db_url = db_url or os.getenv("DB_URL")
+    if not db_url:
+        raise ValueError("DB_URL environment variable is not set")
+    with _pools_lock:
+        pool = _pools.get(db_url)
+        if pool is None:
+            pool = ConnectionPool(
+                db_url,
+                min_size=int(os.getenv("DB_POOL_MIN_SIZE", "1")),
+                max_size=int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+                timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+                healthcheck_interval=float(os.getenv("DB_POOL_HEALTHCHECK_INTERVAL", "30")),
+            )
+            _pools[db_url] = pool
+        return pool
+
+
+def close_pools() -> None:
+    """Close all pools (used on application shutdown)"""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
@@ -1,58 +1,147 @@
-from fastapi import APIRouter, HTTPException
-from typing import Dict, Any, List
-from .schemas import ChatRequest, ChatResponse
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, List, Optional
+from .auth import github_login, is_admin, require_admin
+from .schemas import ChatRequest, ChatResponse, ContributorWallet, PayoutPlanRequest
 from .service import (
     process_chat, 
+    stream_chat,
     evaluate_contributor, 
     evaluate_all_contributors,
-    get_token_distribution  
+    get_evaluation_job,
+    cancel_evaluation_job,
+    get_token_distribution,
+    score_repository,
+    get_claim_root,
+    get_claim_proof,
+    set_contributor_wallet,
+    plan_payout,
+    execute_payout,
+    get_payout,
+    get_db_pool_stats,
+    get_github_stats
 )
 
 router = APIRouter(tags=['AgentQuery'])
 
 @router.post("/chat", response_model=ChatResponse)
-def chat_endpoint(request: ChatRequest):
+async def chat_endpoint(request: ChatRequest):
     """
     Process chat messages using the agent
     """
-    return process_chat(request)
+    return await process_chat(request)
+
+@router.post("/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    """
+    Process chat messages using the agent, streamed as server-sent events
+    
+    Emits a `thread` event with the conversation's thread_id, `token` events with
+    model output, `tool_start`/`tool_end` events for tool calls, then `done` (or `error`).
+    """
+    return StreamingResponse(
+        stream_chat(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.get("/evaluate_contributor", response_model=Dict[str, Any])
-async def evaluate_contributor_endpoint(repo_name: str, username: str):
+async def evaluate_contributor_endpoint(repo_name: str, username: str, force: bool = False):
     """
     Evaluate a contributor's GitHub activity for a specific repository
     
     Args:
         repo_name: Name of the GitHub repository
         username: GitHub username of the contributor
+        force: Re-run the LLM evaluation even if the contributor's data is unchanged
     
     Returns:
         Dict containing evaluation results or error message
     """
     try:
-        result = await evaluate_contributor(repo_name, username)
+        result = await evaluate_contributor(repo_name, username, force=force)
         if "error" in result:
             raise HTTPException(status_code=404, detail=result["error"])
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/evaluate_all_contributors", response_model=Dict[str, Any])
-async def evaluate_all_contributors_endpoint():
+@router.post("/evaluate_all_contributors", response_model=Dict[str, Any], status_code=202)
+async def evaluate_all_contributors_endpoint(refresh: bool = False):
     """
-    Evaluate all contributors in the database that haven't been evaluated yet
+    Start a background job evaluating all contributors that haven't been evaluated yet.
+    If a job is already in progress it is returned instead; an interrupted job resumes
+    from the pairs that are still pending. A refresh asked for during a plain job is
+    queued behind it (`queued_behind` is the running job's id).
+    
+    Args:
+        refresh: Also revisit evaluated contributors; only changed ones are re-evaluated
     
     Returns:
-        Dict containing batch evaluation results and progress information
+        Dict containing the job id and its progress information
     """
     try:
-        result = await evaluate_all_contributors()
+        result = await evaluate_all_contributors(refresh=refresh)
         if "error" in result:
             raise HTTPException(status_code=500, detail=result["error"])
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/evaluation_jobs", response_model=Dict[str, Any], status_code=202)
+async def submit_evaluation_job_endpoint(refresh: bool = False):
+    """
+    Submit a background batch evaluation job (same as /evaluate_all_contributors)
+    """
+    return await evaluate_all_contributors_endpoint(refresh=refresh)
+
+@router.get("/evaluation_jobs/{job_id}", response_model=Dict[str, Any])
+async def get_evaluation_job_endpoint(job_id: int):
+    """
+    Poll a batch evaluation job
+    
+    Args:
+        job_id: Id returned when the job was submitted
+    
+    Returns:
+        Dict with status, processed/failed counts, throughput (pairs/minute) and ETA (seconds)
+    """
+    result = await get_evaluation_job(job_id)
+    if "error" in result:
+        raise HTTPException(status_code=404, detail=result["error"])
+    return result
+
+@router.post("/evaluation_jobs/{job_id}/cancel", response_model=Dict[str, Any])
+async def cancel_evaluation_job_endpoint(job_id: int):
+    """
+    Cancel a queued or running batch evaluation job
+    
+    Args:
+        job_id: Id returned when the job was submitted
+    """
+    result = await cancel_evaluation_job(job_id)
+    if "error" in result:
+        raise HTTPException(status_code=404, detail=result["error"])
+    return result
+
+@router.post("/score_repository/{repo_name}", response_model=Dict[str, Any])
+async def score_repository_endpoint(repo_name: str):
+    """
+    Score all synced contributors of a repository with the rule-based scorer
+    
+    Args:
+        repo_name: Name of the GitHub repository
+    
+    Returns:
+        Dict with the number of contributors scored and those left for LLM evaluation
+    """
+    result = await score_repository(repo_name)
+    if "error" in result:
+        raise HTTPException(status_code=404, detail=result["error"])
+    return result
+
 @router.get("/token-distribution/{repo_name}", response_model=List[Dict[str, Any]])
 async def get_token_distribution_endpoint(repo_name: str):
     """
@@ -71,3 +160,123 @@ async def get_token_distribution_endpoint(repo_name: str):
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/contributor-wallets", response_model=Dict[str, Any])
+async def set_contributor_wallet_endpoint(request: ContributorWallet,
+                                          authorization: Optional[str] = Header(None),
+                                          x_admin_key: Optional[str] = Header(None)):
+    """
+    Link a contributor's GitHub username to the wallet their airdrop is claimed with
+    
+    The caller proves they own the account with its GitHub OAuth token
+    (`Authorization: Bearer <token>`). A wallet that is already linked can only be
+    replaced by an operator (`X-Admin-Key`).
+    """
+    admin = is_admin(x_admin_key)
+    contributor = request.contributor
+    if not admin:
+        login = await github_login(authorization)
+        if login is None:
+            raise HTTPException(status_code=401, detail="A valid GitHub token is required")
+        if login.lower() != contributor.lower():
+            raise HTTPException(status_code=403, detail=f"Token does not belong to {contributor}")
+        # GitHub logins are case-insensitive; store the canonical spelling
+        contributor = login
+    result = await set_contributor_wallet(contributor, request.wallet_address, overwrite=admin)
+    if "error" in result:
+        status_code = 409 if "already has" in result["error"] else 400
+        raise HTTPException(status_code=status_code, detail=result["error"])
+    return result
+
+@router.get("/claims/{repo_name}/root", response_model=Dict[str, Any])
+async def get_claim_root_endpoint(repo_name: str):
+    """
+    Get the Merkle root over (wallet, amount) claims of a repository's distribution
+    
+    Args:
+        repo_name: Name of the GitHub repository
+    
+    Returns:
+        Dict with the root, tree version, leaf count, total base units and
+        contributors left out because they have no linked wallet
+    """
+    result = await get_claim_root(repo_name)
+    if "error" in result:
+        raise HTTPException(status_code=404, detail=result["error"])
+    return result
+
+@router.get("/claims/{repo_name}/proof", response_model=Dict[str, Any])
+async def get_claim_proof_endpoint(repo_name: str, address: Optional[str] = None,
+                                   contributor: Optional[str] = None):
+    """
+    Get the claim amount and Merkle proof for one wallet or contributor
+    
+    Args:
+        repo_name: Name of the GitHub repository
+        address: Claiming wallet address
+        contributor: GitHub username (alternative to address)
+    
+    Returns:
+        Dict with the amount in token base units and the proof for claimToken
+    """
+    result = await get_claim_proof(repo_name, address=address, contributor=contributor)
+    if "error" in result:
+        raise HTTPException(status_code=404, detail=result["error"])
+    return result
+
+@router.post("/payouts/{repo_name}/plan", response_model=Dict[str, Any], dependencies=[Depends(require_admin)])
+async def plan_payout_endpoint(repo_name: str, request: PayoutPlanRequest):
+    """
+    Plan the on-chain payout of a repository's distribution as disperseToken batches
+    (operators only: requires X-Admin-Key)
+    
+    Args:
+        repo_name: Name of the GitHub repository
+        request: Token and disperse contract addresses
+    
+    Returns:
+        Dict with the plan version and each batch's recipients, gas limit and calldata
+    """
+    result = await plan_payout(repo_name, request.token_address, request.disperse_address)
+    if "error" in result:
+        raise HTTPException(status_code=409 if "under way" in result["error"] else 400, detail=result["error"])
+    return result
+
+@router.post("/payouts/{repo_name}/execute", response_model=Dict[str, Any], status_code=202,
+             dependencies=[Depends(require_admin)])
+async def execute_payout_endpoint(repo_name: str):
+    """
+    Start sending the planned batches that haven't been paid yet, in the background;
+    safe to call again to resume (operators only: requires X-Admin-Key)
+    
+    Returns:
+        Dict with the plan's batch statuses; poll GET /payouts/{repo_name} for progress
+    """
+    result = await execute_payout(repo_name)
+    if "error" in result:
+        raise HTTPException(status_code=400, detail=result["error"])
+    return result
+
+@router.get("/payouts/{repo_name}", response_model=Dict[str, Any], dependencies=[Depends(require_admin)])
+async def get_payout_endpoint(repo_name: str, include_calldata: bool = False):
+    """
+    Get the status of each batch of a repository's payout (operators only)
+    """
+    result = await get_payout(repo_name, include_calldata=include_calldata)
+    if "error" in result:
+        raise HTTPException(status_code=404, detail=result["error"])
+    return result
+
+@router.get("/db/pool-stats", response_model=Dict[str, Any])
+def db_pool_stats_endpoint():
+    """
+    Get usage metrics for the shared database connection pool
+    """
+    return get_db_pool_stats()
+
+@router.get("/github/stats", response_model=Dict[str, Any])
+def github_stats_endpoint():
+    """
+    Get GitHub token rate-limit budgets and HTTP cache hit/miss counters
+    """
+    return get_github_stats()
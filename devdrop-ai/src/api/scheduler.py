@@ -0,0 +1,180 @@
+# api/scheduler.py
+import asyncio
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count used for rate limiting (~4 characters per token)"""
+    return max(1, len(text) // 4)
+
+
+class RateLimiter:
+    """Token bucket that refills `per_minute` units evenly over a minute"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self._available = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, amount: float = 1) -> None:
+        # Requests bigger than the bucket would never fit; let them drain it instead
+        amount = min(float(amount), self.capacity)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._available = min(self.capacity, self._available + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._available >= amount:
+                    self._available -= amount
+                    return
+                await asyncio.sleep((amount - self._available) / self.rate)
+
+
+class SharedBackoff:
+    """Exponential backoff shared by all workers hitting the same upstreams
+
+    One worker seeing a rate-limit error pauses every worker, instead of each
+    retrying on its own schedule and hammering the API in the meantime.
+    """
+
+    def __init__(self, base_delay: float = 2.0, max_delay: float = 120.0):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._failures = 0
+        self._resume_at = 0.0
+
+    async def wait(self) -> None:
+        delay = self._resume_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def failure(self) -> float:
+        delay = min(self.max_delay, self.base_delay * (2 ** self._failures))
+        delay *= random.uniform(0.8, 1.2)
+        self._failures += 1
+        self._resume_at = max(self._resume_at, time.monotonic() + delay)
+        return delay
+
+    def success(self) -> None:
+        self._failures = 0
+
+
+class ResourceLimits:
+    """Per-resource limits for external calls made while evaluating contributors
+
+    GitHub requests are limited per token by GitHubClientPool, which holds the
+    selected token's slot (GITHUB_CONCURRENCY_PER_TOKEN) around each request.
+    Here the number of crawls in flight is bounded so that worker threads don't
+    pile up waiting on those slots.
+    """
+
+    def __init__(self, github_tokens: int = 1, github_per_token: int = 2,
+                 groq_requests_per_minute: float = 30, groq_tokens_per_minute: float = 6000):
+        self._github = asyncio.Semaphore(max(1, github_tokens) * github_per_token)
+        self._groq_requests = RateLimiter(groq_requests_per_minute)
+        self._groq_tokens = RateLimiter(groq_tokens_per_minute)
+
+    @classmethod
+    def from_env(cls, github_tokens: int = 1) -> "ResourceLimits":
+        return cls(
+            github_tokens=github_tokens,
+            github_per_token=int(os.getenv("GITHUB_CONCURRENCY_PER_TOKEN", "2")),
+            groq_requests_per_minute=float(os.getenv("GROQ_REQUESTS_PER_MINUTE", "30")),
+            groq_tokens_per_minute=float(os.getenv("GROQ_TOKENS_PER_MINUTE", "6000")),
+        )
+
+    @asynccontextmanager
+    async def github(self):
+        """Slot for one contributor crawl, enough crawls to keep every token busy"""
+        async with self._github:
+            yield
+
+    @asynccontextmanager
+    async def groq(self, tokens: int):
+        await self._groq_requests.acquire(1)
+        await self._groq_tokens.acquire(tokens)
+        yield
+
+
+def is_rate_limited(result: Dict[str, Any]) -> bool:
+    return "error" in result and "rate limit" in str(result["error"]).lower()
+
+
+class BatchScheduler:
+    """Runs a handler over many items with bounded concurrency and shared retries"""
+
+    def __init__(self, concurrency: int = 4, max_retries: int = 3,
+                 backoff: Optional[SharedBackoff] = None,
+                 is_retryable: Callable[[Dict[str, Any]], bool] = is_rate_limited):
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.backoff = backoff or SharedBackoff()
+        self.is_retryable = is_retryable
+
+    @classmethod
+    def from_env(cls, default_concurrency: int = 4) -> "BatchScheduler":
+        """EVAL_CONCURRENCY when set, otherwise `default_concurrency`"""
+        return cls(
+            concurrency=int(os.getenv("EVAL_CONCURRENCY", str(default_concurrency))),
+            max_retries=int(os.getenv("EVAL_MAX_RETRIES", "3")),
+            backoff=SharedBackoff(base_delay=float(os.getenv("EVAL_BACKOFF_BASE", "2"))),
+        )
+
+    async def run(self, items: Iterable[Tuple],
+                  handler: Callable[..., Awaitable[Dict[str, Any]]],
+                  on_result: Optional[Callable[[Tuple, Optional[str]], Awaitable[None]]] = None,
+                  stop: Optional[asyncio.Event] = None) -> Dict[str, Any]:
+        """Call `handler(*item)` for every item; returns processed count and failures
+
+        `on_result(item, error)` is awaited once per item after its final attempt,
+        with `error` set to None on success. Setting `stop` lets in-flight items
+        finish but starts no new ones.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        for item in items:
+            queue.put_nowait((tuple(item), 0))
+
+        processed = 0
+        failed: List[Dict[str, Any]] = []
+
+        async def finish(item: Tuple, error: Optional[str]) -> None:
+            nonlocal processed
+            processed += 1
+            if error is not None:
+                failed.append({"repo": item[0], "user": item[1], "error": error})
+            if on_result:
+                await on_result(item, error)
+
+        async def worker() -> None:
+            while not (stop and stop.is_set()):
+                try:
+                    item, attempt = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                await self.backoff.wait()
+                try:
+                    result = await handler(*item)
+                    error = result.get("error")
+                    retryable = self.is_retryable(result)
+                except Exception as e:
+                    error = str(e)
+                    retryable = True
+
+                if error is None:
+                    self.backoff.success()
+                    await finish(item, None)
+                elif retryable and attempt < self.max_retries:
+                    self.backoff.failure()
+                    # Requeue at the back so other items make progress meanwhile
+                    queue.put_nowait((item, attempt + 1))
+                else:
+                    await finish(item, error)
+
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        return {"processed": processed, "failed": failed}
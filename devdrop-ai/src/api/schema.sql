@@ -8,6 +8,68 @@ CREATE TABLE IF NOT EXISTS contributor_data (
     PRIMARY KEY (contributor, repo_name)
 );
 
+-- Pending-pair scans filter by repo and page in (repo_name, contributor) order;
+-- the primary key leads with contributor
+CREATE INDEX IF NOT EXISTS contributor_data_repo_contributor_idx
+    ON contributor_data (repo_name, contributor);
+
+-- Create contributor_commits table (one row per synced commit)
+CREATE TABLE IF NOT EXISTS contributor_commits (
+    repo_name VARCHAR(255) NOT NULL,
+    contributor VARCHAR(255) NOT NULL,
+    sha VARCHAR(64) NOT NULL,
+    committed_at TIMESTAMP WITH TIME ZONE,
+    message TEXT NOT NULL,
+    lines_changed INTEGER NOT NULL DEFAULT 0,
+    files_changed INTEGER NOT NULL DEFAULT 0,
+    closes_issue BOOLEAN NOT NULL DEFAULT FALSE,
+    issue_labels JSONB NOT NULL DEFAULT '[]'::jsonb,
+    PRIMARY KEY (repo_name, contributor, sha)
+);
+
+CREATE INDEX IF NOT EXISTS contributor_commits_committed_at_idx
+    ON contributor_commits (repo_name, contributor, committed_at);
+
+-- Split line counts used by the rule-based scorer (NULL for commits synced before)
+ALTER TABLE contributor_commits ADD COLUMN IF NOT EXISTS additions INTEGER;
+ALTER TABLE contributor_commits ADD COLUMN IF NOT EXISTS deletions INTEGER;
+
+-- Move commits from the legacy contributor_data.contributions->detailed_commits
+-- array into contributor_commits (entries without a sha predate incremental sync
+-- and are re-fetched on the next full sync)
+INSERT INTO contributor_commits
+    (repo_name, contributor, sha, committed_at, message, lines_changed,
+     files_changed, closes_issue, issue_labels)
+SELECT
+    cd.repo_name,
+    cd.contributor,
+    c->>'sha',
+    (c->>'committedAt')::timestamptz,
+    COALESCE(c->>'commitMessage', ''),
+    COALESCE((c->>'linesChanged')::integer, 0),
+    COALESCE((c->>'filesChanged')::integer, 0),
+    COALESCE((c->>'closesIssue')::boolean, FALSE),
+    COALESCE(c->'issueLabels', '[]'::jsonb)
+FROM contributor_data cd
+CROSS JOIN LATERAL jsonb_array_elements(cd.contributions->'detailed_commits') c
+WHERE jsonb_typeof(cd.contributions->'detailed_commits') = 'array'
+AND c ? 'sha'
+ON CONFLICT (repo_name, contributor, sha) DO NOTHING;
+
+UPDATE contributor_data
+SET contributions = contributions - 'detailed_commits'
+WHERE contributions ? 'detailed_commits';
+
+-- Create contributor_sync_state table (last synced commit per contributor)
+CREATE TABLE IF NOT EXISTS contributor_sync_state (
+    contributor VARCHAR(255) NOT NULL,
+    repo_name VARCHAR(255) NOT NULL,
+    last_sha VARCHAR(64),
+    last_commit_at TIMESTAMP WITH TIME ZONE,
+    synced_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (contributor, repo_name)
+);
+
 -- Create contribution_evaluations table
 CREATE TABLE IF NOT EXISTS contribution_evaluations (
     contributor VARCHAR(255) NOT NULL,
@@ -18,6 +80,38 @@ CREATE TABLE IF NOT EXISTS contribution_evaluations (
     PRIMARY KEY (contributor, repo_name)
 );
 
+-- Anti-join side of the pending-pair scans, in the same order as the scan;
+-- evaluated_at is included for the refresh job's staleness check
+CREATE INDEX IF NOT EXISTS contribution_evaluations_repo_contributor_idx
+    ON contribution_evaluations (repo_name, contributor) INCLUDE (evaluated_at);
+
+-- Hash of the LLM evaluation inputs (model, prompt version, commit data); an
+-- unchanged hash lets the stored evaluation be reused. NULL for rule-based scores
+ALTER TABLE contribution_evaluations ADD COLUMN IF NOT EXISTS input_hash VARCHAR(64);
+
+-- Create evaluation_jobs table (background batch evaluation progress)
+CREATE TABLE IF NOT EXISTS evaluation_jobs (
+    id SERIAL PRIMARY KEY,
+    status VARCHAR(32) NOT NULL DEFAULT 'queued',
+    total INTEGER NOT NULL DEFAULT 0,
+    processed INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    failures JSONB NOT NULL DEFAULT '[]'::jsonb,
+    error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP WITH TIME ZONE,
+    run_started_at TIMESTAMP WITH TIME ZONE,
+    run_start_processed INTEGER NOT NULL DEFAULT 0,
+    heartbeat_at TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP WITH TIME ZONE
+);
+
+-- Refresh jobs re-evaluate every synced pair instead of only unevaluated ones
+ALTER TABLE evaluation_jobs ADD COLUMN IF NOT EXISTS refresh BOOLEAN NOT NULL DEFAULT FALSE;
+
+CREATE INDEX IF NOT EXISTS evaluation_jobs_status_idx ON evaluation_jobs (status);
+
 -- Create repo_airdrops table
 CREATE TABLE IF NOT EXISTS repo_airdrops (
     repo_name VARCHAR(255) PRIMARY KEY,
@@ -27,6 +121,36 @@ CREATE TABLE IF NOT EXISTS repo_airdrops (
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Create contributor_wallets table (GitHub username -> checksummed claim address)
+CREATE TABLE IF NOT EXISTS contributor_wallets (
+    contributor VARCHAR(255) PRIMARY KEY,
+    wallet_address VARCHAR(42) NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Create payout_batches table (disperse transactions of a repo's payout plan).
+-- status: pending -> sending -> submitted -> confirmed, or failed (reverted or
+-- rejected; retried) or unknown (send outcome unclear; reconcile by hand)
+CREATE TABLE IF NOT EXISTS payout_batches (
+    id SERIAL PRIMARY KEY,
+    repo_name VARCHAR(255) NOT NULL,
+    plan_version VARCHAR(16) NOT NULL,
+    batch_index INTEGER NOT NULL,
+    token_address VARCHAR(42) NOT NULL,
+    disperse_address VARCHAR(42) NOT NULL,
+    recipients JSONB NOT NULL,
+    amounts JSONB NOT NULL,
+    total_units NUMERIC(78, 0) NOT NULL,
+    gas_limit BIGINT NOT NULL,
+    calldata TEXT NOT NULL,
+    status VARCHAR(16) NOT NULL DEFAULT 'pending',
+    tx_hash VARCHAR(66),
+    error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (repo_name, batch_index)
+);
+
 -- Create User table if not exists (for storing GitHub tokens)
 CREATE TABLE IF NOT EXISTS "User" (
     id SERIAL PRIMARY KEY,
@@ -1,13 +1,30 @@
 #schemas.py
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, Field
+from typing import List, Optional
 
 class Message(BaseModel):
     role: str  # "human" or "ai"
     content: str
 
 class ChatRequest(BaseModel):
-    messages: List[Message]
+    messages: List[Message]  # new messages only; earlier turns come from the thread
+    thread_id: Optional[str] = None  # omit to start a new conversation
 
 class ChatResponse(BaseModel):
     response: str
+    thread_id: str
+
+class Evaluation(BaseModel):
+    total_points: float = Field(ge=0)
+    justification: str = Field(min_length=1)
+
+class ContributorEvaluation(Evaluation):
+    username: str
+
+class ContributorWallet(BaseModel):
+    contributor: str
+    wallet_address: str
+
+class PayoutPlanRequest(BaseModel):
+    token_address: Optional[str] = None  # defaults to AIRDROP_TOKEN_ADDRESS
+    disperse_address: Optional[str] = None  # defaults to DISPERSE_CONTRACT_ADDRESS
@@ -0,0 +1,156 @@
+# api/scoring.py
+import re
+from typing import Any, Dict, List
+import numpy as np
+
+# Bands from the evaluation criteria: value >= edge[i] earns i + 1 points
+LINES_BAND_EDGES = np.array([1, 51, 201, 501])
+FILES_BAND_EDGES = np.array([1, 3, 11])
+
+ISSUE_REFERENCE_POINTS = 10
+ISSUE_CLOSE_POINTS = 20
+
+SCAFFOLD_CAP = 3
+DELETION_ONLY_CAP = 2
+SINGLE_WORD_CAP = 2
+TEST_ONLY_CAP = 3
+
+# Same patterns GitHubTool uses to link commits to issues, so a PR number in
+# "Merge pull request #12" or a version "#2" doesn't count as a reference
+ISSUE_REFERENCE = re.compile(r"(?:fixes|closes)\s+#(\d+)", re.IGNORECASE)
+ISSUE_CLOSE = re.compile(r"closes\s+#\d+", re.IGNORECASE)
+_SCAFFOLD = re.compile(r"^(initial commit|init\b|initial\b|scaffold|bootstrap|first commit)", re.IGNORECASE)
+_TEST_ONLY = re.compile(r"^(tests?(\(.*?\))?[:!\s]|add(ed|s)? tests?\b)", re.IGNORECASE)
+_MERGE = re.compile(r"^merge\b", re.IGNORECASE)
+
+
+def _features(commits: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """Columnar view of commit records; text checks run once per message"""
+    messages = [(commit.get("commitMessage") or "").strip() for commit in commits]
+    first_lines = [message.splitlines()[0] if message else "" for message in messages]
+    return {
+        "lines": np.array([commit.get("linesChanged") or 0 for commit in commits], dtype=np.int64),
+        "files": np.array([commit.get("filesChanged") or 0 for commit in commits], dtype=np.int64),
+        "additions": np.array([
+            commit["additions"] if commit.get("additions") is not None else -1 for commit in commits
+        ], dtype=np.int64),
+        "deletions": np.array([commit.get("deletions") or 0 for commit in commits], dtype=np.int64),
+        "words": np.array([len(line.split()) for line in first_lines], dtype=np.int64),
+        "references": np.array([bool(ISSUE_REFERENCE.search(m)) for m in messages]),
+        "closes": np.array([
+            bool(commit.get("closesIssue")) or bool(ISSUE_CLOSE.search(m))
+            for commit, m in zip(commits, messages)
+        ]),
+        "scaffold": np.array([bool(_SCAFFOLD.match(line)) for line in first_lines]),
+        "test_only": np.array([bool(_TEST_ONLY.match(line)) for line in first_lines]),
+        "merge": np.array([bool(_MERGE.match(line)) for line in first_lines]),
+    }
+
+
+def score_commits(commits: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """Per-commit points under the evaluation criteria, vectorized over all commits"""
+    f = _features(commits)
+    lines_points = np.searchsorted(LINES_BAND_EDGES, f["lines"], side="right")
+    files_points = np.searchsorted(FILES_BAND_EDGES, f["files"], side="right")
+    message_points = np.minimum(f["words"], 2)
+    issue_points = np.where(
+        f["closes"], ISSUE_CLOSE_POINTS, np.where(f["references"], ISSUE_REFERENCE_POINTS, 0)
+    )
+    points = (lines_points + files_points + message_points + issue_points).astype(np.float64)
+
+    deletion_only = (f["additions"] == 0) & (f["deletions"] > 0)
+    single_word = f["words"] == 1
+    cap = np.full(len(commits), np.inf)
+    cap = np.where(f["scaffold"], np.minimum(cap, SCAFFOLD_CAP), cap)
+    cap = np.where(deletion_only, np.minimum(cap, DELETION_ONLY_CAP), cap)
+    cap = np.where(single_word, np.minimum(cap, SINGLE_WORD_CAP), cap)
+    cap = np.where(f["test_only"], np.minimum(cap, TEST_ONLY_CAP), cap)
+    capped = np.minimum(points, cap)
+
+    # Cases the arithmetic can't judge well: empty/merge commits, and large
+    # commits whose message merely looks like scaffolding
+    ambiguous = f["merge"] | ((f["lines"] == 0) & (f["files"] == 0)) | (f["scaffold"] & (f["lines"] > 500))
+
+    return {
+        "points": capped,
+        "lines_points": lines_points,
+        "files_points": files_points,
+        "message_points": message_points,
+        "issue_points": issue_points,
+        "capped": capped < points,
+        "ambiguous": ambiguous,
+        "lines": f["lines"],
+        "files": f["files"],
+        "references": f["references"],
+        "closes": f["closes"],
+        "scaffold": f["scaffold"],
+        "deletion_only": deletion_only,
+        "single_word": single_word,
+        "test_only": f["test_only"],
+    }
+
+
+def score_contributor(commits: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Total points, a generated justification and whether an LLM should judge instead"""
+    if not commits:
+        return {
+            "total_points": 0.0,
+            "justification": "No commits found for this contributor.",
+            "ambiguous": True
+        }
+    scores = score_commits(commits)
+    total = float(scores["points"].sum())
+    return {
+        "total_points": total,
+        "justification": _justification(scores, total),
+        "ambiguous": bool(scores["ambiguous"].any())
+    }
+
+
+def score_contributors(commits_by_contributor: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+    """Score many contributors with a single vectorized pass over all their commits"""
+    names = list(commits_by_contributor)
+    counts = np.array([len(commits_by_contributor[name]) for name in names], dtype=np.int64)
+    all_commits = [commit for name in names for commit in commits_by_contributor[name]]
+    owner = np.repeat(np.arange(len(names)), counts)
+    scores = score_commits(all_commits)
+    totals = np.bincount(owner, weights=scores["points"], minlength=len(names))
+    ambiguous = np.bincount(owner, weights=scores["ambiguous"], minlength=len(names)) > 0
+    # Commits are laid out contiguously per contributor, so each one is a slice
+    ends = np.cumsum(counts)
+
+    results = {}
+    for i, name in enumerate(names):
+        if not counts[i]:
+            results[name] = score_contributor([])
+            continue
+        own = {key: value[ends[i] - counts[i]:ends[i]] for key, value in scores.items()}
+        results[name] = {
+            "total_points": float(totals[i]),
+            "justification": _justification(own, float(totals[i])),
+            "ambiguous": bool(ambiguous[i])
+        }
+    return results
+
+
+def _justification(scores: Dict[str, np.ndarray], total: float) -> str:
+    count = len(scores["points"])
+    lines_hist = np.bincount(scores["lines_points"], minlength=5)
+    files_hist = np.bincount(scores["files_points"], minlength=4)
+    parts = [
+        f"{count} commits scored by the rule-based evaluator for a total of {total:g} points.",
+        f"Lines changed: {int(scores['lines'].sum())} in total; "
+        f"{lines_hist[1]} small (1-50), {lines_hist[2]} medium (51-200), "
+        f"{lines_hist[3]} large (201-500), {lines_hist[4]} very large (501+) commits.",
+        f"Files changed: {files_hist[1]} commits touched 1-2 files, {files_hist[2]} touched 3-10, "
+        f"{files_hist[3]} touched 11+.",
+        f"{int((scores['message_points'] == 2).sum())} commits have descriptive messages.",
+        f"Issues: {int(scores['closes'].sum())} commits close an issue, "
+        f"{int((scores['references'] & ~scores['closes']).sum())} reference one.",
+    ]
+    if scores["capped"].any():
+        parts.append(
+            f"{int(scores['capped'].sum())} commits were capped as scaffolding, deletion-only, "
+            f"single-word or test-only changes."
+        )
+    return " ".join(parts)
@@ -3,84 +3,271 @@ import os
 from langchain_groq import ChatGroq
 import json
 import asyncio
-from typing import Dict, Any, List
+import hashlib
+import logging
+import threading
+from typing import AsyncIterator, Callable, Dict, Any, List, Optional, Tuple, TypeVar
 from dotenv import load_dotenv
 from langgraph.prebuilt import create_react_agent
-from langgraph.checkpoint.memory import MemorySaver
 from ..tools.github_tool import GitHubTool
-from ..tools.twitter_tool import twitter_toolkit
+from ..tools.twitter_tool import get_twitter_toolkit
 from ..tools.airdrop_info_tool import AirdropStoreTool
 from .schemas import ChatRequest, ChatResponse, Message
 from .db import DatabaseOperations
+from .pool import close_pools
+from .distribution_cache import distribution_cache
+from .allocation import TOKEN_DECIMALS, allocate_units, to_base_units
+from .merkle import ClaimTree, claim_trees
+from .disperse import GasModel, JsonRpcSender, PayoutSender, SimulatedSender, plan_batches, plan_version
+from eth_utils import is_address, to_checksum_address
+from .async_db import AsyncDatabaseOperations
+from .scheduler import ResourceLimits, estimate_tokens
+from .scoring import score_contributor, score_contributors
+from .compaction import compact_contribution_data
+from .jobs import EvaluationJobManager, PayoutJobManager
+from .chat import ChatSessions, history_window
+from .batching import EvaluationBatcher, InvalidEvaluation
+from .structured import (
+    BATCH_SCHEMA_HINT, EVALUATION_SCHEMA_HINT, StructuredOutputError,
+    complete_structured, parse_evaluation, parse_evaluation_list
+)
 # Load environment variables
 load_dotenv()
 
-# Initialize the chat model
-if not os.getenv("GROQ_API_KEY"):
-    raise ValueError("GROQ_API_KEY environment variable is not set")
+logger = logging.getLogger(__name__)
 
-model = ChatGroq(model='llama3-70b-8192', api_key=os.getenv("GROQ_API_KEY"))
-twitter_tools = twitter_toolkit.get_tools()
-github_tool = GitHubTool()
-db = DatabaseOperations(os.getenv("DB_URL"))
-airdrop_store = AirdropStoreTool(db)
-tools = [github_tool] + twitter_tools + [airdrop_store]
-# Set up a memory checkpointer
-memory = MemorySaver()
+T = TypeVar("T")
 
-# Create LangGraph agent
-agent_executor = create_react_agent(model, tools, checkpointer=memory)
+MODEL_NAME = 'llama3-70b-8192'
+# Bump whenever _generate_eval_prompt or the compaction changes, so memoized
+# evaluations made from the old prompt are not reused
+PROMPT_TEMPLATE_VERSION = "2"
+EVAL_REPAIR_ATTEMPTS = int(os.getenv("EVAL_REPAIR_ATTEMPTS", "1"))
+# "rules" scores with the deterministic scorer only, "llm" always asks the model,
+# "hybrid" asks the model only for contributors the rules flag as ambiguous
+EVAL_SCORER = os.getenv("EVAL_SCORER", "hybrid")
 
-def process_chat(request: ChatRequest) -> ChatResponse:
+# Components that touch the network (Groq, Twitter, Postgres, GitHub) are created
+# on first use rather than at import, so startup and worker forks stay cheap and a
+# path only pays for what it uses
+_components: Dict[str, Any] = {}
+_component_locks: Dict[str, threading.Lock] = {}
+_components_lock = threading.Lock()
+
+
+def _component(name: str, factory: Callable[[], T]) -> T:
+    if name in _components:
+        return _components[name]
+    with _components_lock:
+        lock = _component_locks.setdefault(name, threading.Lock())
+    with lock:
+        if name not in _components:
+            _components[name] = factory()
+        return _components[name]
+
+
+def _create_model() -> ChatGroq:
+    # Initialize the chat model
+    if not os.getenv("GROQ_API_KEY"):
+        raise ValueError("GROQ_API_KEY environment variable is not set")
+    return ChatGroq(model=MODEL_NAME, api_key=os.getenv("GROQ_API_KEY"))
+
+
+def get_model() -> ChatGroq:
+    return _component("model", _create_model)
+
+
+def get_json_model():
+    """Model in Groq's JSON mode, which guarantees a syntactically valid object"""
+    return _component("json_model", lambda: (
+        get_model().bind(response_format={"type": "json_object"})
+        if os.getenv("EVAL_JSON_MODE", "1") != "0" else get_model()
+    ))
+
+
+def get_db() -> DatabaseOperations:
+    return _component("db", lambda: DatabaseOperations(os.getenv("DB_URL")))
+
+
+def get_github_tool() -> GitHubTool:
+    return _component("github_tool", GitHubTool)
+
+
+def get_limits() -> ResourceLimits:
+    """Process-wide limits for GitHub and Groq, shared by single and batch evaluations"""
+    return _component("limits", lambda: ResourceLimits.from_env(github_tokens=get_github_tool().token_count))
+
+
+def get_tools() -> List[Any]:
+    """Agent tools; only the chat agent needs Twitter"""
+    return _component("tools", lambda: (
+        [get_github_tool()] + get_twitter_toolkit().get_tools() + [AirdropStoreTool(get_db())]
+    ))
+
+
+def get_payout_sender() -> PayoutSender:
+    """Sender for payout transactions: a node's JSON-RPC, or PAYOUT_SENDER=simulated"""
+    def create() -> PayoutSender:
+        if os.getenv("PAYOUT_SENDER", "rpc") == "simulated":
+            return SimulatedSender(gas_model=GasModel.from_env())
+        rpc_url, from_address = os.getenv("PAYOUT_RPC_URL"), os.getenv("PAYOUT_FROM_ADDRESS")
+        if not rpc_url or not from_address:
+            raise ValueError("PAYOUT_RPC_URL and PAYOUT_FROM_ADDRESS must be set to send payouts")
+        return JsonRpcSender(rpc_url, from_address)
+    return _component("payout_sender", create)
+
+
+# Async handlers go through the async pool so queries don't block the event loop;
+# the pool itself opens on first checkout
+adb = AsyncDatabaseOperations(os.getenv("DB_URL"))
+
+def _make_agent(checkpointer):
+    """LangGraph agent that sees at most CHAT_HISTORY_TOKEN_BUDGET tokens of history"""
+    window = history_window(int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "3000")))
+    return create_react_agent(get_model(), get_tools(), checkpointer=checkpointer, pre_model_hook=window)
+
+
+# One conversation per thread_id, checkpointed in Postgres
+chat_sessions = ChatSessions(_make_agent, os.getenv("DB_URL"))
+
+async def process_chat(request: ChatRequest) -> ChatResponse:
     # Convert messages to LangChain format
     chat_history = [{"role": msg.role, "content": msg.content} for msg in request.messages]
 
-    # Invoke agent
-    config = {"configurable": {"thread_id": "my_thread"}}
-    response = agent_executor.invoke({"messages": chat_history}, config)
+    # Invoke agent on the client's thread (a new one if none was given) without
+    # blocking the event loop; sync tools run in the executor
+    async with chat_sessions.turn(request.thread_id) as (agent, config, thread_id):
+        response = await agent.ainvoke({"messages": chat_history}, config)
 
     # Extract AI response
     ai_response = response["messages"][-1].content
-    return ChatResponse(response=ai_response)
+    return ChatResponse(response=ai_response, thread_id=thread_id)
+
+
+async def stream_chat(request: ChatRequest) -> AsyncIterator[str]:
+    """Server-sent events for a chat turn: model tokens and tool calls as they happen"""
+    chat_history = [{"role": msg.role, "content": msg.content} for msg in request.messages]
+    try:
+        async with chat_sessions.turn(request.thread_id) as (agent, config, thread_id):
+            yield _sse("thread", {"thread_id": thread_id})
+            async for event in agent.astream_events({"messages": chat_history}, config, version="v2"):
+                kind = event["event"]
+                if kind == "on_chat_model_stream":
+                    content = event["data"]["chunk"].content
+                    if content:
+                        yield _sse("token", {"content": content})
+                elif kind == "on_tool_start":
+                    yield _sse("tool_start", {"name": event["name"], "input": event["data"].get("input")})
+                elif kind == "on_tool_end":
+                    yield _sse("tool_end", {"name": event["name"], "output": event["data"].get("output")})
+        yield _sse("done", {"thread_id": thread_id})
+    except Exception as e:
+        yield _sse("error", {"detail": str(e)})
 
 
-async def evaluate_contributor(repo_name: str, username: str) -> Dict[str, Any]:
-        """Evaluate contributor based on stored data"""
-        # Get detailed contribution data using GitHub tool
-        github_tool = GitHubTool()
-        data = github_tool.get_contributor_evaluation(repo_name, username)
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def evaluate_contributor(repo_name: str, username: str,
+                               github: Optional[GitHubTool] = None,
+                               force: bool = False,
+                               batcher: Optional[EvaluationBatcher] = None) -> Dict[str, Any]:
+        """Evaluate contributor based on stored data
+
+        LLM evaluations are memoized by a hash of their inputs; `force` bypasses the memo.
+        With a `batcher` the LLM request is shared with other contributors.
+        """
+        # Get detailed contribution data using GitHub tool; PyGithub is blocking,
+        # so the crawl runs in a worker thread
+        if github is None:
+            github = await asyncio.to_thread(GitHubTool)
+        limits = await asyncio.to_thread(get_limits)
+        async with limits.github():
+            # Only commits since the last sync are fetched; the full history comes from storage
+            data = await asyncio.to_thread(github.get_synced_contributor_evaluation, repo_name, username)
         if "error" in data:
             return {"error": data["error"]}
+        data.pop("new_commits", None)
+
+        if EVAL_SCORER != "llm":
+            scored = score_contributor(data.get("commits", []))
+            if EVAL_SCORER == "rules" or not scored["ambiguous"]:
+                await adb.store_evaluation(
+                    repo_name=repo_name,
+                    username=username,
+                    reward_points=scored["total_points"],
+                    justification=scored["justification"]
+                )
+                return {
+                    "status": "success",
+                    "scorer": "rules",
+                    "evaluation": {
+                        "total_points": scored["total_points"],
+                        "justification": scored["justification"]
+                    }
+                }
+
+        input_hash = _evaluation_input_hash(data)
+        if not force:
+            stored = await adb.get_evaluation(repo_name, username)
+            if stored and stored["input_hash"] == input_hash:
+                await adb.touch_evaluation(repo_name, username)
+                return {
+                    "status": "success",
+                    "cached": True,
+                    "evaluation": {
+                        "total_points": float(stored["reward_points"]),
+                        "justification": stored["justification"]
+                    }
+                }
+
+        if batcher is not None:
+            try:
+                eval_data = await batcher.evaluate(
+                    username, {"repo_name": repo_name, "data": compact_contribution_data(data)}
+                )
+            except InvalidEvaluation as e:
+                return {"error": f"Evaluation failed: {str(e)}"}
+            await adb.store_evaluation(
+                repo_name=repo_name,
+                username=username,
+                reward_points=eval_data["total_points"],
+                justification=eval_data["justification"],
+                input_hash=input_hash
+            )
+            return {
+                "status": "success",
+                "evaluation": eval_data
+            }
 
         # Generate evaluation prompt
         prompt = _generate_eval_prompt(repo_name, username, data)
-        
-        # Get AI evaluation
-        response = model.invoke([{
+        messages = [{
             "role": "system",
             "content": "You MUST respond with a valid JSON object containing exactly two fields: 'total_points' (a float) and 'justification' (a string). Do not include any other text or formatting."
         }, {
             "role": "user",
             "content": prompt
-        }])
-        
+        }]
+
+        # Get AI evaluation; unparseable output is repaired without re-sending the prompt
+        try:
+            eval_data = await complete_structured(
+                lambda msgs: _complete(msgs, reply_tokens=512, json_mode=True),
+                messages, parse_evaluation, EVALUATION_SCHEMA_HINT, max_repairs=EVAL_REPAIR_ATTEMPTS
+            )
+        except StructuredOutputError as e:
+            return {"error": f"Evaluation failed: {str(e)}"}
+
         try:
-            # The model response is already an AIMessage object
-            evaluation = response.content.strip()
-            # Ensure we're working with a clean JSON string
-            if not evaluation.startswith('{'):
-                evaluation = evaluation[evaluation.find('{'):]
-            if not evaluation.endswith('}'):
-                evaluation = evaluation[:evaluation.rfind('}')+1]
-            # Parse the evaluation
-            eval_data = json.loads(evaluation)
-            
             # Store evaluation results
-            db.store_evaluation(
+            await adb.store_evaluation(
                 repo_name=repo_name,
                 username=username,
-                reward_points=float(eval_data["total_points"]),
-                justification=eval_data["justification"]
+                reward_points=eval_data["total_points"],
+                justification=eval_data["justification"],
+                input_hash=input_hash
             )
             
             return {
@@ -91,82 +278,187 @@ async def evaluate_contributor(repo_name: str, username: str) -> Dict[str, Any]:
             return {"error": f"Evaluation failed: {str(e)}"}
 
 
-async def evaluate_all_contributors() -> Dict[str, Any]:
-    """Evaluate all contributors in the database with exponential backoff retry logic"""
+async def _complete(messages: List[Dict[str, str]], reply_tokens: int, json_mode: bool = False) -> str:
+    """Model reply text, budgeting the messages plus a reply against the Groq limits"""
+    prompt_tokens = sum(estimate_tokens(message["content"]) for message in messages)
+    async with get_limits().groq(tokens=prompt_tokens + reply_tokens):
+        response = await (get_json_model() if json_mode else get_model()).ainvoke(messages)
+    return response.content
+
+
+BATCH_SYSTEM_PROMPT = "You MUST respond with a valid JSON array containing one object per contributor, each with exactly three fields: 'username' (a string), 'total_points' (a float) and 'justification' (a string). Do not include any other text or formatting."
+# Reply tokens budgeted per contributor in a batch
+BATCH_REPLY_TOKENS = 256
+
+
+async def _evaluate_llm_batch(entries: List[Tuple[str, Dict[str, Any]]]) -> List[Any]:
+    """One Groq request evaluating several contributors; returns the decoded reply array"""
+    prompt = _generate_batch_eval_prompt(entries)
+    messages = [{
+        "role": "system",
+        "content": BATCH_SYSTEM_PROMPT
+    }, {
+        "role": "user",
+        "content": prompt
+    }]
+    # JSON mode only allows a top-level object, so the array reply relies on the parser
+    return await complete_structured(
+        lambda msgs: _complete(msgs, reply_tokens=BATCH_REPLY_TOKENS * len(entries)),
+        messages, parse_evaluation_list, BATCH_SCHEMA_HINT, max_repairs=EVAL_REPAIR_ATTEMPTS
+    )
+
+
+async def _make_batch_evaluator():
+    """Evaluator for background jobs; one GitHub client serves the whole batch
+
+    With EVAL_LLM_BATCH_SIZE > 1, contributors that need the LLM share requests,
+    so more of them fit in Groq's requests-per-minute limit.
+    """
+    github = await asyncio.to_thread(GitHubTool)
+    # Batches are sized to fit the context window: the shared prompt once, then
+    # each contributor's section and reply
+    template = estimate_tokens(_generate_batch_eval_prompt([]))
+    batcher = EvaluationBatcher.from_env(
+        _evaluate_llm_batch,
+        entry_tokens=lambda username, payload: (
+            estimate_tokens(_generate_batch_eval_prompt([(username, payload)])) - template + BATCH_REPLY_TOKENS
+        ),
+        overhead=template + estimate_tokens(BATCH_SYSTEM_PROMPT),
+    )
+    if batcher.batch_size == 1:
+        batcher = None
+    elif int(os.getenv("EVAL_CONCURRENCY", str(batcher.batch_size))) < batcher.batch_size:
+        logger.warning("EVAL_CONCURRENCY is below EVAL_LLM_BATCH_SIZE; LLM batches will only "
+                       "be sent after EVAL_LLM_BATCH_WAIT and never full")
+
+    async def evaluate(repo_name: str, username: str) -> Dict[str, Any]:
+        return await evaluate_contributor(repo_name, username, github=github, batcher=batcher)
+
+    return evaluate
+
+
+# Unless EVAL_CONCURRENCY says otherwise, keep enough pairs in flight to fill one
+# LLM batch while the previous one is pending
+evaluation_jobs = EvaluationJobManager(
+    adb, _make_batch_evaluator,
+    default_concurrency=max(4, 2 * int(os.getenv("EVAL_LLM_BATCH_SIZE", "5")))
+)
+
+
+async def evaluate_all_contributors(refresh: bool = False) -> Dict[str, Any]:
+    """Start (or resume) a background job evaluating all pending contributors
+
+    With `refresh`, already evaluated contributors are revisited too; only those
+    whose commit data changed go to the LLM.
+    """
     try:
-        # Get all unique contributor-repo pairs from database
-        with db.get_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute("""
-                    SELECT DISTINCT repo_name, contributor 
-                    FROM contributor_data 
-                    WHERE NOT EXISTS (
-                        SELECT 1 
-                        FROM contribution_evaluations ce 
-                        WHERE ce.repo_name = contributor_data.repo_name 
-                        AND ce.contributor = contributor_data.contributor
-                    )
-                """)
-                pairs = cur.fetchall()
-
-        total = len(pairs)
-        processed = 0
-        failed = []
-        max_retries = 3
-        base_delay = 2  # Base delay in seconds
-
-        for repo_name, username in pairs:
-            retries = 0
-            while retries <= max_retries:
-                try:
-                    result = await evaluate_contributor(repo_name, username)
-                    if "error" in result:
-                        if "rate limit" in result["error"].lower():
-                            # Calculate exponential backoff delay
-                            delay = base_delay * (2 ** retries)
-                            if retries < max_retries:
-                                await asyncio.sleep(delay)
-                                retries += 1
-                                continue
-                        # Non-rate limit error or max retries reached
-                        failed.append({"repo": repo_name, "user": username, "error": result["error"]})
-                    break  # Success or non-retryable error
-                except Exception as e:
-                    if retries < max_retries:
-                        # Calculate exponential backoff delay
-                        delay = base_delay * (2 ** retries)
-                        await asyncio.sleep(delay)
-                        retries += 1
-                    else:
-                        failed.append({"repo": repo_name, "user": username, "error": str(e)})
-                        break
-            processed += 1
+        return await evaluation_jobs.submit(refresh=refresh)
+    except Exception as e:
+        return {"error": f"Batch evaluation failed: {str(e)}"}
+
+
+async def get_evaluation_job(job_id: int) -> Dict[str, Any]:
+    """Progress of a background evaluation job"""
+    job = await evaluation_jobs.get(job_id)
+    if job is None:
+        return {"error": f"Evaluation job {job_id} not found"}
+    return job
 
+
+async def cancel_evaluation_job(job_id: int) -> Dict[str, Any]:
+    """Cancel a queued or running background evaluation job"""
+    job = await evaluation_jobs.cancel(job_id)
+    if job is None:
+        return {"error": f"Evaluation job {job_id} not found or already finished"}
+    return job
+
+
+async def score_repository(repo_name: str) -> Dict[str, Any]:
+    """Score every synced contributor of a repository with the rule-based scorer
+
+    Uses stored commits only (no GitHub or LLM calls). In hybrid mode contributors
+    flagged as ambiguous are left unscored for the LLM evaluation.
+    """
+    try:
+        commits = await adb.get_repo_commits(repo_name)
+        if not commits:
+            return {"error": f"No synced commits found for repository {repo_name}"}
+        results = score_contributors(commits)
+        ambiguous = {
+            name for name, result in results.items()
+            if result["ambiguous"] and EVAL_SCORER != "rules"
+        }
+        await adb.store_evaluations_bulk(repo_name, [
+            (name, result["total_points"], result["justification"])
+            for name, result in results.items() if name not in ambiguous
+        ])
         return {
-            "status": "completed",
-            "total_contributors": total,
-            "processed": processed,
-            "failed": failed
+            "status": "success",
+            "repo_name": repo_name,
+            "scored": len(results) - len(ambiguous),
+            "ambiguous": sorted(ambiguous)
         }
     except Exception as e:
-        return {"status":"failed",
-        "processed":processed,
-        "failed":failed,
-        "error": f"Batch evaluation failed: {str(e)}"}
+        return {"error": f"Scoring failed: {str(e)}"}
 
 
-def _generate_eval_prompt(repo_name: str, username: str, data: Dict) -> str:
-    """Generate a structured evaluation prompt for GitHub contributions."""
-    
-    return f"""
-    You are an AI agent evaluating GitHub contributions for the user **{username}** in the repository **{repo_name}**.
+async def warm_up() -> None:
+    """Create components in the background so the first requests don't pay for them"""
+    for name, factory in [("model", get_json_model), ("database", get_db),
+                          ("github", get_limits), ("tools", get_tools)]:
+        try:
+            await asyncio.to_thread(factory)
+        except Exception:
+            # Left for the first request that needs it to retry and report
+            logger.exception("Warm-up of %s failed", name)
+    try:
+        await chat_sessions.warm_up()
+    except Exception:
+        logger.exception("Warm-up of the chat agent failed")
+
+
+async def shutdown() -> None:
+    """Stop background jobs and close every connection pool"""
+    await evaluation_jobs.shutdown()
+    await payout_jobs.shutdown()
+    await chat_sessions.close()
+    await adb.close()
+    close_pools()
 
-    ## Contribution Data:
-    ```json
-    {json.dumps(data, indent=2)}
-    ```
 
-    ## Evaluation Criteria:
+def get_db_pool_stats() -> Dict[str, Any]:
+    """Usage metrics of the sync and async connection pools and the distribution cache"""
+    return {
+        "sync": get_db().get_pool_stats(),
+        "async": adb.get_pool_stats(),
+        "distribution_cache": distribution_cache.stats()
+    }
+
+
+def get_github_stats() -> Dict[str, Any]:
+    """GitHub token budgets and response cache hit/miss counters"""
+    return get_github_tool().get_stats()
+
+
+def _evaluation_input_hash(data: Dict[str, Any]) -> str:
+    """Memo key: model, prompt version and the commit data, independent of ordering"""
+    commits = sorted((
+        [
+            commit.get("sha"),
+            commit.get("commitMessage"),
+            commit.get("linesChanged"),
+            commit.get("additions"),
+            commit.get("deletions"),
+            commit.get("filesChanged"),
+            commit.get("closesIssue"),
+            sorted(commit.get("issueLabels") or []),
+        ] for commit in data.get("commits", [])
+    ), key=lambda row: row[0] or "")
+    payload = json.dumps([MODEL_NAME, PROMPT_TEMPLATE_VERSION, commits], separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+EVAL_CRITERIA = """## Evaluation Criteria:
     - **Lines of Code (0-4 points)**  
       - 1-50 lines → 1 point  
       - 51-200 lines → 2 points  
@@ -190,8 +482,24 @@ def _generate_eval_prompt(repo_name: str, username: str, data: Dict) -> str:
       - Initial project scaffolding → **Max 3 points**  
       - File deletions only → **Max 2 points**  
       - Single-word commit messages (e.g., "fix", "test") → **Max 2 points**  
-      - Test-only commits → **Max 3 points**  
+      - Test-only commits → **Max 3 points**
+"""
+
+
+def _generate_eval_prompt(repo_name: str, username: str, data: Dict) -> str:
+    """Generate a structured evaluation prompt for GitHub contributions."""
+    
+    return f"""
+    You are an AI agent evaluating GitHub contributions for the user **{username}** in the repository **{repo_name}**.
+
+    ## Contribution Data:
+    Aggregated over all of the contributor's commits: band histograms, issue statistics,
+    totals and a sample of representative commits.
+    ```json
+    {json.dumps(compact_contribution_data(data))}
+    ```
 
+    {EVAL_CRITERIA}
     ## Expected JSON Response Format:
     Please provide your evaluation in **valid JSON format**, ensuring correctness:
     ```json
@@ -202,52 +510,242 @@ def _generate_eval_prompt(repo_name: str, username: str, data: Dict) -> str:
     ```
     """
 
+def _generate_batch_eval_prompt(entries: List[Tuple[str, Dict[str, Any]]]) -> str:
+    """Evaluation prompt covering several contributors, each with compacted features"""
+    sections = "\n".join(
+        f"""
+    ### {username} in **{payload['repo_name']}**
+    ```json
+    {json.dumps(payload['data'])}
+    ```"""
+        for username, payload in entries
+    )
+    return f"""
+    You are an AI agent evaluating GitHub contributions. Evaluate each of the
+    following {len(entries)} contributors independently.
+
+    ## Contribution Data:
+    Aggregated over each contributor's commits: band histograms, issue statistics,
+    totals and a sample of representative commits.
+    {sections}
+
+    {EVAL_CRITERIA}
+    ## Expected JSON Response Format:
+    Respond with a **valid JSON array** containing one object per contributor above:
+    ```json
+    [
+        {{
+            "username": "GitHub username",
+            "total_points": float,
+            "justification": "Your reasoning for the score"
+        }}
+    ]
+    ```
+    """
+
 async def get_token_distribution(repo_name: str) -> List[Dict[str, Any]]:
     """
     Calculate token distribution for all contributors based on their reward points
     """
+    # Served from the cache until an evaluation or the airdrop changes
+    cached, generation = distribution_cache.get(repo_name)
+    if cached is not None:
+        return cached
     try:
         # Get total tokens from repo_airdrops table
-        with db.get_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute("""
-                    SELECT total_tokens 
-                    FROM repo_airdrops 
-                    WHERE repo_name = %s
-                """, (repo_name,))
-                result = cur.fetchone()
-                if not result:
-                    return {"error": f"No airdrop found for repository {repo_name}"}
-                total_tokens = result[0]
-
-                # Get all contributors and their reward points
-                cur.execute("""
-                    SELECT contributor, reward_points, justification 
-                    FROM contribution_evaluations 
-                    WHERE repo_name = %s
-                """, (repo_name,))
-                evaluations = cur.fetchall()
-                
-                if not evaluations:
-                    return {"error": "No evaluated contributors found"}
-
-                # Calculate total reward points
-                total_reward_points = sum(eval[1] for eval in evaluations)
-
-                # Calculate token distribution
-                distributions = []
-                for eval in evaluations:
-                    contributor, reward_points, justification = eval
-                    tokens = (reward_points * total_tokens) / total_reward_points
-                    
-                    distributions.append({
-                        "contributor": contributor,
-                        "reward_points": float(reward_points),
-                        "tokens_awarded": round(float(tokens), 2),
-                        "justification": justification
-                    })
-
-                return distributions
+        total_tokens = await adb.get_airdrop_total_tokens(repo_name)
+        if total_tokens is None:
+            return {"error": f"No airdrop found for repository {repo_name}"}
+
+        # Get all contributors and their reward points
+        evaluations = await adb.get_repo_evaluations(repo_name)
 
+        if not evaluations:
+            return {"error": "No evaluated contributors found"}
+
+        # Exact split in token base units; the units always sum to total_tokens
+        contributors = [row[0] for row in evaluations]
+        units = allocate_units([row[1] for row in evaluations], to_base_units(total_tokens), contributors)
+        if not any(units):
+            return {"error": "Evaluated contributors have no reward points"}
+
+        # Calculate token distribution
+        scale = 10 ** TOKEN_DECIMALS
+        distributions = []
+        for (contributor, reward_points, justification), amount in zip(evaluations, units):
+            distributions.append({
+                "contributor": contributor,
+                "reward_points": float(reward_points),
+                "tokens_awarded": amount / scale,
+                # Exact amount for payouts; a string since it exceeds JSON-safe integers
+                "token_units": str(amount),
+                "justification": justification
+            })
+
+        distribution_cache.put(repo_name, distributions, generation)
+        return distributions
+
+    except Exception as e:
+        return {"error": f"Error calculating token distribution: {str(e)}"}
+
+
+async def _get_claim_tree(repo_name: str) -> Any:
+    """Claim tree for the repo's current distribution, or an error dict"""
+    distribution = await get_token_distribution(repo_name)
+    if "error" in distribution:
+        return distribution
+    tree = claim_trees.lookup(repo_name, distribution)
+    if tree is None:
+        wallets = await adb.get_contributor_wallets([entry["contributor"] for entry in distribution])
+        # Hashing is CPU-bound; keep it off the event loop
+        tree = await asyncio.to_thread(claim_trees.build, repo_name, distribution, wallets)
+    return tree
+
+
+async def get_claim_root(repo_name: str) -> Dict[str, Any]:
+    """Merkle root of a repo's (wallet, amount) claims, as set on the claim contract"""
+    try:
+        tree = await _get_claim_tree(repo_name)
+        if not isinstance(tree, ClaimTree):
+            return tree
+        return dict(tree.summary(), repo_name=repo_name)
     except Exception as e:
-        return {"error": f"Error calculating token distribution: {str(e)}"}
\ No newline at end of file
+        return {"error": f"Error building claim tree: {str(e)}"}
+
+
+async def get_claim_proof(repo_name: str, address: Optional[str] = None,
+                          contributor: Optional[str] = None) -> Dict[str, Any]:
+    """Claim amount (base units) and Merkle proof for one wallet or contributor"""
+    if not address and not contributor:
+        return {"error": "Either address or contributor is required"}
+    try:
+        tree = await _get_claim_tree(repo_name)
+        if not isinstance(tree, ClaimTree):
+            return tree
+        proof = tree.proof(address=address, contributor=contributor)
+        if proof is None:
+            return {"error": f"No claim for {address or contributor} in {repo_name}"}
+        return dict(proof, repo_name=repo_name)
+    except Exception as e:
+        return {"error": f"Error building claim proof: {str(e)}"}
+
+
+async def set_contributor_wallet(contributor: str, wallet_address: str,
+                                 overwrite: bool = False) -> Dict[str, Any]:
+    """Link a contributor's GitHub username to their claim wallet
+
+    Callers check that the requester owns the GitHub account. Replacing a linked
+    wallet needs `overwrite` (operators only): the old one may already be in a
+    published claim root or payout plan.
+    """
+    if not is_address(wallet_address):
+        return {"error": f"Invalid wallet address: {wallet_address}"}
+    wallet_address = to_checksum_address(wallet_address)
+    linked = await adb.store_contributor_wallet(contributor, wallet_address, overwrite=overwrite)
+    if linked != wallet_address:
+        return {"error": f"{contributor} already has a linked wallet; ask an operator to change it"}
+    # Trees are re-checked against their content hash on next use
+    claim_trees.invalidate()
+    return {"status": "success", "contributor": contributor, "wallet_address": wallet_address}
+
+
+def _describe_payout(repo_name: str, batches: List[Dict[str, Any]], include_calldata: bool = False,
+                     missing_wallets: Optional[List[str]] = None) -> Dict[str, Any]:
+    statuses: Dict[str, int] = {}
+    for batch in batches:
+        statuses[batch["status"]] = statuses.get(batch["status"], 0) + 1
+    described = []
+    for batch in batches:
+        entry = {
+            "batch_index": batch["batch_index"],
+            "recipients": len(batch["recipients"]),
+            "total_units": str(int(batch["total_units"])),
+            "gas_limit": batch["gas_limit"],
+            "status": batch["status"],
+            "tx_hash": batch["tx_hash"],
+            "error": batch["error"],
+        }
+        if include_calldata:
+            entry["to"] = batch["disperse_address"]
+            entry["calldata"] = batch["calldata"]
+        described.append(entry)
+    result = {
+        "repo_name": repo_name,
+        "plan_version": batches[0]["plan_version"] if batches else None,
+        "token_address": batches[0]["token_address"] if batches else None,
+        "total_units": str(sum(int(batch["total_units"]) for batch in batches)),
+        "paid_units": str(sum(int(batch["total_units"]) for batch in batches if batch["status"] == "confirmed")),
+        "statuses": statuses,
+        "complete": bool(batches) and statuses.get("confirmed") == len(batches),
+        "batches": described,
+    }
+    if missing_wallets is not None:
+        result["missing_wallets"] = missing_wallets
+    return result
+
+
+async def plan_payout(repo_name: str, token_address: Optional[str] = None,
+                      disperse_address: Optional[str] = None) -> Dict[str, Any]:
+    """Split a repo's claims into gas-bounded disperseToken batches and record them
+
+    Re-planning is allowed while no batch can have paid out (all pending, or
+    failed); after that the plan is fixed, so a changed distribution can't pay
+    anyone twice.
+    """
+    token_address = token_address or os.getenv("AIRDROP_TOKEN_ADDRESS")
+    disperse_address = disperse_address or os.getenv("DISPERSE_CONTRACT_ADDRESS")
+    for name, value in (("token_address", token_address), ("disperse_address", disperse_address)):
+        if not value or not is_address(value):
+            return {"error": f"Missing or invalid {name}"}
+    try:
+        tree = await _get_claim_tree(repo_name)
+        if not isinstance(tree, ClaimTree):
+            return tree
+        # Encoding calldata for every recipient is CPU-bound
+        batches = await asyncio.to_thread(
+            plan_batches, tree.claims, to_checksum_address(token_address),
+            to_checksum_address(disperse_address), GasModel.from_env()
+        )
+        version = plan_version(batches)
+        existing = await adb.get_payout_batches(repo_name)
+        if not existing or existing[0]["plan_version"] != version:
+            if not await adb.replace_payout_plan(repo_name, version, batches):
+                return {"error": f"A payout for {repo_name} is already under way and its plan can no longer change"}
+        return _describe_payout(repo_name, await adb.get_payout_batches(repo_name),
+                                include_calldata=True, missing_wallets=tree.missing_wallets)
+    except Exception as e:
+        return {"error": f"Error planning payout: {str(e)}"}
+
+
+# Payouts run in the background; their progress is read back from payout_batches
+payout_jobs = PayoutJobManager(adb, lambda: {
+    "confirm_timeout": float(os.getenv("PAYOUT_CONFIRM_TIMEOUT", "120")),
+    "retry_gas_bump": float(os.getenv("PAYOUT_RETRY_GAS_BUMP", "1.5")),
+    "max_gas": GasModel.from_env().block_gas_limit,
+})
+
+
+async def execute_payout(repo_name: str) -> Dict[str, Any]:
+    """Start sending a repo's planned batches that haven't been paid yet, in order
+
+    Returns right away; poll get_payout for progress. Starting again resumes a
+    payout that stopped.
+    """
+    try:
+        sender = get_payout_sender()
+        batches = await adb.get_payout_batches(repo_name)
+        if not batches:
+            return {"error": f"No payout planned for {repo_name}"}
+        payout_jobs.start(repo_name, sender)
+        return dict(_describe_payout(repo_name, batches), **payout_jobs.status(repo_name))
+    except Exception as e:
+        return {"error": f"Error executing payout: {str(e)}"}
+
+
+async def get_payout(repo_name: str, include_calldata: bool = False) -> Dict[str, Any]:
+    """Progress of a repo's payout plan, and whether it is being sent by this worker"""
+    batches = await adb.get_payout_batches(repo_name)
+    if not batches:
+        return {"error": f"No payout planned for {repo_name}"}
+    return dict(_describe_payout(repo_name, batches, include_calldata=include_calldata),
+                **payout_jobs.status(repo_name))
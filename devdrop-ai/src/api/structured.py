@@ -0,0 +1,101 @@
+# api/structured.py
+import json
+import math
+import re
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+from .schemas import Evaluation
+
+T = TypeVar("T")
+
+_FENCE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL | re.IGNORECASE)
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+EVALUATION_SCHEMA_HINT = '{"total_points": <float>, "justification": "<string>"}'
+BATCH_SCHEMA_HINT = '[{"username": "<string>", "total_points": <float>, "justification": "<string>"}, ...]'
+
+
+class StructuredOutputError(ValueError):
+    """Model output could not be turned into the expected structure"""
+
+
+def extract_json(text: str, expect: type = dict) -> Any:
+    """First JSON value of type `expect` in model output
+
+    Tolerates code fences, prose around the JSON, several JSON values (the first
+    one of the right type wins) and trailing commas.
+    """
+    candidates = [match.group(1) for match in _FENCE.finditer(text)] + [text]
+    for candidate in candidates:
+        for variant in (candidate, _TRAILING_COMMA.sub(r"\1", candidate)):
+            value = _scan(variant, expect)
+            if value is not None:
+                return value
+    kind = "object" if expect is dict else "array"
+    raise StructuredOutputError(f"No JSON {kind} found in model output")
+
+
+def _scan(text: str, expect: type) -> Optional[Any]:
+    decoder = json.JSONDecoder()
+    opener = "{" if expect is dict else "["
+    index = text.find(opener)
+    while index != -1:
+        try:
+            value, _ = decoder.raw_decode(text, index)
+            if isinstance(value, expect):
+                return value
+        except ValueError:
+            pass
+        index = text.find(opener, index + 1)
+    return None
+
+
+def validate_evaluation(item: Any, model: type = Evaluation) -> Dict[str, Any]:
+    """{total_points, justification} of a well-formed evaluation; raises ValueError"""
+    if not isinstance(item, dict):
+        raise StructuredOutputError("Evaluation is not a JSON object")
+    evaluation = model(**item)
+    if not math.isfinite(evaluation.total_points):
+        raise StructuredOutputError("total_points is not a finite number")
+    if not evaluation.justification.strip():
+        raise StructuredOutputError("justification is empty")
+    return {"total_points": evaluation.total_points, "justification": evaluation.justification}
+
+
+def parse_evaluation(text: str) -> Dict[str, Any]:
+    return validate_evaluation(extract_json(text, dict))
+
+
+def parse_evaluation_list(text: str) -> List[Any]:
+    # Entries are validated one by one by the caller
+    return extract_json(text, list)
+
+
+async def complete_structured(call: Callable[[List[Dict[str, str]]], Awaitable[str]],
+                              messages: List[Dict[str, str]],
+                              parse: Callable[[str], T],
+                              schema_hint: str,
+                              max_repairs: int = 1) -> T:
+    """Call the model and parse its output, re-asking with only the bad output on failure
+
+    A repair request contains the invalid output and the expected shape, not the
+    original prompt, so it costs a fraction of the first call.
+    """
+    output = await call(messages)
+    for attempt in range(max_repairs + 1):
+        try:
+            return parse(output)
+        except ValueError as e:
+            error = e
+        if attempt < max_repairs:
+            output = await call(_repair_messages(output, schema_hint, error))
+    raise StructuredOutputError(f"Invalid model output: {error}")
+
+
+def _repair_messages(output: str, schema_hint: str, error: Exception) -> List[Dict[str, str]]:
+    return [{
+        "role": "system",
+        "content": f"The user's text was meant to be JSON of the form {schema_hint} but is invalid ({str(error)[:300]}). Rewrite it as valid JSON of that form, keeping the values. Respond with the JSON only."
+    }, {
+        "role": "user",
+        "content": output
+    }]
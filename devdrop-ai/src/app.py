@@ -1,10 +1,27 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .middleware import register_middleware
 from .api.routes import router as api_router
+from .api.service import evaluation_jobs, warm_up, shutdown
 
 
-app = FastAPI(title="Agentic Ethereum")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Resume batch evaluation jobs interrupted by a restart
+    await evaluation_jobs.resume()
+    # Model, GitHub, Twitter and agent setup happens in the background so the
+    # server accepts requests immediately; set APP_WARMUP=0 to only build on use
+    warmup = asyncio.create_task(warm_up()) if os.getenv("APP_WARMUP", "1") != "0" else None
+    yield
+    if warmup is not None:
+        warmup.cancel()
+    await shutdown()
+
+
+app = FastAPI(title="Agentic Ethereum", lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -1,3 +1,4 @@
+import asyncio
 from langchain.tools import BaseTool
 from pydantic import BaseModel, Field
 from typing import Type
@@ -37,6 +38,6 @@ class AirdropStoreTool(BaseTool):
         except Exception as e:
             return f"Failed to store airdrop information: {str(e)}"
 
-    async def arun(self, repo_name: str, airdrop_date: str, total_tokens: int) -> str:
-        # For now, simply delegate to the synchronous _run method.
-        return self._run(repo_name, airdrop_date, total_tokens)
+    async def _arun(self, repo_name: str, airdrop_date: str, total_tokens: int, **kwargs) -> str:
+        # The database write is blocking; keep it off the event loop
+        return await asyncio.to_thread(self._run, repo_name, airdrop_date, total_tokens)
@@ -0,0 +1,143 @@
+# tools/github_pool.py
+import hashlib
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from github import Github, Auth, GithubException
+from .repo_index import RepoIndex
+from .http_cache import install_http_cache
+from .token_limits import install_token_limits
+
+
+class RateLimitExhausted(GithubException):
+    """Every token that can reach a repository is out of budget"""
+
+    def __init__(self, reset_at: float):
+        self.reset_at = reset_at
+        message = f"GitHub rate limit exhausted for all tokens; resets in {max(0, int(reset_at - time.time()))}s"
+        super().__init__(403, {"message": message}, None, message)
+
+
+class _TokenClient:
+    def __init__(self, token: str):
+        self.token_id = hashlib.sha256(token.encode()).hexdigest()[:8]
+        self.github = Github(auth=Auth.Token(token), per_page=100)
+        self.index = RepoIndex(self.github)
+        self.parked_until = 0.0
+
+    def budget(self) -> Tuple[int, float]:
+        """(remaining requests, reset epoch) as of the last response seen"""
+        remaining, _ = self.github.rate_limiting
+        return remaining, float(self.github.rate_limiting_resettime)
+
+
+class GitHubClientPool:
+    """Routes GitHub work across every linked user's token
+
+    Each token keeps its own client, repo index and rate-limit view (PyGithub
+    records X-RateLimit-Remaining/Reset from every response). Work for a repo goes
+    to the token with the most remaining budget among those that can see it;
+    tokens at or below `reserve` are parked until their reset time. At most
+    `per_token` requests are in flight with any one token.
+    """
+
+    def __init__(self, tokens: List[str], reserve: Optional[int] = None, per_token: Optional[int] = None):
+        self.reserve = reserve if reserve is not None else int(os.getenv("GITHUB_TOKEN_RESERVE", "50"))
+        self.per_token = per_token if per_token is not None else int(os.getenv("GITHUB_CONCURRENCY_PER_TOKEN", "2"))
+        limits = install_token_limits()
+        for token in tokens:
+            limits.register(token, self.per_token)
+        # Conditional requests answered from the on-disk cache don't cost rate
+        # limit; installed after the token limits, which it builds on
+        install_http_cache()
+        # Same token linked by several users only counts once
+        self._clients = [_TokenClient(token) for token in dict.fromkeys(tokens)]
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def find_repo(self, repo_name: str) -> Optional[Any]:
+        """Repository object bound to the best available token that can access it"""
+        candidates = []
+        for client in self._clients:
+            repo = client.index.find(repo_name) if self._is_available(client) else None
+            if repo is not None:
+                candidates.append((client, repo))
+        if not candidates:
+            # The repo may only be visible to parked tokens; check what they already
+            # know without spending their (exhausted) budget
+            for client in self._clients:
+                if client.parked_until > time.time() and client.index.peek(repo_name) is not None:
+                    raise RateLimitExhausted(client.parked_until)
+            return None
+        return self._best(candidates)[1]
+
+    def repositories(self) -> List[Any]:
+        """Every repository visible to at least one token, each bound to the best token"""
+        by_full_name: Dict[str, List[Tuple[_TokenClient, Any]]] = {}
+        for client in self._clients:
+            if not self._is_available(client):
+                continue
+            for repo in client.index.repositories():
+                by_full_name.setdefault(repo.full_name.lower(), []).append((client, repo))
+        if not by_full_name:
+            self._raise_if_all_parked()
+        return [self._best(candidates)[1] for candidates in by_full_name.values()]
+
+    def client(self) -> Github:
+        """Client with the most remaining budget, for calls not tied to a repo"""
+        available = [(client, None) for client in self._clients if self._is_available(client)]
+        if not available:
+            self._raise_if_all_parked()
+        return self._best(available)[0].github
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Per-token budget, identified by a short hash of the token"""
+        stats = []
+        for client in self._clients:
+            remaining, reset_at = client.budget()
+            stats.append({
+                "token": client.token_id,
+                "remaining": remaining,
+                "reset_at": reset_at,
+                "parked": client.parked_until > time.time(),
+            })
+        return stats
+
+    def _best(self, candidates):
+        return max(candidates, key=lambda candidate: candidate[0].budget()[0])
+
+    def _is_available(self, client: _TokenClient) -> bool:
+        now = time.time()
+        with self._lock:
+            if client.parked_until > now:
+                return False
+        remaining, reset_at = client.budget()
+        if remaining <= self.reserve and reset_at > now:
+            with self._lock:
+                client.parked_until = reset_at
+            return False
+        return True
+
+    def _raise_if_all_parked(self) -> None:
+        with self._lock:
+            parked = [client.parked_until for client in self._clients if client.parked_until > time.time()]
+        if parked and len(parked) == len(self._clients):
+            raise RateLimitExhausted(min(parked))
+
+
+_pools: Dict[str, GitHubClientPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_client_pool(tokens: List[str]) -> GitHubClientPool:
+    """Process-wide pool per token set, so short-lived GitHubTool instances share budgets"""
+    key = hashlib.sha256("\n".join(sorted(set(tokens))).encode()).hexdigest()
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = GitHubClientPool(tokens)
+            _pools[key] = pool
+        return pool
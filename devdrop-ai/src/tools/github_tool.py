@@ -1,12 +1,46 @@
 # tools/github_tool.py
 from langchain.tools import BaseTool
-from github import Github, Auth, GithubException
+from github import GithubException
 from pydantic import BaseModel, Field, PrivateAttr
 from typing import Optional, Any, Dict, List, Type
 import os
-import re
+from collections import Counter
+from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from ..api.db import DatabaseOperations
+from ..api.scoring import ISSUE_CLOSE, ISSUE_REFERENCE
+from .github_pool import GitHubClientPool, get_client_pool
+from .http_cache import get_http_cache_stats
+
+ISSUE_BATCH_SIZE = 50
+
+USER_ID_QUERY = """
+query($login: String!) {
+  user(login: $login) { id }
+}
+"""
+
+COMMIT_HISTORY_QUERY = """
+query($owner: String!, $name: String!, $authorId: ID!, $cursor: String, $since: GitTimestamp) {
+  repository(owner: $owner, name: $name) {
+    defaultBranchRef {
+      target {
+        ... on Commit {
+          history(first: 100, after: $cursor, author: {id: $authorId}, since: $since) {
+            pageInfo { hasNextPage endCursor }
+            nodes { oid message additions deletions changedFilesIfAvailable committedDate }
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+ISSUE_LABELS_FRAGMENT = (
+    "... on Issue { labels(first: 20) { nodes { name } } } "
+    "... on PullRequest { labels(first: 20) { nodes { name } } }"
+)
 
 class GitHubToolInput(BaseModel):
     action: str = Field(
@@ -33,27 +67,31 @@ class GitHubTool(BaseTool):
     )
     args_schema: Type[BaseModel] = GitHubToolInput
     
-    _github: Optional[Any] = PrivateAttr()
+    _pool: Optional[GitHubClientPool] = PrivateAttr()
     _db: Optional[DatabaseOperations] = PrivateAttr()
+    _fetch_mode: str = PrivateAttr()
+    _sync_overlap: timedelta = PrivateAttr()
 
     def __init__(self) -> None:
         super().__init__()
         load_dotenv()
+        # "graphql" batches commit history and issue lookups; "rest" is one call per commit
+        self._fetch_mode = os.getenv("GITHUB_FETCH_MODE", "graphql").lower()
+        # Incremental syncs re-fetch this far before the watermark: commits merged
+        # with a merge commit keep their original committer dates, so they can
+        # land on the default branch dated before commits already synced
+        self._sync_overlap = timedelta(days=float(os.getenv("EVAL_SYNC_OVERLAP_DAYS", "3")))
         
         # Initialize database operations
         self._db = DatabaseOperations(os.getenv("DB_URL"))
         
-        # Initialize GitHub client
-        tokens = self._db.get_github_tokens()
-        if tokens:
-            auth = Auth.Token(tokens[0])
-            self._github = Github(auth=auth)
-        else:
-            self._github = None
+        # Initialize GitHub clients, one per linked user's token
+        tokens = [token for token in self._db.get_github_tokens() if token]
+        self._pool = get_client_pool(tokens) if tokens else None
 
     def _run(self, action: str, **kwargs) -> Dict[str, Any]:
         """Execute GitHub actions with automatic data storage"""
-        if not self._github:
+        if not self._pool:
             return {"error": "No GitHub tokens available"}
 
         try:
@@ -66,26 +104,31 @@ class GitHubTool(BaseTool):
                     self._store_contributors_data(kwargs.get("repo_name"), result)
                 return result
             elif action == "get_contributor_evaluation":
-                result = self.get_contributor_evaluation(
+                # Fetches only commits newer than the stored watermark
+                return self.get_synced_contributor_evaluation(
                     kwargs.get("repo_name"),
                     kwargs.get("contributor_login")
                 )
-                # Store detailed commit data if successful
-                if "error" not in result:
-                    self._store_contributor_commits(
-                        kwargs.get("repo_name"),
-                        kwargs.get("contributor_login"),
-                        result
-                    )
-                return result
             return {"error": f"Unknown action: {action}"}
         except Exception as e:
             return {"error": f"Action failed: {str(e)}"}
 
+    @property
+    def token_count(self) -> int:
+        """Number of distinct GitHub tokens work is spread across"""
+        return len(self._pool) if self._pool else 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-token rate-limit budgets and HTTP cache counters"""
+        return {
+            "tokens": self._pool.stats() if self._pool else [],
+            "http_cache": get_http_cache_stats()
+        }
+
     def list_repos(self) -> Dict[str, List[str]]:
         """List all accessible repositories"""
         try:
-            repos = [repo.name for repo in self._github.get_user().get_repos()]
+            repos = [repo.name for repo in self._pool.repositories()]
             return {"repositories": repos}
         except GithubException as e:
             return {"error": str(e)}
@@ -103,26 +146,29 @@ class GitHubTool(BaseTool):
             return {
                 "contributors": {
                     repo.name: self._get_repo_contributors(repo)
-                    for repo in self._github.get_user().get_repos()
+                    for repo in self._pool.repositories()
                 }
             }
         except GithubException as e:
             return {"error": str(e)}
 
-    def get_contributor_evaluation(self, repo_name: str, contributor_login: str) -> Dict[str, Any]:
-        """Get detailed commit information for evaluation"""
+    def get_contributor_evaluation(self, repo_name: str, contributor_login: str,
+                                   since: Optional[datetime] = None) -> Dict[str, Any]:
+        """Get detailed commit information for evaluation, optionally only commits since a date"""
         try:
             repo = self._find_repo(repo_name)
             if not repo:
                 return {"error": f"Repository '{repo_name}' not found"}
 
-            commits = repo.get_commits(author=contributor_login)
-            commit_data = []
-            
-            for commit in commits:
-                commit_detail = self._get_commit_details(repo, commit.sha)
-                if commit_detail:
-                    commit_data.append(self._process_commit(repo, commit_detail))
+            commit_data = None
+            if self._fetch_mode == "graphql":
+                try:
+                    commit_data = self._get_commits_graphql(repo, contributor_login, since)
+                except GithubException:
+                    # e.g. a token without GraphQL access; the REST path still works
+                    commit_data = None
+            if commit_data is None:
+                commit_data = self._get_commits_rest(repo, contributor_login, since)
 
             return {
                 "GITHUB USERNAME": contributor_login,
@@ -131,34 +177,190 @@ class GitHubTool(BaseTool):
         except GithubException as e:
             return {"error": str(e)}
 
+    def get_synced_contributor_evaluation(self, repo_name: str, contributor_login: str) -> Dict[str, Any]:
+        """Sync new commits into storage, then return the contributor's full commit history
+
+        Commits are fetched from EVAL_SYNC_OVERLAP_DAYS before the stored (repo,
+        contributor) watermark and appended; ones already stored are skipped by
+        the table's key, so re-syncs cost proportionally to new work. If the
+        watermark commit is not among them (history was rewritten), the
+        contributor is fully resynced.
+        """
+        watermark = self._db.get_commit_watermark(repo_name, contributor_login)
+        full = watermark is None or watermark["last_commit_at"] is None
+        since = None if full else watermark["last_commit_at"] - self._sync_overlap
+        result = self.get_contributor_evaluation(repo_name, contributor_login, since=since)
+        if "error" in result:
+            return result
+        commits = result["commits"]
+
+        if not full and watermark["last_sha"] not in {commit["sha"] for commit in commits}:
+            full = True
+            result = self.get_contributor_evaluation(repo_name, contributor_login)
+            if "error" in result:
+                return result
+            commits = result["commits"]
+
+        latest = max(commits, key=lambda commit: commit["committedAt"] or "", default=None)
+        new_commits = self._db.append_contributor_commits(
+            repo_name,
+            contributor_login,
+            commits,
+            last_sha=latest["sha"] if latest else None,
+            last_commit_at=latest["committedAt"] if latest else None,
+            # A full fetch replaces older data
+            replace=full
+        )
+
+        stored = self._db.get_contributor_data(repo_name, contributor_login) or {}
+        return {
+            "GITHUB USERNAME": contributor_login,
+            "commits": stored.get("detailed_commits", []),
+            "new_commits": new_commits
+        }
+
+    def _get_commits_rest(self, repo, contributor_login: str,
+                          since: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Commit records via REST: one request per commit plus one per referenced issue"""
+        if since:
+            commits = repo.get_commits(author=contributor_login, since=since)
+        else:
+            commits = repo.get_commits(author=contributor_login)
+        commit_data = []
+
+        for commit in commits:
+            commit_detail = self._get_commit_details(repo, commit.sha)
+            if commit_detail:
+                commit_data.append(self._process_commit(repo, commit_detail))
+        return commit_data
+
+    def _get_commits_graphql(self, repo, contributor_login: str,
+                             since: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Commit records via GraphQL: pages of 100 commits plus batched issue lookups"""
+        _, data = self._graphql(repo, USER_ID_QUERY, {"login": contributor_login})
+        user = data["data"]["user"]
+        if not user:
+            return []
+
+        nodes = []
+        cursor = None
+        while True:
+            _, data = self._graphql(repo, COMMIT_HISTORY_QUERY, {
+                "owner": repo.owner.login,
+                "name": repo.name,
+                "authorId": user["id"],
+                "cursor": cursor,
+                "since": since.isoformat() if since else None,
+            })
+            branch = data["data"]["repository"]["defaultBranchRef"]
+            if not branch:
+                break
+            history = branch["target"]["history"]
+            nodes.extend(history["nodes"])
+            if not history["pageInfo"]["hasNextPage"]:
+                break
+            cursor = history["pageInfo"]["endCursor"]
+
+        issue_numbers = sorted({
+            int(num) for node in nodes for num in self._referenced_issues(node["message"])
+        })
+        labels_by_issue = self._get_issue_labels_graphql(repo, issue_numbers)
+
+        commit_data = []
+        for node in nodes:
+            labels = []
+            for num in self._referenced_issues(node["message"]):
+                labels.extend(labels_by_issue.get(int(num), []))
+            commit_data.append(self._commit_record(
+                node["oid"],
+                node["committedDate"].replace("Z", "+00:00"),
+                node["message"],
+                node["additions"],
+                node["deletions"],
+                node["changedFilesIfAvailable"] or 0,
+                labels
+            ))
+        return commit_data
+
+    def _get_issue_labels_graphql(self, repo, issue_numbers: List[int]) -> Dict[int, List[str]]:
+        """Labels of many issues/PRs, fetched ISSUE_BATCH_SIZE at a time via aliases"""
+        labels: Dict[int, List[str]] = {}
+        for start in range(0, len(issue_numbers), ISSUE_BATCH_SIZE):
+            batch = issue_numbers[start:start + ISSUE_BATCH_SIZE]
+            fields = " ".join(
+                f"i{num}: issueOrPullRequest(number: {num}) {{ {ISSUE_LABELS_FRAGMENT} }}"
+                for num in batch
+            )
+            query = (
+                "query($owner: String!, $name: String!) { "
+                f"repository(owner: $owner, name: $name) {{ {fields} }} }}"
+            )
+            # Unknown numbers come back as null with a NOT_FOUND error; keep the rest
+            _, data = self._graphql(repo, query, {"owner": repo.owner.login, "name": repo.name},
+                                    allow_partial=True)
+            found = (data.get("data") or {}).get("repository") or {}
+            for num in batch:
+                issue = found.get(f"i{num}")
+                if issue and issue.get("labels"):
+                    labels[num] = [label["name"] for label in issue["labels"]["nodes"]]
+        return labels
+
+    def _graphql(self, repo, query: str, variables: Dict[str, Any], allow_partial: bool = False):
+        """Run a GraphQL query with the token the repository was resolved through"""
+        requester = repo.requester
+        headers, data = requester.requestJsonAndCheck(
+            "POST", requester.graphql_url, input={"query": query, "variables": variables}
+        )
+        if data.get("errors") and not (allow_partial and data.get("data")):
+            raise GithubException(400, data, headers)
+        return headers, data
+
     def _process_commit(self, repo, commit_detail):
         """Process individual commit details"""
         message = commit_detail.commit.message.strip()
-        closes_issue = bool(re.search(r"closes\s+#\d+", message, re.IGNORECASE))
-        
-        issue_numbers = re.findall(r"(?:fixes|closes)\s+#(\d+)", message, re.IGNORECASE)
         labels = []
-        for num in issue_numbers:
+        for num in self._referenced_issues(message):
             try:
                 issue = repo.get_issue(int(num))
                 labels.extend([label.name for label in issue.labels])
             except GithubException:
                 continue
 
+        return self._commit_record(
+            commit_detail.sha,
+            commit_detail.commit.committer.date.isoformat(),
+            message,
+            commit_detail.stats.additions,
+            commit_detail.stats.deletions,
+            len(list(commit_detail.files)),
+            labels
+        )
+
+    @staticmethod
+    def _referenced_issues(message: str) -> List[str]:
+        return ISSUE_REFERENCE.findall(message)
+
+    @staticmethod
+    def _commit_record(sha: str, committed_at: Optional[str], message: str,
+                       additions: Optional[int], deletions: Optional[int],
+                       files_changed: int, labels: List[str]) -> Dict[str, Any]:
+        """Commit record in the shape stored and used for evaluation prompts"""
+        message = message.strip()
         return {
+            "sha": sha,
+            "committedAt": committed_at,
             "commitMessage": message,
-            "linesChanged": (commit_detail.stats.additions or 0) + (commit_detail.stats.deletions or 0),
-            "filesChanged": len(list(commit_detail.files)),
-            "closesIssue": closes_issue,
+            "linesChanged": (additions or 0) + (deletions or 0),
+            "additions": additions,
+            "deletions": deletions,
+            "filesChanged": files_changed,
+            "closesIssue": bool(ISSUE_CLOSE.search(message)),
             "issueLabels": labels
         }
 
     def _find_repo(self, repo_name: str) -> Optional[Any]:
         """Find repository by name"""
-        for repo in self._github.get_user().get_repos():
-            if repo.name.lower() == repo_name.lower():
-                return repo
-        return None
+        return self._pool.find_repo(repo_name)
 
     def _get_commit_details(self, repo, sha: str) -> Optional[Any]:
         """Get commit details safely"""
@@ -169,28 +371,42 @@ class GitHubTool(BaseTool):
 
     def _get_repo_contributors(self, repo) -> List[Dict[str, Any]]:
         """Get contributor information for a repository"""
+        issues, pulls = self._count_issues_by_author(repo)
         return [{
             "login": c.login,
             "contributions": c.contributions,
-            "issues": repo.get_issues(creator=c.login).totalCount,
-            "pullRequests": repo.get_pulls(state='all').totalCount
+            "issues": issues[c.login],
+            "pullRequests": pulls[c.login]
         } for c in repo.get_contributors()]
 
+    def _count_issues_by_author(self, repo):
+        """Count issues and pull requests per author in one pass over the repo's issues
+
+        `issues` keeps the meaning of the per-contributor creator search it
+        replaced (the default open state, which the issues API fills with open
+        pull requests too), so issues_created and the scores built on it don't
+        shift. `pulls` counts pull requests in any state.
+        """
+        issues = Counter()
+        pulls = Counter()
+        # The issues listing includes pull requests. Tell them apart by html_url:
+        # reading `pull_request` on a plain issue would trigger a fetch per issue
+        for issue in repo.get_issues(state="all"):
+            if issue.user is None:
+                continue
+            if "/pull/" in issue.html_url:
+                pulls[issue.user.login] += 1
+            if issue.state == "open":
+                issues[issue.user.login] += 1
+        return issues, pulls
+
     def _store_contributors_data(self, repo_name: str, data: Dict[str, Any]) -> None:
         """Store contributor data in database"""
         if "contributors" in data:
             contributors = data["contributors"]
             if isinstance(contributors, dict):
                 # Multiple repos
-                for repo, repo_contributors in contributors.items():
-                    for contributor in repo_contributors:
-                        self._db.store_contributor_data(repo, contributor)
+                self._db.store_contributor_data_bulk(contributors)
             else:
                 # Single repo
-                for contributor in contributors:
-                    self._db.store_contributor_data(repo_name, contributor)
-
-    def _store_contributor_commits(self, repo_name: str, username: str, data: Dict[str, Any]) -> None:
-        """Store detailed commit data in database"""
-        if "commits" in data:
-            self._db.store_contributor_commits(repo_name, username, data["commits"])
\ No newline at end of file
+                self._db.store_contributor_data_bulk({repo_name: contributors})
@@ -0,0 +1,207 @@
+# tools/http_cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+import requests
+from github.Requester import Requester
+from .token_limits import LimitedHTTPConnection, LimitedHTTPSConnection
+
+
+class ResponseCache:
+    """Size-bounded SQLite store of GitHub GET responses and their ETags"""
+
+    def __init__(self, path: str, max_bytes: int):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                etag TEXT NOT NULL,
+                headers TEXT NOT NULL,
+                body TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed_idx ON responses (accessed_at)")
+        self._conn.commit()
+        self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        self._counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    @staticmethod
+    def key(url: str, headers: Dict[str, str]) -> str:
+        """Cache key: URL plus the token and media type the response was produced for"""
+        lowered = {k.lower(): v for k, v in headers.items()}
+        scope = "\n".join([url, lowered.get("authorization", ""), lowered.get("accept", "")])
+        return hashlib.sha256(scope.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[str, Dict[str, str], str]]:
+        """(etag, headers, body) for a key, if cached"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, headers, body FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1]), row[2]
+
+    def touch(self, key: str) -> None:
+        with self._lock:
+            self._counters["hits"] += 1
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+
+    def miss(self) -> None:
+        with self._lock:
+            self._counters["misses"] += 1
+
+    def put(self, key: str, url: str, etag: str, headers: Dict[str, str], body: str) -> None:
+        encoded_headers = json.dumps(headers)
+        size = len(body) + len(encoded_headers)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute("""
+                INSERT OR REPLACE INTO responses (key, url, etag, headers, body, size, accessed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (key, url, etag, encoded_headers, body, size, time.time()))
+            self._size += size - (previous[0] if previous else 0)
+            self._counters["stores"] += 1
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        # Drop least recently used entries until comfortably under the bound
+        target = int(self.max_bytes * 0.9)
+        while self._size > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at LIMIT 100"
+            ).fetchall()
+            if not rows:
+                self._size = 0
+                return
+            for key, size in rows:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._size -= size
+                self._counters["evictions"] += 1
+                if self._size <= target:
+                    return
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["entries"] = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        stats["size_bytes"] = self._size
+        stats["max_bytes"] = self.max_bytes
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+class _CachedResponse:
+    """Mimics PyGithub's RequestsResponse for a revalidated cache entry"""
+
+    def __init__(self, headers: Dict[str, str], body: str):
+        self.status = 200
+        self.headers = headers
+        self._body = body
+
+    def getheaders(self):
+        return self.headers.items()
+
+    def read(self) -> str:
+        return self._body
+
+
+def _caching_connection_class(base, cache: ResponseCache):
+    """Connection class that turns GETs into conditional requests backed by `cache`"""
+    sessions: Dict[Tuple[str, int], requests.Session] = {}
+    sessions_lock = threading.Lock()
+
+    class CachingConnection(base):
+        def __init__(self, host, port=None, strict=False, timeout=None, retry=None, pool_size=None, **kwargs):
+            super().__init__(host, port, strict, timeout, retry, pool_size, **kwargs)
+            # Injected classes are not persisted by PyGithub, so keep one keep-alive
+            # session per host instead of a new TLS handshake per request
+            with sessions_lock:
+                shared = sessions.get((self.host, self.port))
+                if shared is None:
+                    sessions[(self.host, self.port)] = self.session
+                else:
+                    self.session.close()
+                    self.session = shared
+
+        def request(self, verb, url, input, headers, stream=False):
+            self._cache_key = None
+            self._cached = None
+            if verb == "GET" and not stream:
+                self._cache_key = ResponseCache.key(url, headers)
+                self._cached = cache.get(self._cache_key)
+                if self._cached is not None:
+                    headers = dict(headers, **{"If-None-Match": self._cached[0]})
+            super().request(verb, url, input, headers, stream)
+
+        def getresponse(self):
+            response = super().getresponse()
+            if self._cache_key is None:
+                return response
+            if response.status == 304 and self._cached is not None:
+                cache.touch(self._cache_key)
+                etag, headers, body = self._cached
+                # Fresh rate-limit headers from the 304; pagination links from the cache
+                headers.update({k.lower(): v for k, v in response.getheaders()})
+                return _CachedResponse(headers, body)
+            cache.miss()
+            headers = {k.lower(): v for k, v in response.getheaders()}
+            if response.status == 200 and headers.get("etag"):
+                cache.put(self._cache_key, self.url, headers["etag"], headers, response.read())
+            return response
+
+        def close(self):
+            # The session is shared between connections
+            pass
+
+    return CachingConnection
+
+
+_cache: Optional[ResponseCache] = None
+_install_lock = threading.Lock()
+
+
+def install_http_cache() -> Optional[ResponseCache]:
+    """Route every PyGithub request through the on-disk cache (idempotent)
+
+    Configured with GITHUB_HTTP_CACHE (set to 0 to disable), GITHUB_HTTP_CACHE_PATH
+    and GITHUB_HTTP_CACHE_MAX_MB.
+    """
+    global _cache
+    with _install_lock:
+        if _cache is not None or os.getenv("GITHUB_HTTP_CACHE", "1") == "0":
+            return _cache
+        default_path = os.path.join(os.path.dirname(__file__), ".cache", "github_http.sqlite")
+        _cache = ResponseCache(
+            os.getenv("GITHUB_HTTP_CACHE_PATH", default_path),
+            int(float(os.getenv("GITHUB_HTTP_CACHE_MAX_MB", "256")) * 1024 * 1024),
+        )
+        # Cached connections keep the per-token request limits
+        Requester.injectConnectionClasses(
+            _caching_connection_class(LimitedHTTPConnection, _cache),
+            _caching_connection_class(LimitedHTTPSConnection, _cache),
+        )
+        return _cache
+
+
+def get_http_cache_stats() -> Optional[Dict[str, Any]]:
+    return _cache.stats() if _cache else None
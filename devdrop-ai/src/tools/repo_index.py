@@ -0,0 +1,97 @@
+# tools/repo_index.py
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+
+def _header(headers: Dict[str, Any], name: str) -> Optional[str]:
+    name = name.lower()
+    return next((value for key, value in headers.items() if key.lower() == name), None)
+
+
+class RepoIndex:
+    """In-memory index of the repositories a GitHub client can see
+
+    Lookups by lowercase name or full_name are dict hits. Once the TTL expires the
+    index is revalidated with a conditional request for the most recently updated
+    repos; GitHub answers 304 (not charged against the rate limit) unless a repo
+    was created, renamed or updated, and only then is the full listing re-fetched.
+    """
+
+    VALIDATOR_PARAMS = {"sort": "updated", "direction": "desc", "per_page": 100}
+
+    def __init__(self, github, ttl: Optional[float] = None, miss_revalidate_interval: float = 30.0):
+        self._github = github
+        self.ttl = ttl if ttl is not None else float(os.getenv("GITHUB_REPO_INDEX_TTL", "900"))
+        self.miss_revalidate_interval = miss_revalidate_interval
+        self._repos: List[Any] = []
+        self._by_name: Dict[str, Any] = {}
+        self._etag: Optional[str] = None
+        self._loaded = False
+        self._expires_at = 0.0
+        self._validated_at = 0.0
+        self._lock = threading.Lock()
+
+    def find(self, repo_name: str) -> Optional[Any]:
+        """Repository by name or owner/name, case-insensitively"""
+        key = repo_name.lower()
+        with self._lock:
+            self._ensure_fresh()
+            repo = self._by_name.get(key)
+            # A miss may be a repo created since the last refresh; revalidate,
+            # but not on every miss for names that simply don't exist
+            if repo is None and time.monotonic() - self._validated_at >= self.miss_revalidate_interval:
+                self._revalidate()
+                repo = self._by_name.get(key)
+            return repo
+
+    def peek(self, repo_name: str) -> Optional[Any]:
+        """Lookup in the current index without any network revalidation"""
+        with self._lock:
+            return self._by_name.get(repo_name.lower())
+
+    def repositories(self) -> List[Any]:
+        """All repositories visible to the client"""
+        with self._lock:
+            self._ensure_fresh()
+            return list(self._repos)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._expires_at = 0.0
+
+    def _ensure_fresh(self) -> None:
+        if not self._loaded:
+            self._rebuild(self._fetch_validator_etag())
+        elif time.monotonic() >= self._expires_at:
+            self._revalidate()
+
+    def _revalidate(self) -> None:
+        etag = self._fetch_validator_etag()
+        if etag is None or etag != self._etag:
+            self._rebuild(etag)
+        else:
+            self._expires_at = time.monotonic() + self.ttl
+
+    def _fetch_validator_etag(self) -> Optional[str]:
+        headers = {"If-None-Match": self._etag} if self._etag else None
+        response_headers, _ = self._github.requester.requestJsonAndCheck(
+            "GET", "/user/repos", parameters=self.VALIDATOR_PARAMS, headers=headers
+        )
+        self._validated_at = time.monotonic()
+        return _header(response_headers, "etag")
+
+    def _rebuild(self, etag: Optional[str]) -> None:
+        repos = list(self._github.get_user().get_repos())
+        by_name: Dict[str, Any] = {}
+        for repo in repos:
+            # Keep the first match per short name, like the old linear scan did
+            by_name.setdefault(repo.name.lower(), repo)
+            by_name[repo.full_name.lower()] = repo
+        self._repos = repos
+        self._by_name = by_name
+        self._etag = etag
+        self._loaded = True
+        self._expires_at = time.monotonic() + self.ttl
+
@@ -0,0 +1,76 @@
+# tools/token_limits.py
+import hashlib
+import threading
+from typing import Dict, Optional
+from github.Requester import Requester, HTTPRequestsConnectionClass, HTTPSRequestsConnectionClass
+
+
+class TokenRequestLimits:
+    """Cap on GitHub requests in flight per token, across every client using it
+
+    Requests are matched to a token by their Authorization header, so the cap
+    holds for whichever token GitHubClientPool picked for a piece of work.
+    Requests made with unregistered tokens are not limited.
+    """
+
+    def __init__(self):
+        self._slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def register(self, token: str, concurrency: int) -> None:
+        """Allow `concurrency` requests at once with `token` (first registration wins)"""
+        with self._lock:
+            self._slots.setdefault(self.key(token), threading.BoundedSemaphore(max(1, concurrency)))
+
+    def slot(self, headers: Dict[str, str]) -> Optional[threading.BoundedSemaphore]:
+        authorization = next((v for k, v in headers.items() if k.lower() == "authorization"), None)
+        if not authorization:
+            return None
+        # "token <token>" or "Bearer <token>"
+        token = authorization.split(" ", 1)[-1]
+        with self._lock:
+            return self._slots.get(self.key(token))
+
+
+def limited_connection_class(base, limits: TokenRequestLimits):
+    """Connection class that holds the token's slot for the HTTP round trip"""
+
+    class LimitedConnection(base):
+        def request(self, verb, url, input, headers, stream=False):
+            self._slot = limits.slot(headers)
+            super().request(verb, url, input, headers, stream)
+
+        def getresponse(self):
+            # PyGithub's requests-based connections send the request here
+            if self._slot is None:
+                return super().getresponse()
+            with self._slot:
+                return super().getresponse()
+
+    return LimitedConnection
+
+
+token_limits = TokenRequestLimits()
+LimitedHTTPConnection = limited_connection_class(HTTPRequestsConnectionClass, token_limits)
+LimitedHTTPSConnection = limited_connection_class(HTTPSRequestsConnectionClass, token_limits)
+
+_installed = False
+_install_lock = threading.Lock()
+
+
+def install_token_limits() -> TokenRequestLimits:
+    """Route every PyGithub request through the per-token limits (idempotent)
+
+    install_http_cache builds its connections on top of these, so it must run
+    after this when both are used.
+    """
+    global _installed
+    with _install_lock:
+        if not _installed:
+            Requester.injectConnectionClasses(LimitedHTTPConnection, LimitedHTTPSConnection)
+            _installed = True
+        return token_limits
@@ -1,3 +1,4 @@
+import threading
 from twitter_langchain import (
     TwitterApiWrapper, 
     TwitterToolkit
@@ -7,13 +8,22 @@ from twitter_langchain import (
 from dotenv import load_dotenv
 load_dotenv()
 
-# Create a TwitterApiWrapper object
-twitter_api_wrapper = TwitterApiWrapper()
+_twitter_toolkit = None
+_twitter_lock = threading.Lock()
 
-twitter_toolkit = TwitterToolkit.from_twitter_api_wrapper(twitter_api_wrapper)
 
+def get_twitter_toolkit() -> TwitterToolkit:
+    """Twitter toolkit, created on first use (TwitterApiWrapper validates credentials)"""
+    global _twitter_toolkit
+    with _twitter_lock:
+        if _twitter_toolkit is None:
+            # Create a TwitterApiWrapper object
+            twitter_api_wrapper = TwitterApiWrapper()
+            _twitter_toolkit = TwitterToolkit.from_twitter_api_wrapper(twitter_api_wrapper)
+        return _twitter_toolkit
 
-# tools = twitter_toolkit.get_tools()
+
+# tools = get_twitter_toolkit().get_tools()
 # for tool in tools: 
 #     print(tool.name)
 
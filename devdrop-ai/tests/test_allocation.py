@@ -0,0 +1,37 @@
+from decimal import Decimal
+
+from src.api.allocation import allocate_units, to_base_units
+
+
+def test_units_always_sum_to_total():
+    points = [Decimal("1.000001"), Decimal("2.5"), Decimal("3.333333"), 7, 0.1]
+    keys = ["a", "b", "c", "d", "e"]
+    for total in [1, 7, 10**18, to_base_units(123456789), 3 * 10**25 + 1]:
+        assert sum(allocate_units(points, total, keys)) == total
+
+
+def test_leftover_goes_to_largest_remainders_ties_by_key():
+    # 10 units over three equal scores: 3 each, the leftover unit goes to the first key
+    assert allocate_units([1, 1, 1], 10, ["carol", "alice", "bob"]) == [3, 4, 3]
+    # Largest remainder wins regardless of key order: 2/3 of 1 beats 1/3 of 1
+    assert allocate_units([1, 2], 1, ["a", "b"]) == [0, 1]
+
+
+def test_allocation_does_not_depend_on_row_order():
+    points = [5, 3, 3, 1]
+    keys = ["d", "b", "c", "a"]
+    units = dict(zip(keys, allocate_units(points, 1000, keys)))
+    order = [3, 1, 0, 2]
+    reordered = dict(zip([keys[i] for i in order],
+                         allocate_units([points[i] for i in order], 1000, [keys[i] for i in order])))
+    assert units == reordered
+
+
+def test_negative_and_zero_scores_get_nothing():
+    assert allocate_units([-5, 0, 2], 100, ["a", "b", "c"]) == [0, 0, 100]
+    assert allocate_units([0, 0], 100, ["a", "b"]) == [0, 0]
+
+
+def test_to_base_units():
+    assert to_base_units(1000) == 1000 * 10**18
+    assert to_base_units("0.5", decimals=6) == 500_000
@@ -0,0 +1,165 @@
+import asyncio
+
+import pytest
+
+from src.api.disperse import (
+    DISPERSE_TOKEN_SELECTOR, GasModel, PayoutRejected, RpcError, SimulatedSender,
+    decode_disperse_token, encode_disperse_token, execute_batches, is_pre_broadcast_error,
+    plan_batches,
+)
+
+TOKEN = "0x" + "ab" * 20
+DISPERSE = "0x" + "cd" * 20
+CLAIMS = [("0x" + f"{i:040x}", 10**18 + i, [f"user{i}"]) for i in range(1, 251)]
+
+
+class InMemoryPayouts:
+    """payout_batches rows with the same claim semantics as AsyncDatabaseOperations"""
+
+    def __init__(self, batches):
+        self.rows = [dict(batch, id=i, status="pending", tx_hash=None, error=None)
+                     for i, batch in enumerate(batches)]
+
+    async def get_payout_batches(self, repo_name):
+        return [dict(row) for row in self.rows]
+
+    async def claim_payout_batch(self, batch_id, gas_limit):
+        row = self.rows[batch_id]
+        if row["status"] not in ("pending", "failed"):
+            return False
+        row.update(status="sending", gas_limit=gas_limit, tx_hash=None, error=None)
+        return True
+
+    async def set_payout_batch_submitted(self, batch_id, tx_hash):
+        self.rows[batch_id].update(status="submitted", tx_hash=tx_hash)
+
+    async def finish_payout_batch(self, batch_id, status, error=None):
+        self.rows[batch_id].update(status=status, error=error)
+
+
+def run(adb, sender, **options):
+    return asyncio.run(execute_batches(adb, "org/repo", sender, confirm_timeout=0, **options))
+
+
+def paid(sender):
+    return {address: sender.balance(TOKEN, address) for address, _, _ in CLAIMS}
+
+
+def expected():
+    return {address: amount for address, amount, _ in CLAIMS}
+
+
+def test_batches_stay_under_the_gas_budget():
+    model = GasModel(block_gas_limit=3_000_000, block_fraction=0.5)
+    batches = plan_batches(CLAIMS, TOKEN, DISPERSE, model)
+    assert len(batches) > 1
+    for batch in batches:
+        assert batch["gas_limit"] <= model.block_gas_limit * model.block_fraction
+        assert batch["gas_limit"] >= model.estimate(len(batch["recipients"]))
+    assert [r for b in batches for r in b["recipients"]] == [c[0] for c in CLAIMS]
+    sizes = [len(b["recipients"]) for b in batches]
+    assert max(sizes) - min(sizes) <= 1
+
+
+def test_plan_is_deterministic_and_skips_zero_amounts():
+    claims = CLAIMS[:5] + [("0x" + "ee" * 20, 0, ["nobody"])]
+    first = plan_batches(claims, TOKEN, DISPERSE, GasModel())
+    assert first == plan_batches(claims, TOKEN, DISPERSE, GasModel())
+    assert "0x" + "ee" * 20 not in first[0]["recipients"]
+
+
+def test_calldata_round_trip():
+    recipients = [c[0] for c in CLAIMS[:7]]
+    amounts = [c[1] for c in CLAIMS[:7]]
+    calldata = encode_disperse_token(TOKEN, recipients, amounts)
+    assert DISPERSE_TOKEN_SELECTOR.hex() == "c73a2d60"
+    assert calldata[:4] == DISPERSE_TOKEN_SELECTOR
+    # selector + token + 2 offsets + (length + items) for each array
+    assert len(calldata) == 4 + 32 * (3 + 2 * (1 + len(recipients)))
+    assert decode_disperse_token(calldata) == (TOKEN, recipients, amounts)
+
+
+def test_payout_pays_every_recipient_once():
+    adb = InMemoryPayouts(plan_batches(CLAIMS, TOKEN, DISPERSE, GasModel(block_gas_limit=3_000_000)))
+    sender = SimulatedSender()
+    rows = run(adb, sender)
+    assert {row["status"] for row in rows} == {"confirmed"}
+    assert paid(sender) == expected()
+    # Running again sends nothing
+    run(adb, sender)
+    assert len(sender.transactions) == len(rows)
+
+
+def test_resume_after_submitted_checks_receipt_instead_of_resending():
+    adb = InMemoryPayouts(plan_batches(CLAIMS, TOKEN, DISPERSE, GasModel(block_gas_limit=3_000_000)))
+    sender = SimulatedSender()
+    # A previous run sent the first batch and stopped before recording its receipt
+    first = adb.rows[0]
+    tx_hash = asyncio.run(sender.send(first["disperse_address"], first["calldata"], first["gas_limit"]))
+    first.update(status="submitted", tx_hash=tx_hash)
+
+    rows = run(adb, sender)
+    assert {row["status"] for row in rows} == {"confirmed"}
+    assert len(sender.transactions) == len(rows)
+    assert paid(sender) == expected()
+
+
+def test_rejected_batch_is_retried_without_double_credit():
+    class RejectsOnce(SimulatedSender):
+        rejected = False
+
+        async def send(self, to, data, gas):
+            if not self.rejected:
+                self.rejected = True
+                raise PayoutRejected("insufficient funds")
+            return await super().send(to, data, gas)
+
+    adb = InMemoryPayouts(plan_batches(CLAIMS, TOKEN, DISPERSE, GasModel(block_gas_limit=3_000_000)))
+    sender = RejectsOnce()
+    rows = run(adb, sender)
+    assert rows[0]["status"] == "failed"
+    rows = run(adb, sender)
+    assert {row["status"] for row in rows} == {"confirmed"}
+    assert paid(sender) == expected()
+
+
+def test_out_of_gas_batch_is_retried_with_more_gas():
+    plan_model = GasModel(block_gas_limit=3_000_000, safety=1.0)
+    # The chain charges more per recipient than the plan assumed
+    chain = GasModel(per_recipient_gas=40_000)
+    adb = InMemoryPayouts(plan_batches(CLAIMS, TOKEN, DISPERSE, plan_model))
+    sender = SimulatedSender(gas_model=chain)
+    for _ in range(2 * len(adb.rows)):
+        rows = run(adb, sender, retry_gas_bump=1.5, max_gas=30_000_000)
+        if {row["status"] for row in rows} == {"confirmed"}:
+            break
+    assert {row["status"] for row in rows} == {"confirmed"}
+    assert paid(sender) == expected()
+
+
+def test_unclear_send_blocks_the_payout():
+    class TimesOut(SimulatedSender):
+        async def send(self, to, data, gas):
+            raise TimeoutError("read timed out")
+
+    adb = InMemoryPayouts(plan_batches(CLAIMS, TOKEN, DISPERSE, GasModel(block_gas_limit=3_000_000)))
+    rows = run(adb, TimesOut())
+    assert rows[0]["status"] == "unknown"
+    # Not retried: it may be on chain
+    sender = SimulatedSender()
+    rows = run(adb, sender)
+    assert rows[0]["status"] == "unknown"
+    assert not sender.transactions
+
+
+@pytest.mark.parametrize("message, code, pre_broadcast", [
+    ("insufficient funds for gas * price + value", -32000, True),
+    ("invalid params", -32602, True),
+    ("execution reverted", 3, True),
+    ("nonce too low", -32000, False),
+    ("already known", -32000, False),
+    ("replacement transaction underpriced", -32000, False),
+    ("internal error", -32603, False),
+])
+def test_rpc_error_classification(message, code, pre_broadcast):
+    assert is_pre_broadcast_error(RpcError(message, code)) is pre_broadcast
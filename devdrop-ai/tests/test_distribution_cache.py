@@ -0,0 +1,67 @@
+from src.api import distribution_cache as module
+from src.api.distribution_cache import DistributionCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_put_from_before_an_invalidate_is_not_stored():
+    cache = DistributionCache()
+    value, generation = cache.get("org/repo")
+    assert value is None
+    # A write lands while the distribution is being computed
+    cache.invalidate("org/repo")
+    cache.put("org/repo", ["stale"], generation)
+    assert cache.get("org/repo")[0] is None
+
+    value, generation = cache.get("org/repo")
+    cache.put("org/repo", ["fresh"], generation)
+    assert cache.get("org/repo")[0] == ["fresh"]
+
+
+def test_invalidate_drops_the_entry_and_only_that_repo():
+    cache = DistributionCache()
+    cache.put("org/a", "a", cache.get("org/a")[1])
+    cache.put("org/b", "b", cache.get("org/b")[1])
+    cache.invalidate("org/a")
+    assert cache.get("org/a")[0] is None
+    assert cache.get("org/b")[0] == "b"
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(module.time, "monotonic", clock)
+    cache = DistributionCache(ttl=60)
+    cache.put("org/repo", "value", 0)
+    clock.now += 59
+    assert cache.get("org/repo")[0] == "value"
+    clock.now += 1
+    assert cache.get("org/repo")[0] is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_repo_is_evicted():
+    cache = DistributionCache(max_entries=2)
+    cache.put("org/a", "a", 0)
+    cache.put("org/b", "b", 0)
+    # Reading a makes b the least recently used
+    assert cache.get("org/a")[0] == "a"
+    cache.put("org/c", "c", 0)
+    assert cache.get("org/b")[0] is None
+    assert cache.get("org/a")[0] == "a"
+    assert cache.get("org/c")[0] == "c"
+
+
+def test_stats_count_hits_misses_and_invalidations():
+    cache = DistributionCache()
+    cache.get("org/repo")
+    cache.put("org/repo", "value", 0)
+    cache.get("org/repo")
+    cache.invalidate("org/repo")
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["invalidations"]) == (1, 1, 1)
@@ -0,0 +1,107 @@
+import asyncio
+from datetime import datetime, timezone
+
+from src.api.db import pending_pairs_query
+from src.api.jobs import EvaluationJobManager
+
+
+class PagedPairs:
+    """In-memory evaluation_jobs/pending-pairs store; pages are read lazily like the keyset iterator"""
+
+    def __init__(self, pairs, page_size=3):
+        self.pairs = sorted(pairs)
+        self.page_size = page_size
+        self.evaluated = set()
+        self.pages_read = 0
+        self.total = None
+        self.results = []
+        self.status = None
+
+    async def count_pending_pairs(self, evaluated_before=None):
+        return len([pair for pair in self.pairs if pair not in self.evaluated])
+
+    async def iter_pending_pair_pages(self, evaluated_before=None, page_size=500):
+        last = None
+        while True:
+            page = [pair for pair in self.pairs
+                    if pair not in self.evaluated and (last is None or pair > last)][:self.page_size]
+            self.pages_read += 1
+            if page:
+                yield page
+            if len(page) < self.page_size:
+                return
+            last = page[-1]
+
+    async def set_evaluation_job_total(self, job_id, total):
+        self.total = total
+
+    async def record_evaluation_job_result(self, job_id, repo, user, error):
+        self.results.append(((repo, user), error))
+        return "running"
+
+    async def finish_evaluation_job(self, job_id, status, error=None):
+        self.status = status
+
+    async def heartbeat_evaluation_job(self, job_id):
+        return "running"
+
+    async def get_resumable_evaluation_jobs(self, stale_after):
+        return []
+
+
+def run_job(adb, evaluate, failures=(), processed=0):
+    async def make_evaluator():
+        return evaluate
+
+    manager = EvaluationJobManager(adb, make_evaluator, stale_after=60)
+    job = {
+        "id": 1,
+        "refresh": False,
+        "started_at": datetime.now(timezone.utc),
+        "processed": processed,
+        "failures": [{"repo": repo, "user": user} for repo, user in failures],
+    }
+    asyncio.run(manager._run(job, asyncio.Event()))
+
+
+def test_job_reads_pairs_a_page_at_a_time():
+    pairs = [("org/repo", f"user{i:02}") for i in range(8)]
+    adb = PagedPairs(pairs, page_size=3)
+    pages_read_when_evaluated = []
+
+    async def evaluate(repo, user):
+        pages_read_when_evaluated.append(adb.pages_read)
+        adb.evaluated.add((repo, user))
+        return {"status": "success"}
+
+    run_job(adb, evaluate)
+    assert adb.status == "completed"
+    assert adb.total == 8
+    assert [pair for pair, _ in adb.results] == pairs
+    # The first page is being worked on before later pages are read
+    assert pages_read_when_evaluated[0] == 1
+    assert adb.pages_read == 3
+
+
+def test_resumed_job_skips_pairs_that_already_failed():
+    pairs = [("org/repo", f"user{i}") for i in range(5)]
+    adb = PagedPairs(pairs, page_size=2)
+    seen = []
+
+    async def evaluate(repo, user):
+        seen.append((repo, user))
+        adb.evaluated.add((repo, user))
+        return {"status": "success"}
+
+    run_job(adb, evaluate, failures=[("org/repo", "user1")], processed=1)
+    assert ("org/repo", "user1") not in seen
+    assert len(seen) == 4
+    assert adb.total == 1 + 4
+
+
+def test_pending_pairs_query_parameter_order():
+    query = pending_pairs_query(by_repo=True, after=True, limit=True, evaluated_before=True)
+    assert query.count("%s") == 5
+    assert query.index("cd.repo_name = %s") < query.index("> (%s, %s)") < query.index("evaluated_at >= %s")
+    assert query.index("evaluated_at >= %s") < query.index("LIMIT %s")
+    assert "evaluated_at" not in pending_pairs_query()
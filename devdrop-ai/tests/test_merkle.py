@@ -0,0 +1,57 @@
+from eth_utils import keccak
+
+from src.api.merkle import ClaimTreeCache, MerkleTree, claim_leaf
+
+WALLETS = ["0x" + f"{i:040x}" for i in range(1, 12)]
+
+
+def verify(proof, root, leaf):
+    """OpenZeppelin MerkleProof.verify: hash sorted pairs up from the leaf"""
+    computed = leaf
+    for node in proof:
+        computed = keccak(computed + node if computed <= node else node + computed)
+    return computed == root
+
+
+def test_leaf_is_abi_encode_packed_address_and_uint256():
+    address = "0x" + "ab" * 20
+    assert claim_leaf(address, 5) == keccak(bytes.fromhex("ab" * 20) + (5).to_bytes(32, "big"))
+
+
+def test_every_proof_verifies_with_sorted_pairs():
+    for count in range(1, len(WALLETS) + 1):
+        leaves = [claim_leaf(w, 10**18 + i) for i, w in enumerate(WALLETS[:count])]
+        tree = MerkleTree(leaves)
+        for i, leaf in enumerate(leaves):
+            assert verify(tree.proof(i), tree.root, leaf)
+
+
+def test_odd_node_is_carried_up():
+    leaves = [claim_leaf(w, 1) for w in WALLETS[:3]]
+    a, b, c = leaves
+    pair = keccak(a + b if a <= b else b + a)
+    expected = keccak(pair + c if pair <= c else c + pair)
+    assert MerkleTree(leaves).root == expected
+
+
+def test_wrong_amount_does_not_verify():
+    leaves = [claim_leaf(w, 100) for w in WALLETS[:4]]
+    tree = MerkleTree(leaves)
+    assert not verify(tree.proof(1), tree.root, claim_leaf(WALLETS[1], 101))
+
+
+def test_claim_tree_sums_shared_wallets_and_lists_missing():
+    distribution = [
+        {"contributor": "alice", "token_units": "30"},
+        {"contributor": "bob", "token_units": "12"},
+        {"contributor": "carol", "token_units": "5"},
+    ]
+    wallets = {"alice": WALLETS[0], "bob": WALLETS[0]}
+    tree = ClaimTreeCache().build("org/repo", distribution, wallets)
+    assert tree.missing_wallets == ["carol"]
+    claim = tree.proof(contributor="bob")
+    assert claim["amount"] == "42"
+    assert claim["contributors"] == ["alice", "bob"]
+    leaf = claim_leaf(WALLETS[0], 42)
+    root = bytes.fromhex(claim["merkle_root"][2:])
+    assert verify([bytes.fromhex(p[2:]) for p in claim["proof"]], root, leaf)
@@ -0,0 +1,139 @@
+import pytest
+
+from src.api.scoring import (
+    DELETION_ONLY_CAP,
+    ISSUE_CLOSE_POINTS,
+    ISSUE_REFERENCE_POINTS,
+    SCAFFOLD_CAP,
+    SINGLE_WORD_CAP,
+    TEST_ONLY_CAP,
+    score_commits,
+    score_contributor,
+    score_contributors,
+)
+
+
+def commit(message="Refactor the session cache", lines=10, files=1, additions=None, deletions=0, **extra):
+    return dict({
+        "commitMessage": message,
+        "linesChanged": lines,
+        "filesChanged": files,
+        "additions": lines if additions is None else additions,
+        "deletions": deletions,
+    }, **extra)
+
+
+@pytest.mark.parametrize("lines, points", [
+    (0, 0), (1, 1), (50, 1), (51, 2), (200, 2), (201, 3), (500, 3), (501, 4), (10_000, 4),
+])
+def test_lines_bands(lines, points):
+    assert score_commits([commit(lines=lines)])["lines_points"][0] == points
+
+
+@pytest.mark.parametrize("files, points", [
+    (0, 0), (1, 1), (2, 1), (3, 2), (10, 2), (11, 3), (400, 3),
+])
+def test_files_bands(files, points):
+    assert score_commits([commit(files=files)])["files_points"][0] == points
+
+
+@pytest.mark.parametrize("message, points", [
+    ("", 0),
+    ("wip", 1),
+    ("Fix typo", 2),
+    ("Rework token refresh so expired sessions recover\n\nLonger body", 2),
+])
+def test_message_points(message, points):
+    assert score_commits([commit(message=message)])["message_points"][0] == points
+
+
+@pytest.mark.parametrize("message, extra, points", [
+    ("Handle empty payloads, fixes #12", {}, ISSUE_REFERENCE_POINTS),
+    ("Handle empty payloads\n\nFixes  #12", {}, ISSUE_REFERENCE_POINTS),
+    ("Handle empty payloads, closes #12", {}, ISSUE_CLOSE_POINTS),
+    ("Handle empty payloads (fixes #3, closes #4)", {}, ISSUE_CLOSE_POINTS),
+    ("Handle empty payloads", {"closesIssue": True}, ISSUE_CLOSE_POINTS),
+    # Bare numbers are not issue references
+    ("Merge pull request #12 from alice/feature", {}, 0),
+    ("Bump parser to #2 release", {}, 0),
+    ("See #12 for context", {}, 0),
+])
+def test_issue_reference_counting(message, extra, points):
+    assert score_commits([commit(message=message, **extra)])["issue_points"][0] == points
+
+
+@pytest.mark.parametrize("kwargs, cap, flag", [
+    ({"message": "Initial commit", "lines": 300, "files": 20}, SCAFFOLD_CAP, "scaffold"),
+    ({"message": "Remove dead handlers", "lines": 300, "files": 20, "additions": 0, "deletions": 300},
+     DELETION_ONLY_CAP, "deletion_only"),
+    ({"message": "update", "lines": 300, "files": 20}, SINGLE_WORD_CAP, "single_word"),
+    ({"message": "test: cover the retry path", "lines": 300, "files": 20}, TEST_ONLY_CAP, "test_only"),
+    ({"message": "Add tests for the parser", "lines": 300, "files": 20}, TEST_ONLY_CAP, "test_only"),
+])
+def test_special_case_caps(kwargs, cap, flag):
+    scores = score_commits([commit(**kwargs)])
+    assert scores[flag][0]
+    assert scores["points"][0] == cap
+    assert scores["capped"][0]
+
+
+def test_lowest_cap_wins():
+    scores = score_commits([commit(message="init", lines=300, files=20)])
+    assert scores["points"][0] == min(SCAFFOLD_CAP, SINGLE_WORD_CAP)
+
+
+def test_caps_do_not_raise_small_scores():
+    scores = score_commits([commit(message="Initial commit", lines=1, files=0)])
+    assert scores["points"][0] == 1 + 0 + 2
+    assert not scores["capped"][0]
+
+
+def test_deletions_with_unknown_additions_are_not_capped():
+    scores = score_commits([{"commitMessage": "Remove dead handlers", "linesChanged": 300,
+                             "filesChanged": 20, "deletions": 300}])
+    assert not scores["deletion_only"][0]
+
+
+@pytest.mark.parametrize("kwargs, ambiguous", [
+    ({"message": "Merge branch 'main' into feature"}, True),
+    ({"lines": 0, "files": 0}, True),
+    ({"message": "Initial commit", "lines": 5000, "files": 80}, True),
+    ({"message": "Initial commit", "lines": 500, "files": 80}, False),
+    ({}, False),
+])
+def test_ambiguous_commits(kwargs, ambiguous):
+    assert score_contributor([commit(**kwargs)])["ambiguous"] is ambiguous
+
+
+def test_no_commits_is_ambiguous_with_zero_points():
+    result = score_contributor([])
+    assert result["total_points"] == 0.0
+    assert result["ambiguous"]
+
+
+def test_contributor_total_and_justification():
+    commits = [
+        commit(message="Rework parser, closes #7", lines=120, files=4),
+        commit(message="update", lines=600, files=12),
+    ]
+    result = score_contributor(commits)
+    assert result["total_points"] == (2 + 2 + 2 + ISSUE_CLOSE_POINTS) + SINGLE_WORD_CAP
+    assert "2 commits" in result["justification"]
+    assert "1 commits close an issue" in result["justification"]
+    assert "1 commits were capped" in result["justification"]
+
+
+def test_vectorized_scores_match_per_contributor_scores():
+    commits_by_contributor = {
+        "alice": [commit(message="Rework parser, closes #7", lines=120, files=4),
+                  commit(message="update", lines=600, files=12)],
+        "bob": [],
+        "carol": [commit(message="Merge pull request #3 from carol/x", lines=0, files=0)],
+        "dave": [commit(message="Remove dead code", lines=80, files=2, additions=0, deletions=80),
+                 commit(message="Handle empty payloads, fixes #12", lines=30, files=1),
+                 commit(message="Initial commit", lines=900, files=40)],
+    }
+    vectorized = score_contributors(commits_by_contributor)
+    assert list(vectorized) == list(commits_by_contributor)
+    for name, commits in commits_by_contributor.items():
+        assert vectorized[name] == score_contributor(commits)
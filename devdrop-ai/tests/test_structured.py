@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+from src.api.structured import (
+    EVALUATION_SCHEMA_HINT,
+    StructuredOutputError,
+    complete_structured,
+    extract_json,
+    parse_evaluation,
+    parse_evaluation_list,
+    validate_evaluation,
+)
+
+GOOD = {"total_points": 12.5, "justification": "Solid fixes"}
+
+
+@pytest.mark.parametrize("text", [
+    '{"total_points": 12.5, "justification": "Solid fixes"}',
+    '```json\n{"total_points": 12.5, "justification": "Solid fixes"}\n```',
+    '```\n{"total_points": 12.5, "justification": "Solid fixes"}\n```',
+    'Here is the evaluation:\n{"total_points": 12.5, "justification": "Solid fixes"}',
+    '{"total_points": 12.5, "justification": "Solid fixes"}\nLet me know if you need more.',
+    'Sure! ```JSON {"total_points": 12.5, "justification": "Solid fixes"} ``` Hope that helps.',
+    '{"total_points": 12.5, "justification": "Solid fixes",}',
+    '```json\n{"total_points": 12.5,\n "justification": "Solid fixes",\n}\n```',
+    # A stray brace in the prose is skipped, the first complete object wins
+    'Scoring {see below}: {"total_points": 12.5, "justification": "Solid fixes"} {"total_points": 1}',
+])
+def test_parse_evaluation_tolerates_formatting(text):
+    assert parse_evaluation(text) == GOOD
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('[{"username": "a"}]', [{"username": "a"}]),
+    ('Results:\n```json\n[{"username": "a"}, {"username": "b"},]\n```', [{"username": "a"}, {"username": "b"}]),
+    # An object before the array is not what was asked for
+    ('{"note": 1} then [1, 2]', [1, 2]),
+])
+def test_parse_evaluation_list(text, expected):
+    assert parse_evaluation_list(text) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "I could not evaluate this contributor.",
+    '{"total_points": 12.5, "justification": "unterminated}',
+    "```json\n{total_points: 12.5}\n```",
+])
+def test_invalid_json_raises(text):
+    with pytest.raises(StructuredOutputError):
+        extract_json(text, dict)
+
+
+@pytest.mark.parametrize("item", [
+    ["not", "an", "object"],
+    {"justification": "No points"},
+    {"total_points": 5},
+    {"total_points": -1, "justification": "Negative"},
+    {"total_points": "lots", "justification": "Not a number"},
+    {"total_points": float("inf"), "justification": "Infinite"},
+    {"total_points": 5, "justification": "   "},
+    {"total_points": 5, "justification": ""},
+])
+def test_schema_invalid_payloads_raise(item):
+    with pytest.raises(ValueError):
+        validate_evaluation(item)
+
+
+def test_validate_evaluation_drops_extra_fields():
+    item = dict(GOOD, username="alice", confidence=0.9)
+    assert validate_evaluation(item) == GOOD
+
+
+class ScriptedModel:
+    def __init__(self, *outputs):
+        self.outputs = list(outputs)
+        self.calls = []
+
+    async def __call__(self, messages):
+        self.calls.append(messages)
+        return self.outputs.pop(0)
+
+
+def test_invalid_output_is_repaired_with_a_re_ask():
+    model = ScriptedModel("total_points: 12.5", '{"total_points": 12.5, "justification": "Solid fixes"}')
+    result = asyncio.run(complete_structured(model, [{"role": "user", "content": "evaluate"}],
+                                             parse_evaluation, EVALUATION_SCHEMA_HINT))
+    assert result == GOOD
+    assert len(model.calls) == 2
+    # The repair request carries only the bad output, not the original prompt
+    repair = model.calls[1]
+    assert repair[1] == {"role": "user", "content": "total_points: 12.5"}
+    assert EVALUATION_SCHEMA_HINT in repair[0]["content"]
+
+
+def test_schema_invalid_output_is_repaired_too():
+    model = ScriptedModel('{"total_points": -3, "justification": "x"}', '{"total_points": 3, "justification": "x"}')
+    result = asyncio.run(complete_structured(model, [], parse_evaluation, EVALUATION_SCHEMA_HINT))
+    assert result == {"total_points": 3, "justification": "x"}
+
+
+def test_gives_up_after_max_repairs():
+    model = ScriptedModel("nope", "still nope")
+    with pytest.raises(StructuredOutputError, match="Invalid model output"):
+        asyncio.run(complete_structured(model, [], parse_evaluation, EVALUATION_SCHEMA_HINT, max_repairs=1))
+    assert len(model.calls) == 2
+
+
+def test_valid_output_is_not_re_asked():
+    model = ScriptedModel('{"total_points": 12.5, "justification": "Solid fixes"}')
+    asyncio.run(complete_structured(model, [], parse_evaluation, EVALUATION_SCHEMA_HINT))
+    assert len(model.calls) == 1
@@ -0,0 +1,83 @@
+import threading
+import time
+
+from src.tools.token_limits import TokenRequestLimits, limited_connection_class
+
+
+class FakeConnection:
+    """Stands in for PyGithub's requests-based connection: the round trip happens in getresponse"""
+
+    lock = threading.Lock()
+    in_flight = {}
+    peak = {}
+
+    def request(self, verb, url, input, headers, stream=False):
+        self.authorization = headers.get("Authorization")
+
+    def getresponse(self):
+        cls = FakeConnection
+        with cls.lock:
+            cls.in_flight[self.authorization] = cls.in_flight.get(self.authorization, 0) + 1
+            cls.peak[self.authorization] = max(cls.peak.get(self.authorization, 0), cls.in_flight[self.authorization])
+        time.sleep(0.02)
+        with cls.lock:
+            cls.in_flight[self.authorization] -= 1
+        return "response"
+
+
+def run_requests(connection_class, authorizations):
+    FakeConnection.in_flight.clear()
+    FakeConnection.peak.clear()
+
+    def one(authorization):
+        connection = connection_class()
+        connection.request("GET", "/user", None, {"Authorization": authorization} if authorization else {})
+        assert connection.getresponse() == "response"
+
+    threads = [threading.Thread(target=one, args=(authorization,)) for authorization in authorizations]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return dict(FakeConnection.peak)
+
+
+def test_requests_are_limited_per_token():
+    limits = TokenRequestLimits()
+    limits.register("alpha", 2)
+    limits.register("beta", 1)
+    connection_class = limited_connection_class(FakeConnection, limits)
+    peak = run_requests(connection_class, ["token alpha"] * 6 + ["Bearer beta"] * 4)
+    assert peak == {"token alpha": 2, "Bearer beta": 1}
+
+
+def test_tokens_do_not_share_slots():
+    limits = TokenRequestLimits()
+    limits.register("alpha", 1)
+    limits.register("beta", 1)
+    # Both requests must be in flight at once to get past the barrier
+    barrier = threading.Barrier(2, timeout=5)
+
+    class BarrierConnection(FakeConnection):
+        def getresponse(self):
+            barrier.wait()
+            return "response"
+
+    run_requests(limited_connection_class(BarrierConnection, limits), ["token alpha", "token beta"])
+    assert not barrier.broken
+
+
+def test_unregistered_and_anonymous_requests_are_not_limited():
+    limits = TokenRequestLimits()
+    limits.register("alpha", 1)
+    connection_class = limited_connection_class(FakeConnection, limits)
+    peak = run_requests(connection_class, ["token other"] * 3 + [None] * 3)
+    assert peak["token other"] > 1 and peak[None] > 1
+
+
+def test_first_registration_wins():
+    limits = TokenRequestLimits()
+    limits.register("alpha", 1)
+    limits.register("alpha", 5)
+    connection_class = limited_connection_class(FakeConnection, limits)
+    assert run_requests(connection_class, ["token alpha"] * 4) == {"token alpha": 1}
@@ -1,7 +1,12 @@
 import api, { endpoints } from "./api";
+import { useRef } from "react";
 import { useMutation } from "@tanstack/react-query";
 
 export function useChat() {
+  // The server keeps the conversation history per thread; resend the thread it
+  // assigned so follow-up messages continue the same conversation
+  const threadId = useRef<string | undefined>(undefined);
+
   return useMutation({
     mutationFn: async (message: string) => {
       const { data } = await api.post(endpoints.chat, {
@@ -11,7 +16,9 @@ export function useChat() {
             content: message,
           },
         ],
+        thread_id: threadId.current,
       });
+      threadId.current = data.thread_id;
       return data.response;
     },
   });